@@ -1,15 +1,30 @@
+from __future__ import annotations
+import asyncio
 from dataclasses import dataclass
 from datetime import datetime
 import json
+import logging
 import os 
+import time
+from typing import TYPE_CHECKING, Callable
 from dotenv import load_dotenv
-from src.clients import AnthropicClient, BaseClient, MessageOptions
-from src.processors.repd_processor import REPDProcessor
+from src.cache import CachedClient
+from src.clients import AnthropicClient, BaseClient, MessageOptions, run_blocking
+from src.evaluation import EvalAggregator
+from src.rate_limit import RateLimiter
+from src.research import ResearchBudget, ResearchResult, research
+from src.sources import FetchResult, SourceFetcher
+from src.telemetry import InstrumentedClient, Telemetry
 from src.prompts import prompt_nimby_analysis, prompt_evaluator, prompt_reseacher
 from pydantic import BaseModel
-import pandas as pd 
 load_dotenv()
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.processors.repd_processor import REPDProcessor
+
+logger = logging.getLogger(__name__)
+
 class AgentEval(BaseModel):
     accuracy: str
     reasoning: str
@@ -25,6 +40,11 @@ class NimbyFormat(BaseModel):
 class Evaluation(BaseModel):
     certainty: float
     accuracy: float
+    count: int = 0
+    by_technology: dict[str, dict] = {}
+    by_authority: dict[str, dict] = {}
+
+ACCURACY_LEVELS = {'certain': 100, 'high': 80, 'medium': 40, 'low': 0}
 
 class WebResponse(BaseModel):
     summary:str
@@ -32,29 +52,143 @@ class WebResponse(BaseModel):
     likelihood:str
     perpetrators:str
 
+@dataclass
+class RunStats:
+    """Throughput summary for a batch of agent calls."""
+    completed: int
+    failed: int
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        """Completed projects per minute."""
+        return self.completed / self.elapsed * 60 if self.elapsed else 0.0
+
 @dataclass 
 class AppConfig:
     api_key: str = os.getenv('CLAUDE_API_KEY')
 
 class NimbyAgent:
-    def __init__(self, client: BaseClient, processor = REPDProcessor):
+    def __init__(self, client: BaseClient, processor: REPDProcessor | None = None, nearby: int = 3):
+        if processor is None:
+            from src.processors.repd_processor import REPDProcessor
+            processor = REPDProcessor()
         self.client = client
         self.search_client = client
         self.repd_processor = processor
+        self.nearby = nearby
+        self.last_run_stats: RunStats | None = None
     
-    def run_search(self, context, prompt_func=prompt_reseacher):
-        prompt_val = prompt_func(context=context)
-        message = self.client.call_json(prompt_val, json_model=WebResponse, tools='web')
-        while message.text.stop_reason == "tool_use":
-            tool_use_blocks = [block for block in message.text.content if block.type == "tool_use"]
-            message = self.client.call_json(
-                prompt_val + tool_use_blocks,  # Or build on the conversation
-                json_model=WebResponse,
-                tools='web'
-            )
-        text_blocks = [block.text for block in message.text.content if hasattr(block, 'text')]
-        return text_blocks
-    
+    def build_contexts(self, context: pd.DataFrame, nearby: int | None = None) -> pd.Series:
+        """Compact prompt context per row, see REPDProcessor.build_contexts.
+
+        Args:
+            context (pd.DataFrame): Rows that will be sent to the model.
+            nearby (int | None): Nearby cancelled projects listed per row, defaults to self.nearby.
+
+        Returns:
+            pd.Series: Context text indexed like ``context``.
+        """
+        contexts = self.repd_processor.build_contexts(context, nearby=self.nearby if nearby is None else nearby)
+        if len(contexts):
+            logger.info("Built context for %d projects, ~%.0f tokens each", len(contexts), contexts['tokens'].mean())
+        return contexts['context']
+
+    def deduplicate(self, context: pd.DataFrame) -> tuple[pd.DataFrame, dict[int, pd.DataFrame]]:
+        """Split rows into one representative per cluster of duplicate records.
+
+        Args:
+            context (pd.DataFrame): Rows about to be sent to the model.
+
+        Returns:
+            tuple[pd.DataFrame, dict[int, pd.DataFrame]]: Representative rows, and the member
+                rows (representative included) keyed by representative Ref ID. Every row gains
+                a 'Cluster' column holding its representative's Ref ID.
+        """
+        clusters = self.repd_processor.cluster_projects(context).to_numpy()
+        context = context.assign(Cluster=clusters)
+        members = dict(tuple(context.groupby(clusters, sort=False)))
+        representatives = context[context['Ref ID'].to_numpy() == clusters]
+        if len(representatives) < len(context):
+            logger.info("%d projects fall into %d clusters of duplicates; analysing one per cluster",
+                        len(context), len(representatives))
+        return representatives, members
+
+    def run_search(self, context, prompt_func=prompt_reseacher,
+                   budget: ResearchBudget = ResearchBudget()) -> ResearchResult:
+        """Research one project on the web. Blocking wrapper around research.
+
+        Args:
+            context: Context for message. Serializable into string.
+            prompt_func: function that returns the research prompt.
+            budget (ResearchBudget): Turn and token limits for the conversation.
+
+        Returns:
+            ResearchResult: WebResponse (or None) with turn and token counts.
+        """
+        return run_blocking(self.search_client, research(self.search_client, prompt_func(context=context),
+                                                         WebResponse, budget, stage="search"))
+
+    async def run_search_async(self, context: pd.DataFrame, concurrency: int = 8,
+                               prompt_func=prompt_reseacher,
+                               budget: ResearchBudget = ResearchBudget(),
+                               dedupe: bool = True,
+                               ) -> list[tuple[pd.Series, ResearchResult]]:
+        """Research many projects concurrently, each within its own budget.
+
+        Args:
+            context (pd.DataFrame): Rows to research.
+            concurrency (int): Max number of research conversations in flight.
+            prompt_func: function that returns the research prompt.
+            budget (ResearchBudget): Turn and token limits per project.
+            dedupe (bool): Research one representative per cluster of duplicate records
+                and share its result with the rest of the cluster.
+
+        Returns:
+            list[tuple[pd.Series, ResearchResult]]: Context and result, ordered by Ref ID. Failed projects are logged and skipped.
+        """
+        members = None
+        if dedupe:
+            context, members = self.deduplicate(context)
+        semaphore = asyncio.Semaphore(concurrency)
+        contexts = self.build_contexts(context)
+
+        async def search(row: pd.Series) -> list[tuple[pd.Series, ResearchResult]]:
+            async with semaphore:
+                result = await research(self.search_client, prompt_func(context=contexts[row.name]), WebResponse,
+                                        budget, custom_id=f"search-{row['Ref ID']}", stage="search")
+            return [(member, result) for member in _members(row, members)]
+
+        outcomes = await asyncio.gather(*(search(row) for _, row in context.iterrows()), return_exceptions=True)
+        results = []
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                logger.warning("Research failed: %r", outcome)
+                continue
+            results.extend(outcome)
+        results.sort(key=lambda result: result[0]['Ref ID'])
+        return results
+
+    async def fetch_sources(self, results: list[tuple[pd.Series, ResearchResult]],
+                            fetcher: SourceFetcher) -> dict[int, list[FetchResult]]:
+        """Fetch and extract every potential source found by run_search_async.
+
+        Attach a DocumentIngester to ``fetcher`` to have PDF sources' text extracted too.
+
+        Args:
+            results (list[tuple[pd.Series, ResearchResult]]): Output of run_search_async.
+            fetcher (SourceFetcher): Shared fetcher; sources cited by several projects are fetched once.
+
+        Returns:
+            dict[int, list[FetchResult]]: Fetched sources per Ref ID.
+        """
+        sources = {
+            int(row['Ref ID']): list(result.response.potential_sources or [])
+            for row, result in results if result.response is not None
+        }
+        fetched = await fetcher.fetch_all([url for urls in sources.values() for url in urls])
+        return {ref: [fetched[url] for url in urls] for ref, urls in sources.items()}
+
     def run_singular(self, context, prompt_func=prompt_nimby_analysis) -> NimbyFormat:
         """Run singular agent message, add context.
 
@@ -66,7 +200,7 @@ class NimbyAgent:
             MessageResponse: Message response
         """
         prompt = prompt_func(context=context)
-        message = self.client.call_json(prompt, json_model=NimbyFormat).text.content[0].text
+        message = self.client.call_json(prompt, json_model=NimbyFormat, stage="analysis")
         nimby = NimbyFormat.model_validate_json(message.text)
         return nimby 
 
@@ -81,65 +215,209 @@ class NimbyAgent:
             list[tuple[pd.Series, NimbyFormat]]: Returns a list of values containing context and output
         """
         df = self.repd_processor.load()
-        context = self.repd_processor.filter_by_cancelled(df)
-        current = 0
+        context = self.repd_processor.filter_by_cancelled(df).head(max_values)
+        contexts = self.build_contexts(context)
         messages = []
 
-        for _, row in context.iterrows():
-            if current >= max_values:
-                break
-            prompt = prompt_func(context=row.to_dict())
-            message = self.client.call_json(prompt, json_model=NimbyFormat).text.content[0].text
+        for index, row in context.iterrows():
+            prompt = prompt_func(context=contexts[index])
+            message = self.client.call_json(prompt, json_model=NimbyFormat, stage="analysis")
             nimby = NimbyFormat.model_validate_json(message.text)
             messages.append((row, nimby))
-            current += 1
+        return messages
+
+    async def run_async(self, max_values: int | None = 2, concurrency: int = 8,
+                        prompt_func=prompt_nimby_analysis,
+                        context: pd.DataFrame | None = None,
+                        on_result: Callable[[pd.Series, NimbyFormat], None] | None = None,
+                        dedupe: bool = True,
+                        ) -> list[tuple[pd.Series, NimbyFormat]]:
+        """Runs across current list of context values concurrently.
+
+        Args:
+            max_values [int | None]: max values to iterate across on, None for every cancelled project.
+            concurrency [int]: max number of in-flight LLM calls.
+            prompt [func]: function containing a prompt to run, defaults to nimby analysis prompt
+            context [pd.DataFrame | None]: rows to analyse, defaults to all cancelled projects.
+            on_result [func | None]: called with each (row, output) as soon as it completes.
+            dedupe [bool]: analyse one representative per cluster of duplicate records and fan its
+                output out to the rest of the cluster; max_values then counts representatives.
+
+        Returns:
+            list[tuple[pd.Series, NimbyFormat]]: Context and output, ordered by Ref ID. Failed projects are logged and skipped.
+        """
+        if context is None:
+            df = self.repd_processor.load()
+            context = self.repd_processor.filter_by_cancelled(df)
+        members = None
+        if dedupe:
+            context, members = self.deduplicate(context)
+        if max_values is not None:
+            context = context.head(max_values)
+        semaphore = asyncio.Semaphore(concurrency)
+        contexts = self.build_contexts(context)
+
+        async def analyse(row: pd.Series) -> list[tuple[pd.Series, NimbyFormat]]:
+            async with semaphore:
+                prompt = prompt_func(context=contexts[row.name])
+                message = await self.client.call_json_async(
+                    prompt, json_model=NimbyFormat, custom_id=f"ref-{row['Ref ID']}", stage="analysis"
+                )
+                nimby = NimbyFormat.model_validate_json(message.text)
+            analysed = [(member, nimby) for member in _members(row, members)]
+            if on_result is not None:
+                for member, output in analysed:
+                    on_result(member, output)
+            return analysed
+
+        start = time.perf_counter()
+        rows = [row for _, row in context.iterrows()]
+        outcomes = await asyncio.gather(*(analyse(row) for row in rows), return_exceptions=True)
+        messages = []
+        failed = 0
+        for row, outcome in zip(rows, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.warning("Analysis failed: %r", outcome)
+                failed += len(_members(row, members))
+                continue
+            messages.extend(outcome)
+        messages.sort(key=lambda result: result[0]['Ref ID'])
+
+        self.last_run_stats = RunStats(
+            completed=len(messages),
+            failed=failed,
+            elapsed=time.perf_counter() - start,
+        )
+        logger.info("Analysed %d projects (%d failed) in %.1fs, %.1f projects/min",
+                    self.last_run_stats.completed, self.last_run_stats.failed,
+                    self.last_run_stats.elapsed, self.last_run_stats.throughput)
         return messages
     
-    def eval(self, results: list[tuple[pd.Series, NimbyFormat]]) -> Evaluation:
-        """Evaluate for certainty and accuracy.
+    def eval(self, results: list[tuple[pd.Series, NimbyFormat]], concurrency: int = 8,
+             log_path: str | None = 'eval_log.json') -> Evaluation:
+        """Evaluate for certainty and accuracy. Blocking wrapper around eval_async.
 
         Args:
-            results (list[tuple[pd.Series, NimbyFormat]]): _description_
+            results (list[tuple[pd.Series, NimbyFormat]]): Context and output pairs from run.
+            concurrency (int): Max in-flight evaluator calls.
+            log_path (str | None): JSONL log that per-project scores are streamed to.
 
         Returns:
-            Evaluation: _description_
+            Evaluation: Aggregate scores with per-technology and per-authority breakdowns.
         """
-        certainties = []
-        accuracies = []
+        return run_blocking(self.client, self.eval_async(results, concurrency=concurrency, log_path=log_path))
+
+    async def eval_async(self, results: list[tuple[pd.Series, NimbyFormat]], concurrency: int = 8,
+                         log_path: str | None = 'eval_log.json') -> Evaluation:
+        """Evaluate for certainty and accuracy, running evaluator calls concurrently.
 
-        accuracy_levels = {'certain': 100, 'high': 80, 'medium': 40, 'low': 0}
+        Each project's scores are appended to ``log_path`` and folded into the aggregates
+        as soon as its evaluation completes. Failed evaluations are logged and skipped.
+        Rows fanned out from one analysis (those sharing a 'Cluster' from deduplicate) are
+        evaluated once, on their representative, and its score is given to every member.
+
+        Args:
+            results (list[tuple[pd.Series, NimbyFormat]]): Context and output pairs from run.
+            concurrency (int): Max in-flight evaluator calls.
+            log_path (str | None): JSONL log that per-project scores are streamed to.
+
+        Returns:
+            Evaluation: Aggregate scores with per-technology and per-authority breakdowns.
+        """
         options = MessageOptions(max_tokens=150)
+        semaphore = asyncio.Semaphore(concurrency)
+        aggregator = EvalAggregator()
+        clusters: dict[int, list[tuple[pd.Series, NimbyFormat]]] = {}
         for row, output in results:
-            certainties.append(output.certainty)
-            prompt = prompt_evaluator(row.to_dict(), output)
-            accuracy_eval = self.client.call_json(prompt, json_model=AgentEval, options=options)
+            clusters.setdefault(row.get('Cluster', row['Ref ID']), []).append((row, output))
+        representatives = [next((result for result in members if result[0]['Ref ID'] == ref), members[0])
+                           for ref, members in clusters.items()]
+        contexts = []
+        if representatives:
+            import pandas as pd
+            contexts = self.build_contexts(pd.DataFrame([row for row, _ in representatives]), nearby=0).tolist()
+
+        async def evaluate(row: pd.Series, output: NimbyFormat, context: str,
+                           members: list[tuple[pd.Series, NimbyFormat]]) -> None:
+            async with semaphore:
+                prompt = prompt_evaluator(context, output)
+                accuracy_eval = await self.client.call_json_async(
+                    prompt, json_model=AgentEval, options=options, custom_id=f"eval-{row['Ref ID']}",
+                    stage="eval",
+                )
             agent_eval = AgentEval.model_validate_json(accuracy_eval.text.strip())
-            if agent_eval.accuracy in accuracy_levels:
-                accuracies.append(accuracy_levels[agent_eval.accuracy])
+            accuracy = ACCURACY_LEVELS.get(agent_eval.accuracy)
+            for member, member_output in members:
+                aggregator.add(member.get('Technology Type'), member.get('Planning Authority'),
+                               member_output.certainty, accuracy)
+                if log_path is not None:
+                    log_eval({
+                        'refid': int(member['Ref ID']),
+                        'certainty': member_output.certainty,
+                        'accuracy': accuracy,
+                        'reasoning': agent_eval.reasoning,
+                    }, path=log_path)
 
+        outcomes = await asyncio.gather(*(evaluate(row, output, context, members)
+                                          for (row, output), context, members
+                                          in zip(representatives, contexts, clusters.values())),
+                                        return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                logger.warning("Evaluation failed: %r", outcome)
 
-        certainty = sum(certainties)/len(certainties)
-        accuracies = sum(accuracies)/len(accuracies)
         return Evaluation(
-            certainty=certainty,
-            accuracy=accuracies
+            certainty=aggregator.overall.certainty,
+            accuracy=aggregator.overall.accuracy,
+            count=aggregator.overall.count,
+            by_technology=aggregator.breakdown(aggregator.by_technology),
+            by_authority=aggregator.breakdown(aggregator.by_authority),
         )
 
+def _members(row: pd.Series, members: dict[int, pd.DataFrame] | None) -> list[pd.Series]:
+    """Rows that share ``row``'s result: its cluster when deduplicating, else just ``row``."""
+    if members is None:
+        return [row]
+    return [member for _, member in members[row['Ref ID']].iterrows()]
+
 def log_eval(result:dict, path='eval_log.json'):
     result['timestamp'] = datetime.now().isoformat()
     with open(path, 'a') as f:
         f.write(json.dumps(result) + '\n')
 
-def main():
+def main(concurrency: int | None = None, use_cache: bool = True,
+         telemetry_path: str | None = 'telemetry.jsonl', metrics_port: int | None = None):
+    from src.processors.repd_processor import REPDProcessor
     cfg = AppConfig()
-    client = AnthropicClient(api_key=cfg.api_key, temperature= 0.9)
+    client = AnthropicClient(api_key=cfg.api_key, temperature= 0.9, rate_limiter=RateLimiter())
+    if use_cache:
+        client = CachedClient(client)
+    telemetry = Telemetry(jsonl_path=telemetry_path)
+    if metrics_port is not None:
+        telemetry.serve(metrics_port)
+    client = InstrumentedClient(client, telemetry)
     processor = REPDProcessor()
     agent = NimbyAgent(client=client, processor=processor)
-    messages = agent.run()
-    evals = agent.eval(messages)
+
+    async def analyse_and_evaluate() -> tuple[list, Evaluation]:
+        # One loop for both stages, so they share the async pool, which is closed before it ends.
+        try:
+            if concurrency is None:
+                messages = agent.run()
+            else:
+                messages = await agent.run_async(concurrency=concurrency)
+            return messages, await agent.eval_async(messages)
+        finally:
+            await client.aclose()
+
+    messages, evals = asyncio.run(analyse_and_evaluate())
     log_eval(evals.model_dump())
+    if use_cache:
+        logger.info("Response cache: %d hits, %d misses", client.stats.hits, client.stats.misses)
+    print(telemetry.format_summary())
     return messages
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     main()
@@ -0,0 +1,18 @@
+import argparse
+from src.processors.delay_stats import write_delay_stats
+from src.processors.repd_processor import REPDProcessor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write delay statistics consumed by the frontend.")
+    parser.add_argument("--out", default="../frontend/static")
+    parser.add_argument("--since", default="2015-01-01")
+    args = parser.parse_args()
+
+    df = REPDProcessor().load()
+    for name, path in write_delay_stats(df, args.out, since=args.since).items():
+        print(f'== {name} -> {path} ==')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+import argparse
+from src.processors.repd_processor import REPDProcessor
+from src.processors.tiles import TileGenerator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate vector tiles for the project point layer.")
+    parser.add_argument("--out", default="../frontend/static/tiles")
+    parser.add_argument("--min-zoom", type=int, default=0)
+    parser.add_argument("--max-zoom", type=int, default=14)
+    parser.add_argument("--cancelled-only", action="store_true")
+    args = parser.parse_args()
+
+    processor = REPDProcessor()
+    df = processor.process_pipeline()
+    if args.cancelled_only:
+        df = processor.filter_by_cancelled(df)
+    tiles = TileGenerator(df, min_zoom=args.min_zoom, max_zoom=args.max_zoom)
+    written = tiles.write_pyramid(args.out)
+    print(f'== Wrote {written} tiles to {args.out} ==')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+from dataclasses import asdict
+import json
+import logging
+from pathlib import Path
+from src.portals import BrowserPool, PortalScraper
+from src.processors.repd_processor import CANCELLED_DEVELOPMENT_TYPES, REPDProcessor
+
+logger = logging.getLogger(__name__)
+
+
+async def lookup_cancelled(processor: REPDProcessor, pool_size: int = 4, max_values: int | None = None,
+                           county: str | None = None, councils: str = "../frontend/static/councils.json") -> list[dict]:
+    """Look every cancelled project's planning application up on its council portal.
+
+    Args:
+        processor (REPDProcessor): Source of the cancelled projects.
+        pool_size (int): Browser contexts, and so lookups, run in parallel.
+        max_values (int | None): Cap on applications looked up.
+        county (str | None): Only projects in this county.
+        councils (str): councils.json mapping authorities to portal URLs.
+
+    Returns:
+        list[dict]: One record per project, with its PortalResult fields.
+    """
+    df = processor.query(status=CANCELLED_DEVELOPMENT_TYPES, county=county)
+    df = df.dropna(subset=['Planning Authority', 'Planning Application Reference'])
+    if max_values is not None:
+        df = df.head(max_values)
+    async with BrowserPool(size=pool_size) as pool:
+        scraper = PortalScraper(pool, councils=councils)
+        results = await scraper.lookup_all(zip(df['Planning Authority'], df['Planning Application Reference']))
+    return [
+        {"refid": int(ref), **asdict(results[(authority, str(reference).strip())])}
+        for ref, authority, reference in zip(df['Ref ID'], df['Planning Authority'], df['Planning Application Reference'])
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look cancelled REPD projects up on council planning portals.")
+    parser.add_argument("--output", default="outputs/portals.jsonl")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--max-values", type=int, default=None)
+    parser.add_argument("--county", default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    records = asyncio.run(lookup_cancelled(REPDProcessor(), args.pool_size, args.max_values, args.county))
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    found = sum(record["error"] is None for record in records)
+    print(f'== Found {found} of {len(records)} applications, written to {args.output} ==')
+
+
+if __name__ == '__main__':
+    main()
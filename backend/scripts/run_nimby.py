@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import logging
+from main import AppConfig, NimbyAgent, NimbyFormat
+from src.cache import CachedClient
+from src.clients import AnthropicClient, BatchClient
+from src.journal import ResultJournal
+from src.processors.repd_processor import REPDProcessor
+from src.rate_limit import RateLimiter
+from src.telemetry import InstrumentedClient, Telemetry
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def nimby_record(row: pd.Series, nimby: NimbyFormat) -> dict:
+    """Journal/nimby_score.json record for one analysed project, in the frontend's schema."""
+    return {
+        "header": nimby.header,
+        "Nimby Score": nimby.nimby_score,
+        "Accuracy Score": nimby.certainty,
+        "Interesting Tidbits": nimby.interesting_information,
+        "Snide Commentary": nimby.certainty_meta,
+        "Organised Opposition": nimby.organised_nimby,
+        "refid": int(row['Ref ID']),
+        "site_name": row['Site Name'],
+        "article_url": None,
+    }
+
+
+async def run_batch(agent: NimbyAgent, journal: ResultJournal,
+                    max_values: int | None = None, concurrency: int = 8,
+                    previous_src: str | None = None) -> int:
+    """Analyse every cancelled project not already in the journal.
+
+    Args:
+        agent (NimbyAgent): Agent used for analysis.
+        journal (ResultJournal): Journal results are appended to as they complete.
+        max_values (int | None): Cap on projects analysed this run.
+        concurrency (int): Max in-flight LLM calls.
+        previous_src (str | None): Previous REPD extract. When given only added or changed
+            records are considered, and changed ones are re-analysed even if journaled.
+
+    Returns:
+        int: Number of projects analysed this run.
+    """
+    processor = agent.repd_processor
+    if previous_src is None:
+        context = processor.filter_by_cancelled(processor.load())
+        pending = context[~context['Ref ID'].isin(journal.completed)]
+    else:
+        diff = processor.diff(previous_src)
+        logger.info("Extract diff: %s", diff.summary())
+        context = processor.filter_by_cancelled(diff.delta())
+        refresh = context['Ref ID'].isin(diff.changed['Ref ID'])
+        pending = context[refresh | ~context['Ref ID'].isin(journal.completed)]
+    logger.info("%d projects done, %d pending", len(journal), len(pending))
+    results = await agent.run_async(
+        max_values=max_values,
+        concurrency=concurrency,
+        context=pending,
+        on_result=lambda row, nimby: journal.append(nimby_record(row, nimby)),
+    )
+    return len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumable NIMBY analysis over cancelled REPD projects.")
+    parser.add_argument("--journal", default="outputs/nimby_journal.jsonl")
+    parser.add_argument("--output", default="../frontend/static/nimby_score.json")
+    parser.add_argument("--max-values", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--batch", action="store_true", help="Submit analyses through the Message Batches API.")
+    parser.add_argument("--previous", default=None, help="Previous REPD extract; only analyse the delta.")
+    parser.add_argument("--telemetry", default="outputs/telemetry.jsonl", help="JSONL file per-call telemetry is appended to.")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus metrics on this port.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    cfg = AppConfig()
+    if args.batch:
+        client = BatchClient(api_key=cfg.api_key, temperature=0.9)
+        # Every pending project must be queued at once for the batch to fill.
+        args.concurrency = client.max_batch_size
+    else:
+        client = AnthropicClient(api_key=cfg.api_key, temperature=0.9, rate_limiter=RateLimiter())
+    if not args.no_cache:
+        client = CachedClient(client)
+    telemetry = Telemetry(jsonl_path=args.telemetry)
+    if args.metrics_port is not None:
+        telemetry.serve(args.metrics_port)
+    client = InstrumentedClient(client, telemetry)
+    agent = NimbyAgent(client=client, processor=REPDProcessor())
+    journal = ResultJournal(args.journal)
+    published = journal.mark_published(args.output)
+    if published:
+        logger.info("Skipping %d projects already published in %s", published, args.output)
+    try:
+        analysed = asyncio.run(run_batch(agent, journal, args.max_values, args.concurrency, args.previous))
+    finally:
+        journal.close()
+    written = journal.compact(args.output)
+    print(f'== Analysed {analysed} projects, {written} written to {args.output} ==')
+    print(telemetry.format_summary())
+
+
+if __name__ == '__main__':
+    main()
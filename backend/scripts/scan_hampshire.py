@@ -1,12 +1,11 @@
-from src.processors.repd_processor import REPDProcessor
+from src.processors.repd_processor import CANCELLED_DEVELOPMENT_TYPES, REPDProcessor
 
 def main():
     print(f'== Scanning Hampshire ==')
     processor = REPDProcessor()
     date_str = "2025-01-01"
-    df = processor.process_pipeline(date=date_str)
-    df = processor.filter_by_cancelled(df=df)
-    df = df[df['County'] == 'Hampshire']
+    df = processor.query(status=CANCELLED_DEVELOPMENT_TYPES, county='Hampshire',
+                         date_range=(date_str, None))
     df.to_csv(f'outputs/hampshire-{date_str}.csv')
     print(df)
 
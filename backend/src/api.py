@@ -0,0 +1,174 @@
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import date
+import hashlib
+import json
+import os
+import orjson
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from src.processors.repd_processor import REPDProcessor
+from src.processors.tiles import TILE_MEDIA_TYPE, TileGenerator
+
+
+@dataclass
+class ApiConfig:
+    repd_src: str = os.getenv('REPD_SRC', "src/data/REPD_Publication_Q3_2025.csv")
+    nimby_path: str = os.getenv('NIMBY_SCORE_PATH', "../frontend/static/nimby_score.json")
+    councils_path: str = os.getenv('COUNCILS_PATH', "../frontend/static/councils.json")
+
+
+MAX_PAGE_SIZE = 5000
+
+
+def _load_json(path: str, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def etag_response(request: Request, payload) -> Response:
+    """Serialise ``payload`` with a content ETag, answering 304 when the client already has it."""
+    body = orjson.dumps(payload)
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=0, must-revalidate"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _parse_bbox(bbox: str) -> tuple[float, float, float, float]:
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def filter_projects(processor: REPDProcessor,
+                    technology: list[str] | None = None,
+                    status: list[str] | None = None,
+                    planning_authority: str | None = None,
+                    date_from: date | None = None,
+                    date_to: date | None = None,
+                    date_col: str = 'Record Last Updated (dd/mm/yyyy)',
+                    bbox: str | None = None) -> pd.DataFrame:
+    """Apply the API's query filters to the preloaded projects through the processor's query index.
+
+    Only located rows are returned, so a page's features always match the rows counted in ``total``.
+    """
+    date_range = (date_from, date_to) if date_from is not None or date_to is not None else None
+    df = processor.query(technology=technology or None, status=status or None,
+                         authority=planning_authority, date_range=date_range, date_col=date_col)
+    if bbox is not None:
+        in_view = processor.query_bbox(*_parse_bbox(bbox))
+        df = df[df.index.isin(in_view.index)]
+    return df[df['lat'].notna() & df['lon'].notna()]
+
+
+def create_app(processor: REPDProcessor | None = None, config: ApiConfig | None = None) -> FastAPI:
+    """Build the API. REPD data, spatial index and NIMBY scores are loaded once at startup."""
+    config = config or ApiConfig()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.processor = processor or REPDProcessor(src=config.repd_src)
+        app.state.projects = app.state.processor.process_pipeline()
+        app.state.nimby = {record.get('refid'): record for record in _load_json(config.nimby_path, [])}
+        app.state.councils = _load_json(config.councils_path, {})
+        app.state.tiles = TileGenerator(app.state.projects)
+        yield
+
+    app = FastAPI(title="Clean Energy Graveyard", lifespan=lifespan)
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+    @app.get("/projects")
+    def get_projects(request: Request,
+                     technology: list[str] | None = Query(None),
+                     status: list[str] | None = Query(None),
+                     planning_authority: str | None = None,
+                     date_from: date | None = None,
+                     date_to: date | None = None,
+                     bbox: str | None = None,
+                     properties: list[str] | None = Query(None),
+                     limit: int = Query(500, ge=1, le=MAX_PAGE_SIZE),
+                     offset: int = Query(0, ge=0)):
+        """Projects as a GeoJSON FeatureCollection, filtered and paginated.
+
+        ``total`` counts the located projects matching the filters; projects without
+        coordinates are never served.
+        """
+        state = request.app.state
+        df = filter_projects(state.processor,
+                             technology=technology, status=status,
+                             planning_authority=planning_authority,
+                             date_from=date_from, date_to=date_to, bbox=bbox)
+        page = df.iloc[offset:offset + limit]
+        if properties is not None:
+            unknown = set(properties) - set(df.columns)
+            if unknown:
+                raise HTTPException(status_code=422, detail=f"Unknown properties: {sorted(unknown)}")
+        geojson = state.processor.create_geojson(page, properties=properties)
+        geojson["total"] = len(df)
+        geojson["offset"] = offset
+        geojson["limit"] = limit
+        return etag_response(request, geojson)
+
+    @app.get("/projects/{ref_id}")
+    def get_project(request: Request, ref_id: int):
+        state = request.app.state
+        # process_pipeline drops unlocated rows, so every match has a feature.
+        match = state.projects[state.projects['Ref ID'] == ref_id]
+        if match.empty:
+            raise HTTPException(status_code=404, detail=f"Project {ref_id} not found")
+        return etag_response(request, state.processor.create_geojson(match)["features"][0])
+
+    @app.get("/tiles/{z}/{x}/{y}.pbf")
+    def get_tile(request: Request, z: int, x: int, y: int):
+        """Mapbox Vector Tile of the project point layer."""
+        tiles = request.app.state.tiles
+        if not tiles.min_zoom <= z <= tiles.max_zoom or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise HTTPException(status_code=404, detail=f"Tile {z}/{x}/{y} out of range")
+        data = tiles.tile(z, x, y)
+        if not data:
+            return Response(status_code=204)
+        return Response(content=data, media_type=TILE_MEDIA_TYPE,
+                        headers={"Cache-Control": "public, max-age=86400"})
+
+    @app.get("/nimby-scores")
+    def get_nimby_scores(request: Request,
+                         refid: list[int] | None = Query(None),
+                         limit: int = Query(500, ge=1, le=MAX_PAGE_SIZE),
+                         offset: int = Query(0, ge=0)):
+        """NIMBY scores, optionally restricted to the given Ref IDs."""
+        nimby = request.app.state.nimby
+        records = [nimby[r] for r in refid if r in nimby] if refid else list(nimby.values())
+        return etag_response(request, {
+            "total": len(records),
+            "offset": offset,
+            "limit": limit,
+            "items": records[offset:offset + limit],
+        })
+
+    @app.get("/nimby-scores/{refid}")
+    def get_nimby_score(request: Request, refid: int):
+        record = request.app.state.nimby.get(refid)
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"No NIMBY score for {refid}")
+        return etag_response(request, record)
+
+    @app.get("/councils")
+    def get_councils(request: Request, planning_authority: str | None = None):
+        councils = request.app.state.councils
+        if planning_authority is not None:
+            if planning_authority not in councils:
+                raise HTTPException(status_code=404, detail=f"Unknown planning authority {planning_authority}")
+            councils = {planning_authority: councils[planning_authority]}
+        return etag_response(request, councils)
+
+    return app
+
+
+app = create_app()
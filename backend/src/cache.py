@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+import hashlib
+import json
+import logging
+from pathlib import Path
+import pickle
+import sqlite3
+import threading
+import time
+from pydantic import BaseModel
+from src.clients import BaseClient, MessageOptions, MessageResponse
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a response cache."""
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResponseStore:
+    """SQLite-backed key/value store with TTL expiry and size-bounded LRU eviction."""
+
+    def __init__(self, path: str = "src/data/.cache/responses.sqlite",
+                 max_bytes: int = 256 * 1024 * 1024,
+                 ttl: float | None = 30 * 24 * 3600):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    def get(self, key: str) -> bytes | None:
+        """Fetch a value, dropping it instead if it has outlived the TTL."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def put(self, key: str, value: bytes) -> None:
+        """Store a value, evicting least recently used entries beyond ``max_bytes``."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        logger.debug("Evicted %d cached responses", len(evicted))
+
+    def size(self) -> int:
+        """Total bytes currently stored."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class CachedClient:
+    """BaseClient wrapper that serves repeated prompts from an on-disk response cache.
+
+    Keys are content addressed over the model, sampling settings, prompt, JSON schema
+    and tools, so any change to a prompt builder or schema is a miss.
+    """
+
+    def __init__(self, client: BaseClient, store: ResponseStore | None = None):
+        self.client = client
+        self.api_key = client.api_key
+        self.store = store if store is not None else ResponseStore()
+        self.stats = CacheStats()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def key(self, method: str, prompt, options: MessageOptions,
+            json_model: type[BaseModel] | None = None, **kwargs) -> str:
+        """Content address for a call."""
+        return _digest({
+            "method": method,
+            "model": getattr(self.client, "model", None),
+            "temperature": getattr(self.client, "temperature", None),
+            "max_tokens": options.max_tokens,
+            "prompt": _digest(prompt),
+            "schema": _digest(json_model.model_json_schema()) if json_model is not None else None,
+            "tools": kwargs.get("tools"),
+        })
+
+    def _lookup(self, key: str) -> MessageResponse | None:
+        value = self.store.get(key)
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        response = pickle.loads(value)
+        response.cached = True
+        return response
+
+    def _save(self, key: str, response: MessageResponse) -> MessageResponse:
+        try:
+            self.store.put(key, pickle.dumps(response))
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning("Response not cacheable: %r", e)
+        return response
+
+    def call(self, prompt: str, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        key = self.key("call", prompt, options, **kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        return self._save(key, self.client.call(prompt, options=options, **kwargs))
+
+    def call_json(self, prompt: str, json_model: BaseModel, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        key = self.key("call_json", prompt, options, json_model=json_model, **kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        return self._save(key, self.client.call_json(prompt, json_model=json_model, options=options, **kwargs))
+
+    async def call_async(self, prompt: str, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        key = self.key("call_async", prompt, options, **kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        return self._save(key, await self.client.call_async(prompt, options=options, **kwargs))
+
+    async def call_json_async(self, prompt: str, json_model: BaseModel, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        key = self.key("call_json_async", prompt, options, json_model=json_model, **kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        return self._save(
+            key, await self.client.call_json_async(prompt, json_model=json_model, options=options, **kwargs)
+        )
@@ -1,8 +1,14 @@
+import asyncio
 from dataclasses import dataclass
+from functools import cached_property
+import json
 import logging
-from typing import Protocol
-import anthropic
+import re
+import time
+from typing import Callable, Protocol
 from pydantic import BaseModel
+from src.prompts import Prompt
+from src.rate_limit import RETRYABLE_STATUS_CODES, RateLimiter, RetryPolicy, retry_after
 
 
 logger = logging.getLogger(__name__)   
@@ -20,6 +26,23 @@ class MessageResponse:
     input_tokens: int
     output_tokens:int
     metadata: dict | None = None
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    retries: int = 0
+    cached: bool = False
+
+    @classmethod
+    def from_usage(cls, text, usage, metadata: dict | None = None, retries: int = 0) -> "MessageResponse":
+        """Build a response from an Anthropic usage block, including prompt cache counts."""
+        return cls(
+            text=text,
+            metadata=metadata,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cache_read_input_tokens=getattr(usage, "cache_read_input_tokens", None) or 0,
+            cache_creation_input_tokens=getattr(usage, "cache_creation_input_tokens", None) or 0,
+            retries=retries,
+        )
 
 class BaseClient(Protocol):
     """Base class for clients that interact with LLMS"""
@@ -30,106 +53,373 @@ class BaseClient(Protocol):
     def call_json(self, prompt:str, json_model:BaseModel, options: MessageOptions=MessageOptions(), **kwargs) -> MessageResponse:
         """Make a call to the LLM with given prompt and json serializable model, return as valid json."""
         ...
-    
+
+    async def call_async(self, prompt: str, options: MessageOptions=MessageOptions(), **kwargs) -> MessageResponse:
+        """Async version of call, returning the concatenated response text."""
+        ...
+
     async def call_json_async(self, prompt:str, json_model:BaseModel, options: MessageOptions=MessageOptions(), **kwargs) -> MessageResponse:
         """Make a call to the LLM with given prompt and json serializable model, return as valid json."""
         ...
 
+    async def stream_json_async(self, prompt:str, json_model:BaseModel, options: MessageOptions=MessageOptions(),
+                                stop_when: Callable[[str], bool] | None = None, **kwargs) -> MessageResponse:
+        """Streaming call_json_async, stopping early once ``stop_when`` holds for the text so far."""
+        ...
+
+def run_blocking(client: BaseClient, coro):
+    """Run ``coro`` in a fresh event loop, closing ``client``'s async pool before the loop ends.
+
+    The async connection pool is bound to the loop that opened it, so every blocking
+    wrapper that starts its own loop has to close the pool again; the next one reopens it.
+    """
+    async def run():
+        try:
+            return await coro
+        finally:
+            aclose = getattr(client, "aclose", None)
+            if aclose is not None:
+                await aclose()
+    return asyncio.run(run())
+
+WEB_SEARCH_TOOL = {
+    "type": "web_search_20250305",
+    "name": "web_search",
+    "max_uses": 5
+}
+
 class AnthropicClient:
-    """Client for interacting with Anthropic's Claude models."""
+    """Client for interacting with Anthropic's Claude models.
+
+    A single AsyncClient (and its connection pool) is shared by every async call, so
+    concurrent pipeline stages reuse connections instead of opening their own.
+
+    Both paths go through the same optional RateLimiter and retry 429/529 overloads and
+    connection errors with jittered exponential backoff, honouring retry-after.
+    """
     def __init__(self, api_key: str, 
                  model: str = "claude-sonnet-4-5", 
-                 temperature: float = 1.0):
+                 temperature: float = 1.0,
+                 max_connections: int = 20,
+                 rate_limiter: RateLimiter | None = None,
+                 retry: RetryPolicy | None = RetryPolicy()):
         self.api_key = api_key
         self.model = model
         self.temperature = temperature
-        self.client = anthropic.Client(api_key=api_key)
-        self.async_client = anthropic.AsyncClient(api_key=api_key)
+        self.rate_limiter = rate_limiter
+        self.retry = retry
+        self.max_connections = max_connections
 
-    def call(self, prompt: str, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
-        message = {
-            "role": "user",
-            "content": prompt
-        }
-        tools = []
-        if kwargs.get('tools'):
-            tools = [{
-                "type": "web_search_20250305",
-                "name": "web_search",
-                "max_uses": 5
-            }]
-
-        response = self.client.messages.create(
-            model=self.model,
-            temperature=self.temperature,
-            max_tokens=options.max_tokens,
-            messages=[message],
-            tools=tools,
-        )
+    def _sdk_retries(self) -> int:
+        # Retries are handled here so they can share the limiter; the SDK's own are disabled.
+        import anthropic
+        return 0 if self.retry is not None else anthropic.DEFAULT_MAX_RETRIES
 
+    @cached_property
+    def client(self):
+        """Sync SDK client, built on first use."""
+        import anthropic
+        return anthropic.Client(api_key=self.api_key, max_retries=self._sdk_retries())
 
-        message = MessageResponse(
-            text=response,
-            input_tokens=response.usage.input_tokens,
-            output_tokens=response.usage.output_tokens
+    @cached_property
+    def async_client(self):
+        """Async SDK client and its shared connection pool, built on first use."""
+        import anthropic
+        import httpx
+        return anthropic.AsyncClient(
+            api_key=self.api_key,
+            max_retries=self._sdk_retries(),
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            ),
         )
 
-        return message
-    def call_json(self, prompt:str, json_model:BaseModel, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
-        message = {
-            "role": "user",
-            "content": prompt
+    def _request(self, prompt: str | Prompt, options: MessageOptions, json_model: type[BaseModel] | None = None, **kwargs) -> dict:
+        """Build messages.create arguments shared by the sync and async paths.
+
+        A Prompt's static prefix is sent as a cache-controlled system block. Pass
+        ``history`` (later assistant/user turns) to continue a multi-turn conversation.
+        """
+        request = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": options.max_tokens,
+            "messages": [{
+                "role": "user",
+                "content": prompt.user if isinstance(prompt, Prompt) else prompt
+            }, *(kwargs.get('history') or [])],
         }
-        web_tools = {}
-        if kwargs.get('tools'):
-            web_tools = {
-                "type": "web_search_20250305",
-                "name": "web_search",
-                "max_uses": 5
-            }
-            
-
-        response = self.client.messages.create(
-            model = self.model,
-            temperature=self.temperature,
-            max_tokens=options.max_tokens,
-            messages=[message],
-            output_config={
+        if isinstance(prompt, Prompt):
+            request["system"] = prompt.system_blocks()
+        if json_model is not None:
+            import anthropic
+            request["output_config"] = {
                 "format": {
                     "type": "json_schema",
                     "schema": anthropic.transform_schema(json_model)
                 }
-            },
-            tools=[web_tools]
+            }
+        if kwargs.get('tools'):
+            request["tools"] = [WEB_SEARCH_TOOL]
+        return request
+
+    @staticmethod
+    def _text_response(response, retries: int = 0) -> MessageResponse:
+        """Flatten a Message into its text, keeping stop reason and raw blocks in metadata."""
+        return MessageResponse.from_usage(
+            text="".join(block.text for block in response.content if block.type == "text"),
+            usage=response.usage,
+            metadata={"stop_reason": response.stop_reason, "content": response.content},
+            retries=retries,
         )
-        message = MessageResponse(
-            text=response,
-            input_tokens=response.usage.input_tokens,
-            output_tokens=response.usage.output_tokens
+
+    @staticmethod
+    def _estimate_tokens(request: dict) -> int:
+        """Rough input token count (~4 characters per token) used to reserve rate-limit budget."""
+        return len(json.dumps([request.get("system"), request["messages"]], default=str)) // 4
+
+    def _reserve(self, request: dict) -> tuple[int, float]:
+        estimate = self._estimate_tokens(request)
+        wait = self.rate_limiter.reserve(estimate) if self.rate_limiter is not None else 0.0
+        return estimate, wait
+
+    def _settle(self, raw, estimate: int):
+        response = raw.parse()
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe_headers(raw.headers)
+            self.rate_limiter.record(estimate, response.usage.input_tokens, response.usage.output_tokens)
+        return response
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Backoff before the next attempt, re-raising errors that should not be retried."""
+        import anthropic
+        status = getattr(error, "status_code", None)
+        retryable = isinstance(error, anthropic.APIConnectionError) or status in RETRYABLE_STATUS_CODES
+        if self.retry is None or not retryable or attempt >= self.retry.max_retries:
+            raise error
+        response = getattr(error, "response", None)
+        delay = self.retry.delay(attempt, retry_after(getattr(response, "headers", None)))
+        logger.warning("Anthropic call failed (%s), retry %d in %.1fs", status or type(error).__name__, attempt + 1, delay)
+        if self.rate_limiter is not None and status in (429, 529):
+            # Throttling applies to every caller; the pause is served by the next reserve.
+            self.rate_limiter.pause(delay)
+            return 0.0
+        return delay
+
+    def _create(self, request: dict):
+        """messages.create with rate limiting and retries. Returns (message, retries)."""
+        import anthropic
+        attempt = 0
+        while True:
+            estimate, wait = self._reserve(request)
+            if wait:
+                time.sleep(wait)
+            try:
+                return self._settle(self.client.messages.with_raw_response.create(**request), estimate), attempt
+            except anthropic.APIError as e:
+                delay = self._retry_delay(e, attempt)
+                if delay:
+                    time.sleep(delay)
+            attempt += 1
+
+    async def _acreate(self, request: dict):
+        """Async messages.create with rate limiting and retries. Returns (message, retries)."""
+        import anthropic
+        attempt = 0
+        while True:
+            estimate, wait = self._reserve(request)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                raw = await self.async_client.messages.with_raw_response.create(**request)
+                return self._settle(raw, estimate), attempt
+            except anthropic.APIError as e:
+                delay = self._retry_delay(e, attempt)
+                if delay:
+                    await asyncio.sleep(delay)
+            attempt += 1
+
+    def call(self, prompt: str, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        response, retries = self._create(self._request(prompt, options, **kwargs))
+        return self._text_response(response, retries)
+
+    def call_json(self, prompt:str, json_model:BaseModel, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        response, retries = self._create(self._request(prompt, options, json_model=json_model, **kwargs))
+        return self._text_response(response, retries)
+
+    async def call_async(self, prompt: str, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        response, retries = await self._acreate(self._request(prompt, options, **kwargs))
+        return self._text_response(response, retries)
+
+    async def call_json_async(self, prompt:str, json_model:BaseModel, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        response, retries = await self._acreate(
+            self._request(prompt, options, json_model=json_model, **kwargs)
         )
-        return message
-    
-    def call_json_async(self, prompt:str, json_model:BaseModel, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
-        message = {
-            "role": "user",
-            "content": prompt
-        }
-        response = self.async_client.messages.create(
-            model = self.model,
-            temperature=self.temperature,
-            max_tokens=options.max_tokens,
-            messages=[message],
-            output_config={
-                "format": {
-                    "type": "json_schema",
-                    "schema": anthropic.transform_schema(json_model)
-                }
-            }
+        return self._text_response(response, retries)
+
+    async def _astream(self, request: dict, stop_when: Callable[[str], bool] | None = None):
+        """Stream messages.create with rate limiting and retries. Returns (message, retries).
+
+        Text is accumulated as it arrives; once ``stop_when(text)`` is true the stream is
+        closed and the message snapshot so far is returned, skipping the rest of the turn.
+        """
+        import anthropic
+        attempt = 0
+        while True:
+            estimate, wait = self._reserve(request)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                async with self.async_client.messages.stream(**request) as stream:
+                    text = ""
+                    async for delta in stream.text_stream:
+                        text += delta
+                        if stop_when is not None and stop_when(text):
+                            break
+                    response = stream.current_message_snapshot
+                    headers = stream.response.headers
+                break
+            except anthropic.APIError as e:
+                delay = self._retry_delay(e, attempt)
+                if delay:
+                    await asyncio.sleep(delay)
+            attempt += 1
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe_headers(headers)
+            self.rate_limiter.record(estimate, response.usage.input_tokens, response.usage.output_tokens)
+        return response, attempt
+
+    async def stream_json_async(self, prompt: str, json_model: BaseModel, options: MessageOptions = MessageOptions(),
+                                stop_when: Callable[[str], bool] | None = None, **kwargs) -> MessageResponse:
+        """Streaming call_json_async that can stop reading as soon as ``stop_when(text)`` holds."""
+        response, retries = await self._astream(
+            self._request(prompt, options, json_model=json_model, **kwargs), stop_when
         )
-        message = MessageResponse(
-            text=response.content[0].text,
-            metadata=None,
-            input_tokens=response.usage.input_tokens,
-            output_tokens=response.usage.output_tokens
+        return self._text_response(response, retries)
+
+    async def aclose(self) -> None:
+        """Close the shared async connection pool, if it was ever opened.
+
+        The next async call opens a new pool, so the client can be reused from another loop.
+        """
+        if "async_client" in self.__dict__:
+            await self.__dict__.pop("async_client").close()
+
+
+class BatchError(RuntimeError):
+    """A request in a message batch did not succeed."""
+
+
+class BatchClient(AnthropicClient):
+    """Client that routes calls through the Message Batches API.
+
+    Async calls are queued rather than sent. Once no new call has arrived for
+    ``collect_delay`` seconds, or ``max_batch_size`` calls are queued, the queue is
+    submitted as one batch, polled until it ends, and each caller receives its own
+    result, matched by custom ID. Drive it with many concurrent callers (e.g.
+    NimbyAgent.run_async with a high concurrency) so batches fill up.
+
+    Pass ``custom_id`` to a call to label its request, e.g. with a Ref ID.
+    """
+    def __init__(self, api_key: str,
+                 model: str = "claude-sonnet-4-5",
+                 temperature: float = 1.0,
+                 max_batch_size: int = 10000,
+                 collect_delay: float = 1.0,
+                 poll_interval: float = 30.0,
+                 batches=None):
+        super().__init__(api_key=api_key, model=model, temperature=temperature)
+        self._batches = batches
+        self.max_batch_size = max_batch_size
+        self.collect_delay = collect_delay
+        self.poll_interval = poll_interval
+        self._pending: list[tuple[str, dict, asyncio.Future]] = []
+        self._used_ids: set[str] = set()
+        self._collector: asyncio.Task | None = None
+        self._submissions: set[asyncio.Task] = set()
+
+    @property
+    def batches(self):
+        """Message Batches resource of the shared async client, unless one was passed in."""
+        return self._batches if self._batches is not None else self.async_client.messages.batches
+
+    def _custom_id(self, custom_id: str | None) -> str:
+        """Unique, API-valid custom ID for the current queue."""
+        base = re.sub(r"[^a-zA-Z0-9_-]", "-", str(custom_id))[:56] if custom_id else "req"
+        candidate, n = base, 1
+        while candidate in self._used_ids:
+            n += 1
+            candidate = f"{base}-{n}"
+        self._used_ids.add(candidate)
+        return candidate
+
+    async def _enqueue(self, request: dict, custom_id: str | None) -> MessageResponse:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((self._custom_id(custom_id), request, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._collector is None or self._collector.done():
+            self._collector = asyncio.create_task(self._flush_when_idle())
+        return await future
+
+    async def _flush_when_idle(self) -> None:
+        while True:
+            queued = len(self._pending)
+            await asyncio.sleep(self.collect_delay)
+            if len(self._pending) == queued:
+                break
+        self._flush()
+
+    def _flush(self) -> None:
+        items, self._pending, self._used_ids = self._pending, [], set()
+        if not items:
+            return
+        task = asyncio.create_task(self._submit(items))
+        self._submissions.add(task)
+        task.add_done_callback(self._submissions.discard)
+
+    async def _submit(self, items: list[tuple[str, dict, asyncio.Future]]) -> None:
+        try:
+            batch = await self.batches.create(
+                requests=[{"custom_id": custom_id, "params": params} for custom_id, params, _ in items]
+            )
+            logger.info("Submitted batch %s with %d requests", batch.id, len(items))
+            while batch.processing_status != "ended":
+                await asyncio.sleep(self.poll_interval)
+                batch = await self.batches.retrieve(batch.id)
+            results = {}
+            async for entry in await self.batches.results(batch.id):
+                results[entry.custom_id] = entry.result
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for custom_id, _, future in items:
+            if future.done():
+                continue
+            result = results.get(custom_id)
+            if result is None:
+                future.set_exception(BatchError(f"{custom_id}: missing from batch {batch.id} results"))
+            elif result.type == "succeeded":
+                future.set_result(self._text_response(result.message))
+            else:
+                future.set_exception(BatchError(f"{custom_id}: {result.type}"))
+
+    async def call_async(self, prompt: str, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        return await self._enqueue(self._request(prompt, options, **kwargs), kwargs.get('custom_id'))
+
+    async def call_json_async(self, prompt:str, json_model:BaseModel, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        return await self._enqueue(
+            self._request(prompt, options, json_model=json_model, **kwargs), kwargs.get('custom_id')
         )
-        return message
\ No newline at end of file
+
+    def call(self, prompt: str, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        """Submit a single-request batch and block until it ends."""
+        return run_blocking(self, self.call_async(prompt, options=options, **kwargs))
+
+    def call_json(self, prompt:str, json_model:BaseModel, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        """Submit a single-request batch and block until it ends."""
+        return run_blocking(self, self.call_json_async(prompt, json_model=json_model, options=options, **kwargs))
@@ -0,0 +1,217 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from functools import cached_property
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import Callable
+from src.cache import ResponseStore
+from src.sources import SourceFetcher
+
+
+logger = logging.getLogger(__name__)
+
+PDF_TYPES = ("application/pdf", "application/x-pdf")
+
+
+class DocumentTooLarge(ValueError):
+    """A download exceeded the ingester's max_bytes."""
+
+
+@dataclass
+class DocumentText:
+    """Text extracted from one document, up to the ingester's character budget.
+
+    ``pages_read`` counts the pages actually parsed; once the budget is spent the
+    remaining pages are never touched and ``truncated`` is set.
+    """
+    url: str | None
+    digest: str
+    size: int
+    page_count: int | None = None
+    pages_read: int = 0
+    text: str = ""
+    truncated: bool = False
+    cache: str = "miss"
+    error: str | None = None
+
+
+def extract_pdf_text(path: str, max_chars: int = 20000) -> dict:
+    """Extract text from a PDF page by page until ``max_chars`` is reached.
+
+    Runs in a worker process. pypdf reads pages lazily from the file, so only the
+    pages needed to fill the budget are parsed and the document is never held in
+    memory whole.
+
+    Args:
+        path (str): PDF on disk.
+        max_chars (int): Character budget.
+
+    Returns:
+        dict: page_count, pages_read, text and truncated.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ImportError("PDF ingestion needs pypdf: pip install 'repd-backend[pdf]'") from e
+
+    reader = PdfReader(path)
+    page_count = len(reader.pages)
+    pieces, total, pages_read = [], 0, 0
+    for page in reader.pages:
+        text = (page.extract_text() or "").strip()
+        pages_read += 1
+        if text:
+            pieces.append(text)
+            total += len(text) + 2
+        if total >= max_chars:
+            break
+    text = "\n\n".join(pieces)
+    return {
+        "page_count": page_count,
+        "pages_read": pages_read,
+        "text": text[:max_chars],
+        "truncated": len(text) > max_chars or pages_read < page_count,
+    }
+
+
+class DocumentIngester:
+    """Downloads planning documents to disk and extracts their text in a process pool.
+
+    Downloads are streamed to a spool file while being hashed, through the
+    SourceFetcher's connection pool and per-host limits, so memory stays flat
+    however large the bundle. Extraction is CPU-bound and runs in worker processes,
+    keeping the event loop free. Extracted text is cached by content hash, so the
+    same document served from several URLs is parsed once.
+
+    The ingester attaches itself to ``fetcher``, so a PDF found while fetching research
+    sources is spooled from that same response rather than downloaded a second time.
+    """
+    content_types = PDF_TYPES
+
+    def __init__(self, fetcher: SourceFetcher | None = None,
+                 store: ResponseStore | None = None,
+                 spool_dir: str | None = None,
+                 max_chars: int = 20000,
+                 max_bytes: int = 200 * 1024 * 1024,
+                 max_workers: int | None = None,
+                 extract: Callable[[str, int], dict] = extract_pdf_text):
+        self.fetcher = fetcher if fetcher is not None else SourceFetcher()
+        self.fetcher.documents = self
+        self.store = store if store is not None else ResponseStore("src/data/.cache/documents.sqlite", ttl=None)
+        self.spool_dir = spool_dir
+        self.max_chars = max_chars
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self.extract = extract
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    @cached_property
+    def pool(self) -> ProcessPoolExecutor:
+        """Worker processes for extraction, started on first use."""
+        # Spawn rather than fork: the parent holds sockets, SQLite handles and threads.
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def __aenter__(self) -> "DocumentIngester":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the worker processes, if they were ever started."""
+        if "pool" in self.__dict__:
+            self.pool.shutdown()
+            del self.__dict__["pool"]
+
+    def _key(self, digest: str) -> str:
+        return f"{digest}:{self.max_chars}"
+
+    async def spool_response(self, url: str, response) -> tuple[Path, str, int]:
+        """Stream an open httpx response into a spool file. Returns (path, content digest, size)."""
+        digest = hashlib.blake2b(digest_size=16)
+        size = 0
+        spool = tempfile.NamedTemporaryFile(dir=self.spool_dir, suffix=".pdf", delete=False)
+        try:
+            with spool:
+                async for chunk in response.aiter_bytes(1 << 16):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise DocumentTooLarge(f"{url} exceeds {self.max_bytes} bytes")
+                    digest.update(chunk)
+                    spool.write(chunk)
+        except BaseException:
+            os.unlink(spool.name)
+            raise
+        return Path(spool.name), digest.hexdigest(), size
+
+    async def _spool(self, url: str) -> tuple[Path, str, int]:
+        async with self.fetcher.host_limit(url):
+            async with self.fetcher.client.stream("GET", url) as response:
+                response.raise_for_status()
+                return await self.spool_response(url, response)
+
+    async def _extract(self, path: Path, digest: str, size: int, url: str | None) -> DocumentText:
+        key = self._key(digest)
+        cached = self.store.get(key)
+        if cached is not None:
+            return replace(DocumentText(**json.loads(cached)), url=url, cache="hit")
+        task = self._inflight.get(key)
+        if task is not None:
+            # Same content already being parsed for another URL.
+            return replace(await asyncio.shield(task), url=url, cache="hit")
+        task = asyncio.ensure_future(self._run_extract(path, digest, size, url))
+        self._inflight[key] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _run_extract(self, path: Path, digest: str, size: int, url: str | None) -> DocumentText:
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        extracted = await loop.run_in_executor(self.pool, self.extract, str(path), self.max_chars)
+        logger.debug("Extracted %d/%d pages of %s in %.2fs", extracted["pages_read"],
+                     extracted["page_count"], url or path, time.perf_counter() - start)
+        document = DocumentText(url=url, digest=digest, size=size, **extracted)
+        self.store.put(self._key(digest), json.dumps(asdict(document)).encode())
+        return document
+
+    async def extract_spooled(self, url: str | None, path: Path, digest: str, size: int) -> DocumentText:
+        """Extract a document from spool_response, removing the spool file afterwards."""
+        try:
+            return await self._extract(path, digest, size, url)
+        finally:
+            path.unlink(missing_ok=True)
+
+    async def ingest(self, url: str) -> DocumentText:
+        """Download and extract one document."""
+        return await self.extract_spooled(url, *await self._spool(url))
+
+    async def ingest_file(self, path: str | Path) -> DocumentText:
+        """Extract a document already on disk."""
+        from src.processors.snapshot import file_hash
+        path = Path(path)
+        return await self._extract(path, file_hash(path), path.stat().st_size, None)
+
+    async def ingest_all(self, urls: list[str]) -> dict[str, DocumentText]:
+        """Download and extract many documents concurrently; failures are recorded per URL.
+
+        Returns:
+            dict[str, DocumentText]: Document per URL, in first-seen order.
+        """
+        unique = list(dict.fromkeys(urls))
+        outcomes = await asyncio.gather(*(self.ingest(url) for url in unique), return_exceptions=True)
+        documents = {}
+        for url, outcome in zip(unique, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.warning("Document ingestion failed for %s: %r", url, outcome)
+                outcome = DocumentText(url=url, digest="", size=0, error=repr(outcome))
+            documents[url] = outcome
+        return documents
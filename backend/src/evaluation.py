@@ -0,0 +1,47 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+
+@dataclass
+class RunningScores:
+    """Running certainty/accuracy means for one group of evaluated projects."""
+    count: int = 0
+    certainty_total: float = 0.0
+    accuracy_count: int = 0
+    accuracy_total: float = 0.0
+
+    def add(self, certainty: float, accuracy: float | None) -> None:
+        self.count += 1
+        self.certainty_total += certainty
+        if accuracy is not None:
+            self.accuracy_count += 1
+            self.accuracy_total += accuracy
+
+    @property
+    def certainty(self) -> float:
+        return self.certainty_total / self.count if self.count else 0.0
+
+    @property
+    def accuracy(self) -> float:
+        return self.accuracy_total / self.accuracy_count if self.accuracy_count else 0.0
+
+    def as_dict(self) -> dict:
+        return {"certainty": self.certainty, "accuracy": self.accuracy, "count": self.count}
+
+
+@dataclass
+class EvalAggregator:
+    """Incrementally aggregates evaluation scores overall and per technology / planning authority."""
+    overall: RunningScores = field(default_factory=RunningScores)
+    by_technology: dict[str, RunningScores] = field(default_factory=lambda: defaultdict(RunningScores))
+    by_authority: dict[str, RunningScores] = field(default_factory=lambda: defaultdict(RunningScores))
+
+    def add(self, technology: str | None, authority: str | None,
+            certainty: float, accuracy: float | None) -> None:
+        """Fold one project's scores into every aggregate it belongs to."""
+        self.overall.add(certainty, accuracy)
+        self.by_technology[str(technology)].add(certainty, accuracy)
+        self.by_authority[str(authority)].add(certainty, accuracy)
+
+    def breakdown(self, groups: dict[str, RunningScores]) -> dict[str, dict]:
+        return {name: scores.as_dict() for name, scores in sorted(groups.items())}
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+import re
+
+
+# Elements that never hold article text.
+BOILERPLATE_TAGS = ['script', 'style', 'noscript', 'nav', 'footer', 'header', 'aside', 'form', 'iframe', 'svg']
+
+# Containers whose paragraphs are preferred when picking the main content.
+CONTENT_HINTS = re.compile(r"article|content|story|post|entry|main|body-text", re.I)
+NOISE_HINTS = re.compile(r"comment|share|related|promo|cookie|newsletter|sidebar|advert|footer|nav", re.I)
+
+MIN_PARAGRAPH_CHARS = 40
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class Article:
+    """Main content extracted from an HTML page."""
+    title: str | None
+    text: str
+
+
+def _clean(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _container_score(element) -> float:
+    """Bonus/penalty for a paragraph container from its tag, class and id."""
+    if element.tag in ('article', 'main') or element.get('role') == 'main':
+        return 2.0
+    hints = f"{element.get('class', '')} {element.get('id', '')}"
+    if NOISE_HINTS.search(hints):
+        return 0.2
+    if CONTENT_HINTS.search(hints):
+        return 1.5
+    return 1.0
+
+
+def extract_article(html: bytes | str, max_chars: int = 10000) -> Article:
+    """Extract the title and main text of a news or council web page.
+
+    Boilerplate elements are dropped, then paragraphs are grouped by their parent
+    element and each parent is scored by the length of its paragraph text, weighted
+    by article/main/content hints in its tag, class or id. The best parent's
+    paragraphs form the article; pages without usable paragraphs fall back to the
+    body text.
+
+    Args:
+        html (bytes | str): Page markup. Pass bytes so a meta charset is honoured.
+        max_chars (int): Truncate the extracted text to this many characters.
+
+    Returns:
+        Article: Page title and extracted text.
+    """
+    try:
+        from lxml import html as lxml_html
+    except ImportError as e:
+        raise ImportError("Article extraction needs lxml: pip install 'repd-backend[scrape]'") from e
+
+    if not html or not html.strip():
+        return Article(title=None, text="")
+    doc = lxml_html.fromstring(html)
+    title = doc.findtext('.//title')
+    for element in doc.xpath('|'.join(f'//{tag}' for tag in BOILERPLATE_TAGS)):
+        element.drop_tree()
+
+    scores: dict = {}
+    paragraphs: dict = {}
+    for p in doc.iter('p'):
+        text = _clean(p.text_content())
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        parent = p.getparent()
+        paragraphs.setdefault(parent, []).append(text)
+        scores[parent] = scores.get(parent, 0.0) + len(text)
+
+    if scores:
+        best = max(scores, key=lambda parent: scores[parent] * _container_score(parent))
+        text = "\n\n".join(paragraphs[best])
+    else:
+        body = doc.find('.//body')
+        text = _clean((body if body is not None else doc).text_content())
+    return Article(title=_clean(title) if title else None, text=text[:max_chars])
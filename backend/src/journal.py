@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+
+class ResultJournal:
+    """Append-only JSONL journal of per-project results, keyed by Ref ID.
+
+    The completed Ref ID index is built once when the journal is opened, so each new
+    result is a single appended line and resume checks are set lookups.
+    """
+
+    def __init__(self, path: str, key: str = "refid"):
+        self.path = Path(path)
+        self.key = key
+        self.completed: set = set()
+        self._records: dict = {}
+        if self.path.exists():
+            self._load()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._file.tell() and not self._ends_with_newline():
+            self._file.write("\n")
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write leaves at most one torn trailing line.
+                    logger.warning("Skipping unreadable journal line %d in %s", line_no, self.path)
+                    continue
+                self._records[record[self.key]] = record
+        self.completed = set(self._records)
+
+    def __contains__(self, ref_id) -> bool:
+        return ref_id in self.completed
+
+    def __len__(self) -> int:
+        return len(self.completed)
+
+    def append(self, record: dict) -> None:
+        """Durably append one result."""
+        self._file.write(json.dumps(record, default=str) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._records[record[self.key]] = record
+        self.completed.add(record[self.key])
+
+    def mark_published(self, output: str) -> int:
+        """Count keys already in a compacted output file as completed.
+
+        Lets the first run against an existing nimby_score.json skip projects published
+        before the journal existed, without copying their records into the journal.
+
+        Args:
+            output (str): JSON array file written by compact.
+
+        Returns:
+            int: Number of published keys not already in the journal.
+        """
+        output = Path(output)
+        if not output.exists():
+            return 0
+        with open(output, encoding="utf-8") as f:
+            published = {record.get(self.key) for record in json.load(f)} - {None}
+        added = published - self.completed
+        self.completed |= added
+        return len(added)
+
+    def records(self) -> list[dict]:
+        """Latest record per key, in journal order."""
+        return list(self._records.values())
+
+    def compact(self, output: str) -> int:
+        """Merge journal records into a JSON array file.
+
+        A journal record updates the existing entry with the same key field by field, so
+        fields the new record leaves out or sets to None (e.g. article_url) are kept.
+
+        Args:
+            output (str): JSON file to merge into, e.g. frontend/static/nimby_score.json.
+
+        Returns:
+            int: Number of records written.
+        """
+        output = Path(output)
+        merged = {}
+        if output.exists():
+            with open(output, encoding="utf-8") as f:
+                for record in json.load(f):
+                    merged[record.get(self.key)] = record
+        for key, record in self._records.items():
+            if key in merged:
+                record = {**merged[key], **{field: value for field, value in record.items() if value is not None}}
+            merged[key] = record
+        tmp = output.with_suffix(output.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(list(merged.values()), f, indent=4, default=str)
+        tmp.replace(output)
+        return len(merged)
+
+    def close(self) -> None:
+        self._file.close()
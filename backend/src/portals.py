@@ -0,0 +1,370 @@
+from abc import ABC, abstractmethod
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+import json
+import logging
+import re
+import time
+from typing import Iterable
+from urllib.parse import quote_plus, urljoin, urlsplit
+from src.sources import USER_AGENT
+
+
+logger = logging.getLogger(__name__)
+
+# Requests a portal page never needs for its text; aborting them roughly halves load time.
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+BLOCKED_HOSTS = re.compile(
+    r"google-analytics\.com|googletagmanager\.com|doubleclick\.net|hotjar\.com|"
+    r"clarity\.ms|facebook\.net|siteimproveanalytics\.com|cookiebot\.com|civiccomputing\.com"
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def should_block(resource_type: str, url: str) -> bool:
+    """Whether the browser pool aborts a request of ``resource_type`` for ``url``."""
+    return resource_type in BLOCKED_RESOURCE_TYPES or bool(BLOCKED_HOSTS.search(urlsplit(url).netloc))
+
+
+def _clean(text: str | None) -> str:
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def _parse(html: str):
+    try:
+        from lxml import html as lxml_html
+    except ImportError as e:
+        raise ImportError("Portal scraping needs lxml: pip install 'repd-backend[scrape]'") from e
+    return lxml_html.fromstring(html)
+
+
+@dataclass
+class PortalDocument:
+    """A document listed against a planning application."""
+    description: str
+    url: str | None = None
+    document_type: str | None = None
+    published: str | None = None
+    size: str | None = None
+
+
+@dataclass
+class PortalResult:
+    """What a council portal holds for one planning application reference."""
+    authority: str
+    reference: str
+    portal: str | None = None
+    url: str | None = None
+    details: dict[str, str] = field(default_factory=dict)
+    documents: list[PortalDocument] = field(default_factory=list)
+    elapsed: float = 0.0
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def parse_key_value_table(html: str, selector: str) -> dict[str, str]:
+    """Rows of ``<th>label</th><td>value</td>`` pairs from the table matching the CSS id selector."""
+    doc = _parse(html)
+    details = {}
+    for row in doc.xpath(f"//table[@id='{selector}']//tr"):
+        label, value = row.find("th"), row.find("td")
+        if label is not None and value is not None:
+            details[_clean(label.text_content())] = _clean(value.text_content())
+    return details
+
+
+def parse_document_table(html: str, base_url: str, table_id: str = "Documents") -> list[PortalDocument]:
+    """Documents from a portal's document table, using its header row to find the columns."""
+    doc = _parse(html)
+    table = doc.xpath(f"//table[@id='{table_id}']")
+    if not table:
+        return []
+    rows = table[0].xpath(".//tr")
+    headers = [_clean(th.text_content()).lower() for th in rows[0].xpath("./th|./td")] if rows else []
+
+    def column(*names: str) -> int | None:
+        for i, header in enumerate(headers):
+            if any(name in header for name in names):
+                return i
+        return None
+
+    description_col = column("description")
+    type_col = column("type")
+    date_col = column("date", "published")
+    size_col = column("size", "measure")
+    documents = []
+    for row in rows[1:]:
+        cells = row.xpath("./td")
+        if not cells:
+            continue
+
+        def cell(i: int | None) -> str | None:
+            return _clean(cells[i].text_content()) or None if i is not None and i < len(cells) else None
+
+        links = [a.get("href") for a in row.xpath(".//a[@href]") if not a.get("href").startswith("#")]
+        description = cell(description_col) or _clean(row.text_content())
+        documents.append(PortalDocument(
+            description=description,
+            url=urljoin(base_url, links[-1]) if links else None,
+            document_type=cell(type_col),
+            published=cell(date_col),
+            size=cell(size_col),
+        ))
+    return documents
+
+
+class PortalAdapter(ABC):
+    """How to look an application up on one family of planning portal.
+
+    ``matches`` recognises the portal from the URL in councils.json. ``lookup`` drives
+    a pooled page to the application and fills in a PortalResult; parsing is kept
+    in plain functions over the page HTML so it can be tested on saved fixtures.
+    """
+    name = "generic"
+
+    @abstractmethod
+    def matches(self, url: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def lookup(self, page, base_url: str, reference: str, result: PortalResult) -> None:
+        ...
+
+
+class IdoxAdapter(PortalAdapter):
+    """Idox Public Access (``/online-applications/``), used by over a hundred councils.
+
+    A simple search for an exact reference redirects straight to the application; when
+    it returns a result list, the first result whose reference matches is opened.
+    """
+    name = "idox"
+    PATH = re.compile(r"/(online-applications|publicaccess)/", re.I)
+
+    def matches(self, url: str) -> bool:
+        return bool(self.PATH.search(url))
+
+    def base(self, url: str) -> str:
+        match = self.PATH.search(url)
+        return url[:match.end()]
+
+    def search_url(self, url: str, reference: str) -> str:
+        return (f"{self.base(url)}search.do?action=simple&searchType=Application"
+                f"&searchCriteria.simpleSearch=true&searchCriteria.simpleSearchString={quote_plus(reference)}")
+
+    @staticmethod
+    def parse_results(html: str, base_url: str, reference: str) -> str | None:
+        """Application URL for ``reference`` from a search result list, if listed."""
+        doc = _parse(html)
+        # The whole reference, so 21/0001/FUL does not match inside 21/00012/FUL.
+        wanted = re.compile(rf"(?<![\w/]){re.escape(reference.strip())}(?![\w/])", re.I)
+        for item in doc.xpath("//*[@id='searchresults']//li"):
+            link = item.xpath(".//a[@href]")
+            if link and wanted.search(_clean(item.text_content())):
+                return urljoin(base_url, link[0].get("href"))
+        return None
+
+    @staticmethod
+    def documents_url(summary_url: str) -> str:
+        if re.search(r"[?&]activeTab=", summary_url):
+            return re.sub(r"([?&])activeTab=\w*", r"\1activeTab=documents", summary_url)
+        return f"{summary_url}{'&' if '?' in summary_url else '?'}activeTab=documents"
+
+    async def lookup(self, page, base_url: str, reference: str, result: PortalResult) -> None:
+        await page.goto(self.search_url(base_url, reference))
+        if "applicationDetails.do" not in page.url:
+            url = self.parse_results(await page.content(), page.url, reference)
+            if url is None:
+                result.error = "application not found"
+                return
+            await page.goto(url)
+        result.url = page.url
+        result.details = parse_key_value_table(await page.content(), "simpleDetailsTable")
+        await page.goto(self.documents_url(page.url))
+        result.documents = parse_document_table(await page.content(), page.url)
+
+
+class DorsetAdapter(PortalAdapter):
+    """Dorset Council's own portal, which only searches through its form."""
+    name = "dorset"
+
+    def matches(self, url: str) -> bool:
+        return urlsplit(url).netloc.lower() == "planning.dorsetcouncil.gov.uk"
+
+    async def lookup(self, page, base_url: str, reference: str, result: PortalResult) -> None:
+        await page.goto(base_url)
+        accept = page.get_by_role("button", name="Accept")
+        if await accept.count():
+            await accept.first.click()
+        await page.get_by_label("Search for a planning application").fill(reference)
+        await page.get_by_role("button", name="Search").click()
+        await page.wait_for_selector(f"h1:has-text('{reference}')")
+        result.url = page.url
+        await page.get_by_role("link", name="Documents").click()
+        await page.wait_for_selector("table#Documents")
+        result.documents = parse_document_table(await page.content(), page.url)
+
+
+DEFAULT_ADAPTERS: tuple[PortalAdapter, ...] = (IdoxAdapter(), DorsetAdapter())
+
+
+def normalise_authority(name: str) -> str:
+    """Match REPD authority names ("Bristol, City of") to councils.json keys ("Bristol")."""
+    name = re.sub(r",\s*(City|County) of$", "", name.strip())
+    return re.sub(r"\s+(City|Council|District|Borough)$", "", name).casefold()
+
+
+class BrowserPool:
+    """A long-lived Chromium with ``size`` reusable contexts.
+
+    Each context keeps one page that is handed out by ``page()`` and reused across
+    lookups; after ``max_uses`` lookups the context is thrown away and replaced, which
+    bounds the memory portals leak through long-lived pages. Images, fonts, media,
+    stylesheets and analytics requests are aborted before they leave the browser.
+    """
+
+    def __init__(self, size: int = 4, headless: bool = True, max_uses: int = 50, timeout: float = 30.0):
+        self.size = size
+        self.headless = headless
+        self.max_uses = max_uses
+        self.timeout = timeout
+        self._playwright = None
+        self._browser = None
+        self._idle: asyncio.Queue | None = None
+
+    async def __aenter__(self) -> "BrowserPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """Launch the browser and open every context."""
+        try:
+            from playwright.async_api import async_playwright
+        except ImportError as e:
+            raise ImportError("Portal scraping needs Playwright: pip install 'repd-backend[browser]' "
+                              "&& playwright install chromium") from e
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._idle.put_nowait(await self._new_slot())
+
+    async def close(self) -> None:
+        """Close every context, the browser and Playwright."""
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    @staticmethod
+    async def _route(route) -> None:
+        request = route.request
+        if should_block(request.resource_type, request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _new_slot(self) -> list:
+        context = await self._browser.new_context(user_agent=USER_AGENT)
+        context.set_default_timeout(self.timeout * 1000)
+        await context.route("**/*", self._route)
+        return [context, await context.new_page(), 0]
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a page, waiting for one to come free."""
+        slot = await self._idle.get()
+        try:
+            yield slot[1]
+        except BaseException:
+            # The page may be mid-navigation or wedged; start the next borrower fresh.
+            slot[2] = self.max_uses
+            raise
+        finally:
+            slot[2] += 1
+            if slot[2] >= self.max_uses:
+                await slot[0].close()
+                slot = await self._new_slot()
+            self._idle.put_nowait(slot)
+
+
+class PortalScraper:
+    """Looks planning application references up on council portals, many at a time.
+
+    Councils are mapped to portal URLs by councils.json and to an adapter by the URL.
+    ``lookup_all`` feeds a queue drained by one worker per pooled page, so throughput
+    scales with the pool size and no lookup pays for a browser start.
+    """
+
+    def __init__(self, pool: BrowserPool, councils: dict[str, str] | str = "../frontend/static/councils.json",
+                 adapters: Iterable[PortalAdapter] = DEFAULT_ADAPTERS):
+        if isinstance(councils, str):
+            with open(councils, encoding="utf-8") as f:
+                councils = json.load(f)
+        self.pool = pool
+        self.councils = {normalise_authority(name): url for name, url in councils.items()}
+        self.adapters = list(adapters)
+
+    def portal_for(self, authority: str) -> tuple[str, PortalAdapter] | None:
+        """(portal URL, adapter) for an REPD planning authority, or None if unsupported."""
+        url = self.councils.get(normalise_authority(authority))
+        if url is None:
+            return None
+        adapter = next((a for a in self.adapters if a.matches(url)), None)
+        return (url, adapter) if adapter is not None else None
+
+    async def lookup(self, authority: str, reference: str) -> PortalResult:
+        """Look one reference up. Failures are recorded on the result rather than raised."""
+        result = PortalResult(authority=authority, reference=reference)
+        portal = self.portal_for(authority)
+        if portal is None:
+            result.error = "no supported portal"
+            return result
+        url, adapter = portal
+        result.portal = adapter.name
+        start = time.perf_counter()
+        try:
+            async with self.pool.page() as page:
+                await adapter.lookup(page, url, reference, result)
+        except ImportError:
+            raise
+        except Exception as e:
+            logger.warning("Portal lookup failed for %s %s: %r", authority, reference, e)
+            result.error = repr(e)
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    async def lookup_all(self, applications: Iterable[tuple[str, str]]) -> dict[tuple[str, str], PortalResult]:
+        """Look up many (authority, reference) pairs in parallel; duplicates are looked up once.
+
+        Returns:
+            dict[tuple[str, str], PortalResult]: Result per pair, in first-seen order.
+        """
+        unique = list(dict.fromkeys((a, str(r).strip()) for a, r in applications))
+        results: dict[tuple[str, str], PortalResult] = {}
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in unique:
+            queue.put_nowait(item)
+
+        async def worker():
+            while True:
+                try:
+                    authority, reference = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results[(authority, reference)] = await self.lookup(authority, reference)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, min(self.pool.size, len(unique))))))
+        logger.info("Looked up %d applications (%d failed) in %.1fs", len(unique),
+                    sum(not r.ok for r in results.values()), time.perf_counter() - start)
+        return {item: results[item] for item in unique}
@@ -0,0 +1,165 @@
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+
+# Rough chars-per-token ratio for English prose and "Label: value" lines.
+CHARS_PER_TOKEN = 4
+
+AUTHORITY_COL = 'Planning Authority'
+
+
+@dataclass(frozen=True)
+class ContextField:
+    """One REPD column in the LLM context.
+
+    ``kind`` picks the formatting: "text" is stripped, "date" is ISO (YYYY-MM-DD),
+    "mw" is a capacity with trailing zeros dropped, "number" likewise without a unit.
+    Fields with ``timeline`` set are folded into a single "Timeline:" line.
+    """
+    column: str
+    label: str
+    kind: str = "text"
+    timeline: bool = False
+
+
+CONTEXT_FIELDS: tuple[ContextField, ...] = (
+    ContextField('Site Name', 'Site'),
+    ContextField('Operator (or Applicant)', 'Operator'),
+    ContextField('Technology Type', 'Technology'),
+    ContextField('Installed Capacity (MWelec)', 'Capacity', 'mw'),
+    ContextField('Storage Type', 'Storage'),
+    ContextField('No. of Turbines', 'Turbines'),
+    ContextField('Height of Turbines (m)', 'Turbine height (m)'),
+    ContextField('Mounting Type for Solar', 'Solar mounting'),
+    ContextField('Solar Site Area (sqm)', 'Site area (sqm)', 'number'),
+    ContextField('Development Status (short)', 'Status'),
+    ContextField('Address', 'Address'),
+    ContextField('County', 'County'),
+    ContextField('Planning Authority', 'Authority'),
+    ContextField('Planning Application Reference', 'Application ref'),
+    ContextField('Appeal Reference', 'Appeal ref'),
+    ContextField('Type of Secretary of State Intervention', 'SoS intervention'),
+    ContextField('Judicial Review', 'Judicial review'),
+    ContextField('Are they re-applying (New REPD Ref)', 'Reapplied as'),
+    ContextField('Planning Application Submitted', 'submitted', 'date', True),
+    ContextField('Planning Application Withdrawn', 'withdrawn', 'date', True),
+    ContextField('Planning Permission Refused', 'refused', 'date', True),
+    ContextField('Appeal Lodged', 'appeal lodged', 'date', True),
+    ContextField('Appeal Withdrawn', 'appeal withdrawn', 'date', True),
+    ContextField('Appeal Refused', 'appeal refused', 'date', True),
+    ContextField('Appeal Granted', 'appeal granted', 'date', True),
+    ContextField('Secretary of State - Intervened', 'SoS intervened', 'date', True),
+    ContextField('Secretary of State - Refusal', 'SoS refused', 'date', True),
+    ContextField('Secretary of State - Granted', 'SoS granted', 'date', True),
+    ContextField('Planning Permission Granted', 'granted', 'date', True),
+    ContextField('Planning Permission Expired', 'expired', 'date', True),
+)
+
+
+def estimate_tokens(text: pd.Series) -> pd.Series:
+    """Approximate token counts for a Series of strings (about 4 characters per token)."""
+    return (text.fillna("").str.len() + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _number(values: pd.Series) -> pd.Series:
+    numbers = pd.to_numeric(values, errors="coerce").round(2)
+    return numbers.astype(str).str.replace(r"\.0+$", "", regex=True).where(numbers.notna())
+
+
+def format_field(values: pd.Series, kind: str) -> pd.Series:
+    """Format a column for the context; missing and blank values become NaN."""
+    if kind == "date":
+        return pd.to_datetime(values, errors="coerce").dt.strftime("%Y-%m-%d")
+    if kind == "mw":
+        return _number(values) + " MW"
+    if kind == "number":
+        return _number(values)
+    text = values.astype(object).where(values.notna()).astype("string").str.strip()
+    return text.where(text != "").astype(object)
+
+
+class ContextBuilder:
+    """Serialises REPD rows into compact LLM context, a whole dataframe at a time.
+
+    Only the columns in ``fields`` are kept, empty values are dropped, and each
+    remaining value becomes a short "Label: value" line, with decision dates folded
+    into one timeline line. With ``nearby`` set, each project also lists the closest
+    other projects in the ``neighbours`` frame from the same planning authority.
+    """
+
+    def __init__(self, fields: tuple[ContextField, ...] = CONTEXT_FIELDS, nearby: int = 0,
+                 max_distance_km: float | None = None):
+        self.fields = fields
+        self.nearby = nearby
+        self.max_distance_km = max_distance_km
+
+    def _lines(self, df: pd.DataFrame) -> pd.Series:
+        text = pd.Series("", index=df.index, dtype=object)
+        timeline = pd.Series("", index=df.index, dtype=object)
+        for field in self.fields:
+            if field.column not in df.columns:
+                continue
+            values = format_field(df[field.column], field.kind)
+            if field.timeline:
+                timeline += (field.label + " " + values + ", ").fillna("")
+            else:
+                text += (field.label + ": " + values + "\n").fillna("")
+        timeline = timeline.str.removesuffix(", ")
+        text += ("Timeline: " + timeline + "\n").where(timeline != "", "")
+        return text
+
+    def _neighbours(self, df: pd.DataFrame, neighbours: pd.DataFrame) -> pd.Series:
+        """Semicolon-joined summaries of each row's nearest neighbours; NaN where none."""
+        values = np.full(len(df), np.nan, dtype=object)
+        out = pd.Series(values, index=df.index)
+        required = {AUTHORITY_COL, 'X-coordinate', 'Y-coordinate', 'Ref ID'}
+        if not required <= set(df.columns) or not required <= set(neighbours.columns):
+            return out
+
+        summary = format_field(neighbours['Site Name'], "text").fillna("Unnamed site")
+        details = pd.Series("", index=neighbours.index, dtype=object)
+        for column, kind in (('Technology Type', "text"), ('Installed Capacity (MWelec)', "mw"),
+                             ('Development Status (short)', "text")):
+            if column in neighbours.columns:
+                details += (format_field(neighbours[column], kind) + ", ").fillna("")
+        summary = (summary + " (" + details).to_numpy(dtype=object)
+
+        xy = df[['X-coordinate', 'Y-coordinate']].to_numpy(dtype=float)
+        other_xy = neighbours[['X-coordinate', 'Y-coordinate']].to_numpy(dtype=float)
+        refs = df['Ref ID'].to_numpy()
+        other_refs = neighbours['Ref ID'].to_numpy()
+        candidates = neighbours.groupby(AUTHORITY_COL, observed=True, sort=False).indices
+        for authority, rows in df.groupby(AUTHORITY_COL, observed=True, sort=False).indices.items():
+            others = candidates.get(authority)
+            if others is None:
+                continue
+            # Coordinates are British National Grid metres.
+            km = np.hypot(*(xy[rows, None, :] - other_xy[None, others, :]).transpose(2, 0, 1)) / 1000
+            km[np.isnan(km) | (refs[rows, None] == other_refs[None, others])] = np.inf
+            if self.max_distance_km is not None:
+                km[km > self.max_distance_km] = np.inf
+            nearest = np.argsort(km, axis=1, kind="stable")[:, :self.nearby]
+            for i, row in enumerate(rows):
+                picks = [j for j in nearest[i] if np.isfinite(km[i, j])]
+                if picks:
+                    values[row] = "; ".join(f"{summary[others[j]]}{km[i, j]:.1f} km)" for j in picks)
+        return pd.Series(values, index=df.index)
+
+    def build(self, df: pd.DataFrame, neighbours: pd.DataFrame | None = None) -> pd.DataFrame:
+        """Context text and estimated tokens for every row of ``df``.
+
+        Args:
+            df (pd.DataFrame): Rows to serialise.
+            neighbours (pd.DataFrame | None): Projects nearby entries are drawn from,
+                defaults to ``df`` itself.
+
+        Returns:
+            pd.DataFrame: ``context`` and ``tokens`` columns, indexed like ``df``.
+        """
+        text = self._lines(df)
+        if self.nearby:
+            nearby = self._neighbours(df, df if neighbours is None else neighbours)
+            text += ("Nearby cancelled: " + nearby + "\n").fillna("")
+        text = text.str.rstrip("\n")
+        return pd.DataFrame({"context": text, "tokens": estimate_tokens(text)}, index=df.index)
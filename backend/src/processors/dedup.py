@@ -0,0 +1,126 @@
+import re
+import numpy as np
+import pandas as pd
+
+
+# Words that describe the kind of scheme rather than the site, so "Westover Farm Solar"
+# and "Westover Farm BESS" normalise to the same name.
+SITE_STOPWORDS = re.compile(
+    r"\b(solar|pv|photovoltaics?|wind|turbines?|farm|park|energy|storage|battery|bess|"
+    r"ad|anaerobic|digest(?:er|ion)|biomass|hydro|scheme|project|plant|facility|site|"
+    r"extension|revised|phase|ext|ltd|limited|the|and|of|at|land|nr|near|\d+)\b"
+)
+OPERATOR_STOPWORDS = re.compile(
+    r"\b(ltd|limited|plc|llp|llc|uk|gb|group|holdings|company|co|the|and|renewables?|"
+    r"energy|developments?|power)\b|\(.*?\)"
+)
+# Operators too common or vague to say two records are the same scheme.
+GENERIC_OPERATORS = {"", "private developer", "private", "unknown", "landowner", "farmer", "council"}
+
+LINK_COLS = ['Storage Co-location REPD Ref ID',
+             'Are they re-applying (New REPD Ref)',
+             'Are they re-applying (Old REPD Ref) ']
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _normalise(values: pd.Series, stopwords: re.Pattern) -> pd.Series:
+    text = values.astype("string").str.lower().fillna("")
+    text = text.str.replace(r"[&'’]", " ", regex=True).str.replace(stopwords, " ", regex=True)
+    return text.str.replace(_NON_WORD, " ", regex=True).str.split().str.join(" ")
+
+
+def normalise_site_name(names: pd.Series) -> pd.Series:
+    """Lower-case site names without punctuation, numbers or technology words."""
+    return _normalise(names, SITE_STOPWORDS)
+
+
+def normalise_operator(operators: pd.Series) -> pd.Series:
+    """Lower-case operator names without company suffixes or bracketed asides."""
+    normalised = _normalise(operators, OPERATOR_STOPWORDS)
+    return normalised.where(~normalised.isin(GENERIC_OPERATORS), "")
+
+
+def _find(parent: np.ndarray, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _union(parent: np.ndarray, pairs: np.ndarray) -> None:
+    for a, b in pairs:
+        ra, rb = _find(parent, a), _find(parent, b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+
+def _linked_pairs(df: pd.DataFrame) -> np.ndarray:
+    """Position pairs joined by the REPD's own co-location and re-application references."""
+    position = pd.Series(np.arange(len(df)), index=df['Ref ID'].to_numpy())
+    pairs = []
+    for col in LINK_COLS:
+        if col not in df.columns:
+            continue
+        # Cells may hold several references, e.g. "250 & 884".
+        refs = df[col].astype("string").str.extractall(r"(\d+)")[0].astype(int)
+        source = refs.index.get_level_values(0)
+        target = position.reindex(refs.to_numpy())
+        found = target.notna().to_numpy()
+        pairs.append(np.column_stack([df.index.get_indexer(source[found]), target.to_numpy()[found].astype(int)]))
+    return np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=int)
+
+
+def cluster_projects(df: pd.DataFrame, radius_km: float = 1.0, name_radius_km: float = 5.0,
+                     date_col: str = 'Record Last Updated (dd/mm/yyyy)') -> pd.Series:
+    """Group REPD records that describe the same scheme.
+
+    Two records are joined when any of these hold:
+
+    - they are within ``radius_km`` and share a normalised site name or operator;
+    - they share a normalised site name within ``name_radius_km``;
+    - one references the other as its co-located storage or as a re-application.
+
+    Joins are transitive. Each cluster is represented by its most recently updated
+    record (lowest Ref ID on ties), and is identified by that record's Ref ID.
+
+    Args:
+        df (pd.DataFrame): REPD records with British National Grid X/Y coordinates.
+        radius_km (float): Distance within which a shared operator or name joins records.
+        name_radius_km (float): Distance within which a shared site name alone joins records.
+        date_col (str): Column used to pick each cluster's representative.
+
+    Returns:
+        pd.Series: Representative Ref ID per record, indexed like ``df``.
+    """
+    n = len(df)
+    parent = np.arange(n)
+    if n == 0:
+        return pd.Series(np.empty(0, dtype=int), index=df.index, name='Cluster')
+    names = normalise_site_name(df['Site Name']).to_numpy(dtype=object)
+    operators = normalise_operator(df['Operator (or Applicant)']).to_numpy(dtype=object)
+
+    import shapely
+    from shapely import STRtree
+    xy = df[['X-coordinate', 'Y-coordinate']].to_numpy(dtype=float)
+    located = np.flatnonzero(~np.isnan(xy).any(axis=1))
+    points = shapely.points(xy[located])
+    tree = STRtree(points)
+    # Coordinates are metres, so every pair within the wider radius is one bulk tree query.
+    left, right = tree.query(points, predicate="dwithin", distance=max(radius_km, name_radius_km) * 1000)
+    keep = left < right
+    left, right = located[left[keep]], located[right[keep]]
+    km = np.hypot(*(xy[left] - xy[right]).T) / 1000
+    same_name = (names[left] == names[right]) & (names[left] != "")
+    same_operator = (operators[left] == operators[right]) & (operators[left] != "")
+    joined = (same_name & (km <= name_radius_km)) | ((same_name | same_operator) & (km <= radius_km))
+    _union(parent, np.column_stack([left[joined], right[joined]]))
+    _union(parent, _linked_pairs(df))
+
+    roots = np.array([_find(parent, i) for i in range(n)])
+    refs = df['Ref ID'].to_numpy()
+    updated = pd.to_datetime(df[date_col], errors="coerce") if date_col in df.columns else pd.Series(pd.NaT, index=df.index)
+    # Latest update first, then lowest Ref ID; the first row per root is the representative.
+    order = np.lexsort((refs, -updated.fillna(pd.Timestamp.min).to_numpy().astype("datetime64[ns]").astype(np.int64)))
+    first = pd.Series(refs[order]).groupby(roots[order]).first()
+    return pd.Series(first.reindex(roots).to_numpy(), index=df.index, name='Cluster')
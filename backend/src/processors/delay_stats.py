@@ -0,0 +1,126 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+
+SUBMITTED_COL = 'Planning Application Submitted'
+
+# Date column that marks the end of the planning process for each cancelled status.
+STATUS_DECISION_COLS = {
+    "Application Refused": 'Planning Permission Refused',
+    "Application Withdrawn": 'Planning Application Withdrawn',
+    "Appeal Refused": 'Appeal Refused',
+}
+
+# Per-status processing time records consumed by the frontend.
+STATUS_OUTPUTS = {
+    "Application Refused": "df_refused.json",
+    "Application Withdrawn": "df_withdrawn.json",
+    "Appeal Refused": "df_a_refused.json",
+}
+
+DELAY_BINS = [0, 90, 180, 365, 730, np.inf]
+DELAY_LABELS = ["0-90 days", "90-180 days", "180-365 days", "1 Year - 2 Years", "Over 2 Years"]
+
+
+def processing_times(df: pd.DataFrame, since: str | None = "2015-01-01",
+                     dims: list[str] | None = None) -> pd.DataFrame:
+    """Days from submission to decision for every cancelled application, in one pass.
+
+    Args:
+        df (pd.DataFrame): Dataframe with parsed datetime columns.
+        since (str | None): Only keep applications submitted on or after this date.
+        dims (list[str] | None): Extra columns to carry through for grouping.
+
+    Returns:
+        pd.DataFrame: Status, Processing_Time, submission date, Year and ``dims``.
+    """
+    dims = dims or []
+    status = df['Development Status (short)'].astype(object)
+    decided = np.select(
+        [status == s for s in STATUS_DECISION_COLS],
+        [df[col].to_numpy(dtype="datetime64[ns]") for col in STATUS_DECISION_COLS.values()],
+        default=np.datetime64("NaT"),
+    )
+    submitted = df[SUBMITTED_COL]
+    times = pd.DataFrame({
+        'status': status,
+        'Processing_Time': (pd.Series(decided, index=df.index) - submitted).dt.days.astype(float),
+        SUBMITTED_COL: submitted,
+    })
+    for dim in dims:
+        times[dim] = df[dim]
+    times = times[status.isin(STATUS_DECISION_COLS.keys())]
+    times = times.dropna(subset=['Processing_Time', SUBMITTED_COL])
+    if since is not None:
+        times = times[times[SUBMITTED_COL] >= pd.Timestamp(since)]
+    times['Year'] = times[SUBMITTED_COL].dt.year
+    return times
+
+
+def delay_histogram(times: pd.DataFrame, by: list[str] | None = None,
+                    bins: list[float] = DELAY_BINS, labels: list[str] = DELAY_LABELS) -> pd.DataFrame:
+    """Processing-time histogram per group using a single cut + groupby.
+
+    Args:
+        times (pd.DataFrame): Output of processing_times.
+        by (list[str] | None): Grouping columns, e.g. Year, Technology Type, Planning Authority, status.
+        bins (list[float]): Bucket edges in days, left-inclusive.
+        labels (list[str]): Bucket labels.
+
+    Returns:
+        pd.DataFrame: One row per group with avgDelay, total and a count column per bucket.
+    """
+    by = by or ['Year']
+    buckets = pd.cut(times['Processing_Time'], bins=bins, labels=labels, right=False)
+    grouped = times.assign(range=buckets).groupby(by, observed=True)
+    counts = (
+        grouped['range'].value_counts()
+        .unstack(fill_value=0)
+        .reindex(columns=labels, fill_value=0)
+    )
+    counts.columns = list(labels)
+    summary = grouped['Processing_Time'].agg(avgDelay='mean', total='size')
+    return summary.join(counts).sort_index()
+
+
+def year_distribution(histogram: pd.DataFrame, labels: list[str] = DELAY_LABELS) -> list[dict]:
+    """final.json records from a histogram grouped by Year."""
+    return [
+        {
+            "year": int(year),
+            "avgDelay": round(float(row['avgDelay']), 1),
+            "distribution": [{"range": label, "count": int(row[label])} for label in labels],
+        }
+        for year, row in histogram.iterrows()
+    ]
+
+
+def write_delay_stats(df: pd.DataFrame, out_dir: str, since: str | None = "2015-01-01") -> dict[str, str]:
+    """Write final.json and the per-status processing time files from one pass over ``df``.
+
+    Args:
+        df (pd.DataFrame): Dataframe with parsed datetime columns.
+        out_dir (str): Output directory, e.g. frontend/static.
+        since (str | None): Only keep applications submitted on or after this date.
+
+    Returns:
+        dict[str, str]: Output name to written path.
+    """
+    times = processing_times(df, since=since)
+    outputs = {"final.json": year_distribution(delay_histogram(times, by=['Year']))}
+    submitted = times[SUBMITTED_COL].dt.strftime('%Y-%m-%d')
+    records = times[['status', 'Processing_Time']].assign(**{'Planning Application Submitted String': submitted})
+    for status, name in STATUS_OUTPUTS.items():
+        subset = records[records['status'] == status].drop(columns='status')
+        # The frontend expects these as JSON-encoded record strings.
+        outputs[name] = subset.to_json(orient='records')
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for name, payload in outputs.items():
+        paths[name] = os.path.join(out_dir, name)
+        with open(paths[name], 'w') as f:
+            json.dump(payload, f, indent=2)
+    return paths
@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+import pandas as pd
+
+
+KEY_COL = 'Ref ID'
+UPDATED_COL = 'Record Last Updated (dd/mm/yyyy)'
+STATUS_COL = 'Development Status (short)'
+
+
+@dataclass
+class REPDDiff:
+    """Difference between two REPD extracts, keyed by Ref ID."""
+    added: pd.DataFrame
+    changed: pd.DataFrame
+    removed: pd.DataFrame
+    transitions: pd.DataFrame
+
+    def delta(self) -> pd.DataFrame:
+        """Rows of the new extract that need reprocessing: added plus changed."""
+        return pd.concat([self.added, self.changed]).sort_values(KEY_COL)
+
+    def summary(self) -> dict:
+        """Counts of added/changed/removed records and of each status transition."""
+        counts = self.transitions.groupby(['previous_status', 'status'], observed=True).size()
+        return {
+            "added": len(self.added),
+            "changed": len(self.changed),
+            "removed": len(self.removed),
+            "transitions": {f"{before} -> {after}": int(n) for (before, after), n in counts.items()},
+        }
+
+
+def diff_extracts(previous: pd.DataFrame, current: pd.DataFrame) -> REPDDiff:
+    """Diff two typed REPD extracts.
+
+    A record counts as changed when its last-updated date or its development status
+    differs between extracts.
+
+    Args:
+        previous (pd.DataFrame): Earlier extract.
+        current (pd.DataFrame): New extract.
+
+    Returns:
+        REPDDiff: Added, changed and removed rows plus status transitions.
+    """
+    previous = previous.drop_duplicates(KEY_COL, keep='last')
+    current = current.drop_duplicates(KEY_COL, keep='last')
+    merged = current[[KEY_COL, UPDATED_COL, STATUS_COL]].merge(
+        previous[[KEY_COL, UPDATED_COL, STATUS_COL]],
+        on=KEY_COL, how='outer', suffixes=('', '_previous'), indicator=True,
+    )
+    both = merged[merged['_merge'] == 'both']
+    status = both[STATUS_COL].astype(object)
+    previous_status = both[STATUS_COL + '_previous'].astype(object)
+    status_changed = status.ne(previous_status) & ~(status.isna() & previous_status.isna())
+    updated = both[UPDATED_COL]
+    previous_updated = both[UPDATED_COL + '_previous']
+    updated_changed = updated.ne(previous_updated) & ~(updated.isna() & previous_updated.isna())
+
+    added_ids = merged.loc[merged['_merge'] == 'left_only', KEY_COL]
+    removed_ids = merged.loc[merged['_merge'] == 'right_only', KEY_COL]
+    changed_ids = both.loc[status_changed | updated_changed, KEY_COL]
+    transitions = pd.DataFrame({
+        KEY_COL: both.loc[status_changed, KEY_COL],
+        'previous_status': previous_status[status_changed],
+        'status': status[status_changed],
+    }).reset_index(drop=True)
+
+    return REPDDiff(
+        added=current[current[KEY_COL].isin(added_ids)],
+        changed=current[current[KEY_COL].isin(changed_ids)],
+        removed=previous[previous[KEY_COL].isin(removed_ids)],
+        transitions=transitions,
+    )
@@ -0,0 +1,125 @@
+from collections.abc import Iterable
+import numpy as np
+import pandas as pd
+
+
+# query() keyword -> indexed categorical column.
+CATEGORY_FILTERS = {
+    "status": 'Development Status (short)',
+    "technology": 'Technology Type',
+    "authority": 'Planning Authority',
+    "county": 'County',
+}
+
+DEFAULT_DATE_COL = 'Record Last Updated (dd/mm/yyyy)'
+CAPACITY_COL = 'Installed Capacity (MWelec)'
+
+
+class SortedIndex:
+    """Row positions ordered by a numeric or datetime column, for range lookups."""
+
+    def __init__(self, values: np.ndarray):
+        self.column = values
+        present = ~pd.isna(values)
+        positions = np.flatnonzero(present)
+        order = np.argsort(values[present], kind="stable")
+        self.values = values[present][order]
+        self.positions = positions[order]
+
+    def range(self, low=None, high=None) -> np.ndarray:
+        """Sorted positions with ``low <= value <= high``; None leaves a side open."""
+        start = 0 if low is None else np.searchsorted(self.values, low, side="left")
+        end = len(self.values) if high is None else np.searchsorted(self.values, high, side="right")
+        return np.sort(self.positions[start:end])
+
+
+class QueryIndex:
+    """Precomputed lookups over a dataframe for multi-criteria filtering.
+
+    Each categorical column in CATEGORY_FILTERS maps its values to sorted row
+    positions, and date/capacity columns get a sorted index on first use, so a query
+    is a handful of dictionary lookups and sorted-array intersections rather than a
+    boolean scan per filter.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.categories: dict[str, dict[str, np.ndarray]] = {
+            col: self._category_positions(df[col]) for col in CATEGORY_FILTERS.values() if col in df.columns
+        }
+        self._sorted: dict[str, SortedIndex] = {}
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    @staticmethod
+    def _category_positions(values: pd.Series) -> dict[str, np.ndarray]:
+        codes, uniques = pd.factorize(values)
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        # Stable sort keeps each group's positions ascending; missing values (-1) sort first.
+        groups = np.split(order[(codes < 0).sum():], np.cumsum(counts)[:-1])
+        return {value: positions for value, positions in zip(uniques, groups)}
+
+    def _sorted_index(self, col: str) -> SortedIndex:
+        if col not in self._sorted:
+            self._sorted[col] = SortedIndex(self.df[col].to_numpy())
+        return self._sorted[col]
+
+    def category(self, col: str, values: str | Iterable[str]) -> np.ndarray:
+        """Sorted positions whose ``col`` is any of ``values``."""
+        if isinstance(values, str):
+            values = [values]
+        lookup = self.categories[col]
+        matches = [lookup[v] for v in values if v in lookup]
+        if not matches:
+            return np.empty(0, dtype=np.intp)
+        return matches[0] if len(matches) == 1 else np.sort(np.concatenate(matches))
+
+    def positions(self,
+                  status: str | Iterable[str] | None = None,
+                  technology: str | Iterable[str] | None = None,
+                  authority: str | Iterable[str] | None = None,
+                  county: str | Iterable[str] | None = None,
+                  date_range: tuple | None = None,
+                  date_col: str = DEFAULT_DATE_COL,
+                  capacity_range: tuple[float | None, float | None] | None = None) -> np.ndarray | None:
+        """Sorted row positions matching every given filter, or None when no filter is given."""
+        candidates = []
+        for name, values in (("status", status), ("technology", technology),
+                             ("authority", authority), ("county", county)):
+            if values is not None:
+                candidates.append(self.category(CATEGORY_FILTERS[name], values))
+        ranges = []
+        if date_range is not None:
+            ranges.append((date_col, tuple(None if d is None else np.datetime64(pd.Timestamp(d), "ns")
+                                           for d in date_range)))
+        if capacity_range is not None:
+            ranges.append((CAPACITY_COL, tuple(capacity_range)))
+        if not candidates and not ranges:
+            return None
+
+        candidates.sort(key=len)
+        result = candidates[0] if candidates else None
+        for other in candidates[1:]:
+            if not len(result):
+                return result
+            result = np.intersect1d(result, other, assume_unique=True)
+        for col, (low, high) in ranges:
+            if result is None:
+                result = self._sorted_index(col).range(low, high)
+                continue
+            # Few rows left: compare them directly rather than materialising the whole range.
+            values = self._sorted_index(col).column[result]
+            keep = ~pd.isna(values)
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+            result = result[keep]
+        return result
+
+    def query(self, **filters) -> pd.DataFrame:
+        """Rows matching every filter, in their original order. See positions for the filters."""
+        positions = self.positions(**filters)
+        return self.df if positions is None else self.df.iloc[positions]
@@ -1,7 +1,22 @@
+from __future__ import annotations
+from functools import lru_cache
+from typing import TYPE_CHECKING
+import numpy as np
 import pandas as pd
-import geopandas as gpd
-from pyproj import Transformer
 from datetime import datetime
+import orjson
+from src.processors.diff import REPDDiff, diff_extracts
+from src.processors.snapshot import SnapshotCache
+
+from src.processors.context import ContextBuilder
+from src.processors.dedup import cluster_projects
+from src.processors.query import QueryIndex
+
+if TYPE_CHECKING:
+    from src.processors.spatial import SpatialIndex
+
+# geopandas, pyproj and shapely are imported where they are used, so importing the
+# processor (and every CLI that does) only pays for pandas.
 
 
 DATETIME_COLS = ['Record Last Updated (dd/mm/yyyy)', 
@@ -20,6 +35,19 @@ DATETIME_COLS = ['Record Last Updated (dd/mm/yyyy)',
                     'Under Construction',
                     'Operational']
 
+DATE_FORMAT = "%d/%m/%Y"
+
+CATEGORICAL_COLS = ['Development Status (short)',
+                    'Technology Type',
+                    'Planning Authority',
+                    'County']
+
+CAPACITY_COL = 'Installed Capacity (MWelec)'
+
+NUMERIC_COLS = [CAPACITY_COL, 'X-coordinate', 'Y-coordinate']
+
+GEOJSON_EXCLUDED_COLS = {'lat', 'lon', 'geometry', 'X-coordinate', 'Y-coordinate'}
+
 TECHNOLOGY_TYPES = {
     "Solar Photovoltaics",
     "Compressed Air Energy Storage",
@@ -75,6 +103,49 @@ CANCELLED_DEVELOPMENT_TYPES = {
     "Application Refused",
 }
 
+# Derived snapshot holding lat/lon per Ref ID for an extract.
+LAT_LON_SUFFIX = "-latlon"
+
+
+@lru_cache(maxsize=None)
+def get_transformer(from_crs: str = "EPSG:27700", to_crs: str = "EPSG:4326"):
+    """Shared pyproj Transformer for a CRS pair; building one is far slower than using it."""
+    from pyproj import Transformer
+    return Transformer.from_crs(from_crs, to_crs)
+
+
+def transform_coordinates(xs, ys, from_crs: str = "EPSG:27700",
+                          to_crs: str = "EPSG:4326") -> tuple[np.ndarray, np.ndarray]:
+    """Transform coordinate arrays, skipping missing values.
+
+    Only rows with finite inputs are sent to pyproj, transformed in place; every other
+    row, and any output pyproj could not project (inf), comes back as NaN.
+
+    Args:
+        xs: First axis of ``from_crs`` (easting for EPSG:27700).
+        ys: Second axis of ``from_crs`` (northing for EPSG:27700).
+        from_crs (str): Source CRS.
+        to_crs (str): Target CRS.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: float32 arrays in ``to_crs`` axis order (lat, lon for EPSG:4326).
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    valid = np.isfinite(xs) & np.isfinite(ys)
+    first = np.full(len(xs), np.nan, dtype=np.float32)
+    second = np.full(len(xs), np.nan, dtype=np.float32)
+    if valid.any():
+        a, b = xs[valid], ys[valid]
+        get_transformer(from_crs, to_crs).transform(a, b, inplace=True)
+        first[valid] = a
+        second[valid] = b
+    unprojected = ~(np.isfinite(first) & np.isfinite(second))
+    first[unprojected] = np.nan
+    second[unprojected] = np.nan
+    return first, second
+
+
 # class REPDRecord(BaseModel):
 #     RefID: int
 #     RecordUpdated: datetime
@@ -93,10 +164,15 @@ class REPDProcessor:
         self,
         src: str = "src/data/REPD_Publication_Q3_2025.csv",
         encoding: str = "cp1252",
+        cache_dir: str | None = "src/data/.cache",
     ):
         self.src = src
         self._df: pd.DataFrame | None = None
+        self._lat_lon: pd.DataFrame | None = None
         self.encoding = encoding
+        self.cache = SnapshotCache(cache_dir) if cache_dir is not None else None
+        self.spatial_index: SpatialIndex | None = None
+        self.query_index: QueryIndex | None = None
 
     def coordinates_to_lat_lon(
         self,
@@ -111,28 +187,122 @@ class REPDProcessor:
 
         Args:
             df (pd.DataFrame): Dataframe containing coordinates
-            drop_na (bool): Drop nan's in specific columns.
+            drop_na (bool): Drop rows without a valid lat/lon.
             easting_col (str, optional): easting column in csv. Defaults to 'easting'.
             northing_col (str, optional): northing col in csv. Defaults to 'northing'.
             from_crs (_type_, optional): EPSG from. Defaults to 'EPSG:27700'.
             to_crs (_type_, optional): EPSG to. Defaults to 'EPSG:4326'.
 
         Returns:
-            pd.DataFrame: Parsed dataframe.
+            pd.DataFrame: Parsed dataframe with float32 lat and lon columns.
+        """
+        lat, lon = transform_coordinates(df[easting_col], df[northing_col], from_crs, to_crs)
+        df["lat"] = lat
+        df["lon"] = lon
+        if drop_na:
+            df = df.dropna(subset=["lat", "lon"])
+        return df
+
+    def lat_lon(self) -> pd.DataFrame:
+        """lat/lon for every record of the extract, indexed by Ref ID.
+
+        Converted once per extract: the table is kept on the processor and, when a
+        cache directory is set, snapshotted next to the typed extract.
+
+        Returns:
+            pd.DataFrame: float32 lat and lon columns indexed by Ref ID.
+        """
+        if self._lat_lon is None:
+            table = self.cache.read(self.src, suffix=LAT_LON_SUFFIX) if self.cache is not None else None
+            if table is None:
+                df = self.load()
+                lat, lon = transform_coordinates(df["X-coordinate"], df["Y-coordinate"])
+                table = pd.DataFrame({"Ref ID": df["Ref ID"], "lat": lat, "lon": lon})
+                table = table.drop_duplicates("Ref ID", keep="last")
+                if self.cache is not None:
+                    self.cache.write(self.src, table, suffix=LAT_LON_SUFFIX)
+            self._lat_lon = table.set_index("Ref ID")
+        return self._lat_lon
+
+    def attach_lat_lon(self, df: pd.DataFrame, drop_na: bool = True) -> pd.DataFrame:
+        """Add lat/lon columns to rows of this extract from the precomputed lat_lon table.
+
+        Args:
+            df (pd.DataFrame): Rows from load(), possibly filtered.
+            drop_na (bool): Drop rows without a valid lat/lon.
+
+        Returns:
+            pd.DataFrame: Dataframe with float32 lat and lon columns.
         """
-        df.dropna(subset=[northing_col, easting_col])
-        transformer = Transformer.from_crs(from_crs, to_crs)
-        lat, lon = transformer.transform(
-            df[easting_col].values, df[northing_col].values
+        coords = self.lat_lon().reindex(df["Ref ID"])
+        df["lat"] = coords["lat"].to_numpy()
+        df["lon"] = coords["lon"].to_numpy()
+        if drop_na:
+            df = df.dropna(subset=["lat", "lon"])
+        return df
+
+    def diff(self, previous_src: str) -> REPDDiff:
+        """Diff this extract against a previous quarterly extract.
+
+        Both extracts are loaded through the snapshot cache, so the previous quarter is
+        normally a columnar read.
+
+        Args:
+            previous_src (str): Path to the previous REPD CSV.
+
+        Returns:
+            REPDDiff: Added, changed and removed records plus status transitions.
+        """
+        previous = REPDProcessor(
+            src=previous_src,
+            encoding=self.encoding,
+            cache_dir=self.cache.cache_dir if self.cache is not None else None,
         )
-        df["lat"] = lat.round(4)
-        df["lon"] = lon.round(4)
-        df.drop(columns=[easting_col, northing_col])
+        return diff_extracts(previous.load(), self.load())
+
+    def apply_schema(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Apply the typed REPD schema to a raw extract.
+
+        Strips the stray whitespace REPD leaves in categorical and numeric cells,
+        then types categoricals, float numerics and dd/mm/yyyy dates.
+
+        Args:
+            df (pd.DataFrame): Dataframe as read from the CSV.
+
+        Returns:
+            pd.DataFrame: Typed dataframe.
+        """
+        for col in CATEGORICAL_COLS:
+            df[col] = df[col].str.strip().astype("category")
+        for col in NUMERIC_COLS:
+            df[col] = pd.to_numeric(df[col].astype(str).str.strip(), errors="coerce").astype(float)
+        for col in DATETIME_COLS:
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors="coerce")
         return df
 
+    def parse(self) -> pd.DataFrame:
+        """Parse the source CSV into the typed schema, bypassing any cache."""
+        df = pd.read_csv(self.src, encoding=self.encoding, low_memory=False)
+        return self.apply_schema(df)
+
     def load(self) -> pd.DataFrame:
-        """Load dataframe."""
-        return pd.read_csv(self.src, encoding=self.encoding)
+        """Load dataframe.
+
+        The CSV is parsed once per processor; when a cache directory is set the typed
+        result is also snapshotted to disk, keyed by the source file hash, so later
+        processes get a memory-mapped columnar read instead of a text parse.
+
+        Returns:
+            pd.DataFrame: Copy of the typed REPD dataframe, safe to mutate.
+        """
+        if self._df is None:
+            df = self.cache.read(self.src) if self.cache is not None else None
+            if df is None:
+                df = self.parse()
+                if self.cache is not None:
+                    self.cache.write(self.src, df)
+            self._df = df
+        return self._df.copy()
     
     def filter_by_planning_authority(self, df: pd.DataFrame, planning_authority:str) -> pd.DataFrame:
         """Filter by local authority.
@@ -207,6 +377,7 @@ class REPDProcessor:
         Returns:
             pd.DataFrame: Geopandas parsed dataframe
         """
+        import geopandas as gpd
         df = gpd.GeoDataFrame(
             df, geometry=gpd.points_from_xy(col_lon, col_lat), crs="EPSG:4326"
         )
@@ -214,22 +385,92 @@ class REPDProcessor:
 
         return df
     
-    def create_geojson(self, df:pd.DataFrame):
-        features = []
-        for _, row in df.iterrows():
-            feature = {
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [float(row['lon']), float(row['lat'])]
-                },
-                "properties": row.drop(['latitude', 'longitude']).to_dict()
-            }
-            features.append(feature)
+    def geojson_properties(self, df: pd.DataFrame, properties: list[str] | None = None) -> list[dict]:
+        """JSON-ready feature properties, converted column-wise.
+
+        Args:
+            df (pd.DataFrame): Dataframe with lat/lon columns.
+            properties (list[str] | None): Columns to keep, defaults to every non-coordinate column.
+
+        Returns:
+            list[dict]: One dict per row, dates formatted as dd/mm/yyyy and NaN/NaT as None.
+        """
+        if properties is None:
+            properties = [col for col in df.columns if col not in GEOJSON_EXCLUDED_COLS]
+        columns = []
+        for col in properties:
+            values = df[col]
+            present = values.notna()
+            if pd.api.types.is_datetime64_any_dtype(values):
+                values = values[present].dt.strftime(DATE_FORMAT).reindex(values.index)
+            columns.append(values.astype(object).where(present, None).tolist())
+        return [dict(zip(properties, row)) for row in zip(*columns)]
+
+    def iter_geojson_features(self, df: pd.DataFrame, properties: list[str] | None = None,
+                              chunk_size: int = 5000):
+        """Yield GeoJSON point features, building each chunk from column arrays.
+
+        Rows without coordinates are skipped.
+        """
+        df = df[df['lat'].notna() & df['lon'].notna()]
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            # lat/lon are float32; round so the widened floats serialise as 4dp.
+            lons = chunk['lon'].to_numpy(dtype=float).round(4).tolist()
+            lats = chunk['lat'].to_numpy(dtype=float).round(4).tolist()
+            records = self.geojson_properties(chunk, properties)
+            for lon, lat, record in zip(lons, lats, records):
+                yield {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": [lon, lat]
+                    },
+                    "properties": record
+                }
+
+    def create_geojson(self, df:pd.DataFrame, properties: list[str] | None = None) -> dict:
+        """Create a GeoJSON FeatureCollection in memory.
+
+        Args:
+            df (pd.DataFrame): Dataframe with lat/lon columns.
+            properties (list[str] | None): Property columns to include, defaults to all.
+
+        Returns:
+            dict: FeatureCollection.
+        """
         return {
             "type": "FeatureCollection",
-            "features": features
+            "features": list(self.iter_geojson_features(df, properties))
         }
+
+    def write_geojson(self, df: pd.DataFrame, path: str, properties: list[str] | None = None,
+                      chunk_size: int = 5000) -> int:
+        """Stream a GeoJSON FeatureCollection to disk.
+
+        Features are serialised with orjson one chunk at a time, so peak memory is bounded
+        by ``chunk_size`` rather than the size of the dataframe.
+
+        Args:
+            df (pd.DataFrame): Dataframe with lat/lon columns.
+            path (str): Output file.
+            properties (list[str] | None): Property columns to include, defaults to all.
+            chunk_size (int): Rows converted per chunk.
+
+        Returns:
+            int: Number of features written.
+        """
+        count = 0
+        with open(path, "wb") as f:
+            f.write(b'{"type":"FeatureCollection","features":[')
+            for feature in self.iter_geojson_features(df, properties, chunk_size):
+                if count:
+                    f.write(b",")
+                f.write(orjson.dumps(feature))
+                count += 1
+            f.write(b"]}")
+        return count
+
     def get_google_query_string(self, row: pd.Series) -> str:
         return f"{row['Site Name'], {row['Country']}, {row['Technology Type']}}, around {row['Record Last Updated (dd/mm/yyyy)']} "
 
@@ -239,6 +480,11 @@ class REPDProcessor:
                            ) -> pd.DataFrame:
         """Perform necessary pipeline filtering for a cleaned dataset.
 
+        An unfiltered run also (re)builds the spatial index behind query_bbox,
+        query_radius and nearest_k, and the query index behind query. Filtered runs
+        leave both alone, so a subset never replaces the processor-wide indexes; pass
+        one to build_spatial_index or build_query_index explicitly.
+
         Args:
             date: Datetime to filter and look against for last updated data
             planning_authority: planning authority to filter against
@@ -252,7 +498,122 @@ class REPDProcessor:
             df = self.filter_by_date(df=df, date=date, date_col='Record Last Updated (dd/mm/yyyy)')
         if planning_authority is not None:
             df = self.filter_by_planning_authority(df, planning_authority=planning_authority)
-        df = self.coordinates_to_lat_lon(df)
+        df = self.attach_lat_lon(df)
         df = self.df_to_gpd(df, df.lon, df.lat)
+        if date is None and planning_authority is None:
+            self.build_spatial_index(df)
+            self.build_query_index(df)
        
         return df
+
+    def build_query_index(self, df: pd.DataFrame) -> QueryIndex:
+        """Index a processed dataframe for query().
+
+        Args:
+            df (pd.DataFrame): Dataframe to query, typically from process_pipeline.
+
+        Returns:
+            QueryIndex: Category, date and capacity lookups over ``df``.
+        """
+        self.query_index = QueryIndex(df)
+        return self.query_index
+
+    def query(self,
+              status: str | list[str] | set[str] | None = None,
+              technology: str | list[str] | None = None,
+              authority: str | list[str] | None = None,
+              county: str | list[str] | None = None,
+              date_range: tuple | None = None,
+              date_col: str = 'Record Last Updated (dd/mm/yyyy)',
+              capacity_range: tuple[float | None, float | None] | None = None,
+              ) -> pd.DataFrame:
+        """Filter processed projects on any combination of criteria via the query index.
+
+        Filters combine with AND; a list of values for one filter matches any of them.
+        Ranges are inclusive and None leaves a side open, e.g. ``date_range=("2025-01-01", None)``.
+        Builds the index through process_pipeline on first use.
+
+        Args:
+            status: Development status(es), e.g. CANCELLED_DEVELOPMENT_TYPES.
+            technology: Technology type(s).
+            authority: Planning authority(ies).
+            county: County(ies).
+            date_range: (start, end) dates for ``date_col``.
+            date_col (str): Date column ``date_range`` applies to.
+            capacity_range: (min, max) installed capacity in MW.
+
+        Returns:
+            pd.DataFrame: Matching rows in their original order.
+        """
+        if self.query_index is None:
+            self.process_pipeline()
+        return self.query_index.query(status=status, technology=technology, authority=authority,
+                                      county=county, date_range=date_range, date_col=date_col,
+                                      capacity_range=capacity_range)
+
+    def build_contexts(self, df: pd.DataFrame, nearby: int = 0,
+                       neighbours: pd.DataFrame | None = None,
+                       max_distance_km: float | None = None) -> pd.DataFrame:
+        """Compact LLM context for every row, in place of ``row.to_dict()``.
+
+        Args:
+            df (pd.DataFrame): Rows to serialise, e.g. from filter_by_cancelled.
+            nearby (int): Number of nearby cancelled projects in the same planning
+                authority to list for each row, 0 for none.
+            neighbours (pd.DataFrame | None): Projects to draw nearby entries from,
+                defaults to every cancelled project in the extract.
+            max_distance_km (float | None): Ignore neighbours further away than this.
+
+        Returns:
+            pd.DataFrame: ``context`` text and estimated ``tokens``, indexed like ``df``.
+        """
+        if nearby and neighbours is None:
+            neighbours = self.filter_by_cancelled(self.load())
+        builder = ContextBuilder(nearby=nearby, max_distance_km=max_distance_km)
+        return builder.build(df, neighbours)
+
+    def cluster_projects(self, df: pd.DataFrame | None = None, radius_km: float = 1.0,
+                         name_radius_km: float = 5.0) -> pd.Series:
+        """Group records describing the same scheme, see dedup.cluster_projects.
+
+        Args:
+            df (pd.DataFrame | None): Records to cluster, defaults to process_pipeline's output.
+            radius_km (float): Distance within which a shared operator or site name joins records.
+            name_radius_km (float): Distance within which a shared site name alone joins records.
+
+        Returns:
+            pd.Series: Representative Ref ID per record, indexed like ``df``.
+        """
+        if df is None:
+            df = self.process_pipeline()
+        return cluster_projects(df, radius_km=radius_km, name_radius_km=name_radius_km)
+
+    def build_spatial_index(self, df: pd.DataFrame) -> SpatialIndex:
+        """Index a processed dataframe for geographic queries.
+
+        Args:
+            df (pd.DataFrame): Dataframe with lat/lon columns, typically from process_pipeline.
+
+        Returns:
+            SpatialIndex: Index used by query_bbox, query_radius and nearest_k.
+        """
+        from src.processors.spatial import SpatialIndex
+        self.spatial_index = SpatialIndex(df)
+        return self.spatial_index
+
+    def _get_spatial_index(self) -> SpatialIndex:
+        if self.spatial_index is None:
+            self.process_pipeline()
+        return self.spatial_index
+
+    def query_bbox(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> pd.DataFrame:
+        """Projects inside a lon/lat bounding box, e.g. a map viewport."""
+        return self._get_spatial_index().query_bbox(min_lon, min_lat, max_lon, max_lat)
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> pd.DataFrame:
+        """Projects within ``radius_km`` of a point, nearest first, with a distance_km column."""
+        return self._get_spatial_index().query_radius(lat, lon, radius_km)
+
+    def nearest_k(self, lat: float, lon: float, k: int = 5) -> pd.DataFrame:
+        """The ``k`` projects nearest to a point, nearest first, with a distance_km column."""
+        return self._get_spatial_index().nearest_k(lat, lon, k)
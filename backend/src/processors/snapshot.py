@@ -0,0 +1,75 @@
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+# Bump whenever the typed schema applied before snapshotting changes, so stale
+# snapshots built from the same source file are not reused.
+SCHEMA_VERSION = 1
+
+
+def file_hash(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    """Hash a file's contents.
+
+    Args:
+        path (str | Path): File to hash.
+        chunk_size (int): Bytes read per chunk.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class SnapshotCache:
+    """Columnar (Arrow IPC) snapshots of parsed source files, keyed by content hash.
+
+    Snapshots are written uncompressed so reads are a memory-mapped columnar load
+    rather than a full text parse.
+    """
+    cache_dir: str = "src/data/.cache"
+
+    def path_for(self, src: str | Path, suffix: str = "") -> Path:
+        """Snapshot path for a source file.
+
+        Args:
+            src (str | Path): Source file the snapshot was built from.
+            suffix (str): Optional discriminator for derived snapshots of the same source.
+
+        Returns:
+            Path: Location of the snapshot for the current content of ``src``.
+        """
+        src = Path(src)
+        name = f"{src.stem}-{file_hash(src)}-v{SCHEMA_VERSION}{suffix}.arrow"
+        return Path(self.cache_dir) / name
+
+    def read(self, src: str | Path, suffix: str = "") -> pd.DataFrame | None:
+        """Read a snapshot for ``src`` if one exists.
+
+        Returns:
+            pd.DataFrame | None: Snapshot dataframe, or None on a cache miss.
+        """
+        path = self.path_for(src, suffix)
+        if not path.exists():
+            return None
+        import pyarrow.feather as feather
+        return feather.read_table(path, memory_map=True).to_pandas()
+
+    def write(self, src: str | Path, df: pd.DataFrame, suffix: str = "") -> Path:
+        """Persist ``df`` as the snapshot for ``src``.
+
+        Returns:
+            Path: Written snapshot path.
+        """
+        path = self.path_for(src, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        df.reset_index(drop=True).to_feather(tmp, compression="uncompressed")
+        tmp.replace(path)
+        return path
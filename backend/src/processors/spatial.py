@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import shapely
+from shapely import STRtree
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to many.
+
+    Args:
+        lat (float): Origin latitude.
+        lon (float): Origin longitude.
+        lats (np.ndarray): Target latitudes.
+        lons (np.ndarray): Target longitudes.
+
+    Returns:
+        np.ndarray: Distances in km.
+    """
+    # Computed in float64 even when lat/lon come from float32 columns.
+    lat1, lon1 = np.radians(float(lat)), np.radians(float(lon))
+    lat2, lon2 = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lons, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _degree_box(lat: float, lon: float, radius_km: float) -> tuple[float, float, float, float]:
+    """Lon/lat box that fully contains a circle of ``radius_km``."""
+    dlat = np.degrees(radius_km / EARTH_RADIUS_KM)
+    dlon = np.degrees(radius_km / (EARTH_RADIUS_KM * max(np.cos(np.radians(lat)), 1e-6)))
+    return lon - dlon, lat - dlat, lon + dlon, lat + dlat
+
+
+class SpatialIndex:
+    """STRtree over the lat/lon points of a dataframe.
+
+    Built once per dataframe; queries return rows of that dataframe. Rows without
+    coordinates are not indexed.
+    """
+
+    def __init__(self, df: pd.DataFrame, lat_col: str = "lat", lon_col: str = "lon"):
+        located = df[df[lat_col].notna() & df[lon_col].notna()]
+        self.df = located
+        self.lats = located[lat_col].to_numpy(dtype=float)
+        self.lons = located[lon_col].to_numpy(dtype=float)
+        self.tree = STRtree(shapely.points(self.lons, self.lats))
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def _bbox_positions(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> np.ndarray:
+        return self.tree.query(shapely.box(min_lon, min_lat, max_lon, max_lat), predicate="intersects")
+
+    def query_bbox(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> pd.DataFrame:
+        """Rows inside a lon/lat bounding box, e.g. a map viewport."""
+        positions = np.sort(self._bbox_positions(min_lon, min_lat, max_lon, max_lat))
+        return self.df.iloc[positions]
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> pd.DataFrame:
+        """Rows within ``radius_km`` of a point, nearest first, with a ``distance_km`` column."""
+        positions = self._bbox_positions(*_degree_box(lat, lon, radius_km))
+        distances = haversine_km(lat, lon, self.lats[positions], self.lons[positions])
+        keep = distances <= radius_km
+        return self._with_distance(positions[keep], distances[keep])
+
+    def nearest_k(self, lat: float, lon: float, k: int = 5) -> pd.DataFrame:
+        """The ``k`` nearest rows to a point, nearest first, with a ``distance_km`` column."""
+        k = min(k, len(self))
+        if k == 0:
+            return self._with_distance(np.array([], dtype=int), np.array([]))
+        radius_km = 5.0
+        while True:
+            positions = self._bbox_positions(*_degree_box(lat, lon, radius_km))
+            distances = haversine_km(lat, lon, self.lats[positions], self.lons[positions])
+            # Only distances inside the search circle are guaranteed to be the true nearest.
+            if np.count_nonzero(distances <= radius_km) >= k or len(positions) == len(self):
+                break
+            radius_km *= 2
+        nearest = np.argsort(distances, kind="stable")[:k]
+        return self._with_distance(positions[nearest], distances[nearest])
+
+    def _with_distance(self, positions: np.ndarray, distances: np.ndarray) -> pd.DataFrame:
+        order = np.argsort(distances, kind="stable")
+        result = self.df.iloc[positions[order]].copy()
+        result["distance_km"] = distances[order]
+        return result
@@ -0,0 +1,231 @@
+from collections import OrderedDict
+import math
+import os
+import struct
+import numpy as np
+import pandas as pd
+
+
+TILE_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+# Properties kept per point at and above cluster_max_zoom; below it points carry only
+# the minimal set needed for styling.
+DETAIL_PROPERTIES = ['Ref ID',
+                     'Site Name',
+                     'Operator (or Applicant)',
+                     'Technology Type',
+                     'Development Status (short)',
+                     'Installed Capacity (MWelec)',
+                     'Planning Authority']
+
+SUMMARY_PROPERTIES = ['Ref ID', 'Technology Type', 'Development Status (short)']
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _field(number: int, wire_type: int) -> bytes:
+    return _varint((number << 3) | wire_type)
+
+
+def _bytes_field(number: int, payload: bytes) -> bytes:
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+
+def _packed(number: int, values: list[int]) -> bytes:
+    return _bytes_field(number, b"".join(_varint(v) for v in values))
+
+
+def _encode_value(value) -> bytes:
+    """Encode a property value as an MVT Value message."""
+    if isinstance(value, bool):
+        return _field(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        return _field(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _field(3, 1) + struct.pack("<d", value)
+    return _bytes_field(1, str(value).encode("utf-8"))
+
+
+def encode_point_layer(name: str, features: list[tuple[int, int, int, dict]], extent: int = 4096) -> bytes:
+    """Encode a single point layer as a Mapbox Vector Tile (spec v2).
+
+    Args:
+        name (str): Layer name.
+        features (list[tuple[int, int, int, dict]]): (id, x, y, properties) in tile coordinates.
+        extent (int): Tile extent.
+
+    Returns:
+        bytes: Protobuf-encoded tile.
+    """
+    keys: dict[str, int] = {}
+    values: dict[tuple[type, object], int] = {}
+    encoded_features = []
+    for feature_id, x, y, properties in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        geometry = [(1 & 0x7) | (1 << 3), _zigzag(x), _zigzag(y)]
+        encoded_features.append(
+            _field(1, 0) + _varint(feature_id)
+            + _packed(2, tags)
+            + _field(3, 0) + _varint(1)
+            + _packed(4, geometry)
+        )
+    layer = (
+        _field(15, 0) + _varint(2)
+        + _bytes_field(1, name.encode("utf-8"))
+        + b"".join(_bytes_field(2, f) for f in encoded_features)
+        + b"".join(_bytes_field(3, k.encode("utf-8")) for k in keys)
+        + b"".join(_bytes_field(4, _encode_value(v)) for _, v in values)
+        + _field(5, 0) + _varint(extent)
+    )
+    return _bytes_field(3, layer)
+
+
+def lon_lat_to_world(lons: np.ndarray, lats: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Web Mercator world coordinates in [0, 1), origin top-left."""
+    lats = np.clip(lats, -85.05112878, 85.05112878)
+    x = (lons + 180.0) / 360.0
+    sin = np.sin(np.radians(lats))
+    y = 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * math.pi)
+    return x, y
+
+
+class TileGenerator:
+    """Vector tiles for the project point layer with zoom-dependent clustering.
+
+    Below ``cluster_max_zoom`` points are grid-clustered on a global pixel grid, so
+    clusters are identical whichever tile they are rendered in, and points keep only
+    SUMMARY_PROPERTIES. Tiles are served from an LRU cache or pre-generated to disk.
+    """
+
+    def __init__(self, df: pd.DataFrame,
+                 layer: str = "projects",
+                 min_zoom: int = 0,
+                 max_zoom: int = 14,
+                 cluster_max_zoom: int = 10,
+                 cluster_radius: int = 40,
+                 extent: int = 4096,
+                 buffer: int = 64,
+                 cache_size: int = 1024):
+        df = df[np.isfinite(df['lat'].to_numpy(dtype=float)) & np.isfinite(df['lon'].to_numpy(dtype=float))]
+        self.layer = layer
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.cluster_max_zoom = cluster_max_zoom
+        self.cluster_radius = cluster_radius
+        self.extent = extent
+        self.buffer = buffer
+        self.cache_size = cache_size
+        self.wx, self.wy = lon_lat_to_world(df['lon'].to_numpy(dtype=float), df['lat'].to_numpy(dtype=float))
+        self.detail = self._records(df, DETAIL_PROPERTIES)
+        self.summary = self._records(df, SUMMARY_PROPERTIES)
+        self._levels: dict[int, pd.DataFrame] = {}
+        self._tiles: OrderedDict[tuple[int, int, int], bytes] = OrderedDict()
+
+    @staticmethod
+    def _records(df: pd.DataFrame, properties: list[str]) -> list[dict]:
+        properties = [p for p in properties if p in df.columns]
+        columns = []
+        for col in properties:
+            values = df[col]
+            columns.append(values.astype(object).where(values.notna(), None).tolist())
+        return [dict(zip(properties, row)) for row in zip(*columns)]
+
+    def level(self, zoom: int) -> pd.DataFrame:
+        """Renderable items for a zoom level in world coordinates.
+
+        Returns:
+            pd.DataFrame: One row per cluster or point with wx, wy, count and the
+            position of a representative point.
+        """
+        if zoom in self._levels:
+            return self._levels[zoom]
+        items = pd.DataFrame({"wx": self.wx, "wy": self.wy, "count": 1, "position": np.arange(len(self.wx))})
+        if zoom < self.cluster_max_zoom and len(items):
+            cell = self.cluster_radius / (256 * 2 ** zoom)
+            items["cx"] = np.floor(items["wx"] / cell).astype(np.int64)
+            items["cy"] = np.floor(items["wy"] / cell).astype(np.int64)
+            items = items.groupby(["cx", "cy"], sort=False).agg(
+                wx=("wx", "mean"), wy=("wy", "mean"), count=("count", "sum"), position=("position", "first")
+            ).reset_index(drop=True)
+        scale = 2 ** zoom
+        items["tx"] = np.floor(items["wx"] * scale).astype(np.int64)
+        items["ty"] = np.floor(items["wy"] * scale).astype(np.int64)
+        self._levels[zoom] = items
+        return items
+
+    def _features(self, zoom: int, items: pd.DataFrame, x: int, y: int) -> list[tuple[int, int, int, dict]]:
+        scale = 2 ** zoom
+        px = np.round((items["wx"].to_numpy() * scale - x) * self.extent).astype(np.int64)
+        py = np.round((items["wy"].to_numpy() * scale - y) * self.extent).astype(np.int64)
+        records = self.detail if zoom >= self.cluster_max_zoom else self.summary
+        features = []
+        for i, (tx, ty, count, position) in enumerate(zip(px.tolist(), py.tolist(),
+                                                          items["count"].tolist(), items["position"].tolist())):
+            if count > 1:
+                properties = {"cluster": True, "point_count": count}
+                feature_id = (1 << 40) + i
+            else:
+                properties = records[position]
+                feature_id = int(properties.get('Ref ID') or position)
+            features.append((feature_id, tx, ty, properties))
+        return features
+
+    def render(self, zoom: int, x: int, y: int) -> bytes:
+        """Encode a tile without consulting the cache; empty bytes when nothing falls inside it."""
+        items = self.level(zoom)
+        margin = self.buffer / self.extent
+        scale = 2 ** zoom
+        lx, ly = items["wx"] * scale - x, items["wy"] * scale - y
+        inside = items[(lx >= -margin) & (lx < 1 + margin) & (ly >= -margin) & (ly < 1 + margin)]
+        if inside.empty:
+            return b""
+        return encode_point_layer(self.layer, self._features(zoom, inside, x, y), self.extent)
+
+    def tile(self, zoom: int, x: int, y: int) -> bytes:
+        """Encoded tile, served from the LRU cache when possible."""
+        key = (zoom, x, y)
+        if key in self._tiles:
+            self._tiles.move_to_end(key)
+            return self._tiles[key]
+        data = self.render(zoom, x, y)
+        self._tiles[key] = data
+        if len(self._tiles) > self.cache_size:
+            self._tiles.popitem(last=False)
+        return data
+
+    def write_pyramid(self, out_dir: str, min_zoom: int | None = None, max_zoom: int | None = None) -> int:
+        """Pre-generate every non-empty tile as ``{out_dir}/{z}/{x}/{y}.pbf``.
+
+        Returns:
+            int: Number of tiles written.
+        """
+        min_zoom = self.min_zoom if min_zoom is None else min_zoom
+        max_zoom = self.max_zoom if max_zoom is None else max_zoom
+        written = 0
+        for zoom in range(min_zoom, max_zoom + 1):
+            for x, y in self.level(zoom)[["tx", "ty"]].drop_duplicates().itertuples(index=False):
+                path = os.path.join(out_dir, str(zoom), str(x), f"{y}.pbf")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(self.render(zoom, x, y))
+                written += 1
+        return written
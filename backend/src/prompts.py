@@ -1,5 +1,28 @@
-def prompt_nimby_analysis(context) -> str:
-    msg = f"""
+from dataclasses import dataclass
+
+
+@dataclass
+class Prompt:
+    """Prompt split into a static, cacheable prefix and the per-call content.
+
+    The prefix is sent as a system block with a cache-control breakpoint, so every call
+    after the first reads it from the prompt cache.
+    """
+    system: str
+    user: str
+
+    def system_blocks(self) -> list[dict]:
+        return [{
+            "type": "text",
+            "text": self.system,
+            "cache_control": {"type": "ephemeral"}
+        }]
+
+    def __str__(self) -> str:
+        return self.system + self.user
+
+
+NIMBY_ANALYSIS_SYSTEM = """
     <ROLE>
     You are a NIMBY radar. You exist to seek and mock NIMBY related projects. Ham it up. 
     </ROLE>
@@ -14,7 +37,7 @@ def prompt_nimby_analysis(context) -> str:
     </INSTRUCTIONS>
 
     <EXAMPLE OUTPUT>
-        {{
+        {
         "header": "Proposed Solar Farm Opposition - High NIMBY sentiment due to potential property value decrease and wildlife concerns.",
         "nimby_score": 0
         "certainty': 90
@@ -22,20 +45,20 @@ def prompt_nimby_analysis(context) -> str:
         "concerns over impact on local badger population"
         ]
         "certainty_meta":"I am certain that this project has been cancelled due to NIMBYism"
-        }}
+        }
     </EXAMPLE OUTPUT>
 
     The following context has been provided for you, please give an analysis of the project based on what you know,
+"""
 
-
+def prompt_nimby_analysis(context) -> Prompt:
+    return Prompt(system=NIMBY_ANALYSIS_SYSTEM, user=f"""
     <CONTEXT>
     {context}
     </CONTEXT>
-    """
-    return msg
+    """)
 
-def prompt_evaluator(context, response) -> str:
-    return f"""
+EVALUATOR_SYSTEM = """
     <ROLE>
     You are an evaluator. Your job is to get a context response between a context and output,
     and search for likely accuracy of the information. Only write a concise sentence for your reasoning. 
@@ -43,32 +66,35 @@ def prompt_evaluator(context, response) -> str:
     <INSTRUCTIONS>
     </INSTRUCTIONS>
     <EXAMPLE OUTPUT>
-    {{
+    {
     'accuracy':'certain'
     'reasoning':'proof exists in X'
-    }}
+    }
     </EXAMPLE OUTPUT>
     <EXAMPLE OUTPUT>
-    {{
+    {
     'accuracy':'high'
     'reasoning':'very likely to be true'
-    }}
+    }
     </EXAMPLE OUTPUT>
     <EXAMPLE OUTPUT>
-    {{
+    {
     'accuracy':'medium'
     'reasoning':'potentially true'
-    }}
+    }
     </EXAMPLE OUTPUT>
     <EXAMPLE OUTPUT>
-    {{
+    {
     'accuracy':'low'
     'reasoning':'unlikely to be true'
-    }}
+    }
     </EXAMPLE OUTPUT>
 
     The following message has been provided for you:
-    
+"""
+
+def prompt_evaluator(context, response) -> Prompt:
+    return Prompt(system=EVALUATOR_SYSTEM, user=f"""
     <CONTEXT>
         {context}
     </CONTEXT>
@@ -77,10 +103,9 @@ def prompt_evaluator(context, response) -> str:
     </RESPONSE>
 
 
-    """
+    """)
 
-def prompt_reseacher(context) -> str:
-    return f"""
+RESEARCHER_SYSTEM = """
     <ROLE>
     You are an investigator, based on the context provided, your job is to find an article via websearch that most likely relates to the topic.
     If multiple are found, respond with multiple articles as necssary.
@@ -96,15 +121,19 @@ def prompt_reseacher(context) -> str:
 
     You will be given a response type containiing the following:
 
-    {{
+    {
     summary: str - place a summary of finding here (concise, 1-2 sentences),
     potential_sources: list[str] - a list of links to specific web-pages, only those you think are related to the project.
     likelihood: str - low/medium/high - a certainty estimate for whether what you found is the correct one.
-    }}
+    }
 
     </INSTRUCTION>
+"""
+
+def prompt_reseacher(context) -> Prompt:
+    return Prompt(system=RESEARCHER_SYSTEM, user=f"""
     <CONTEXT>
     {context}
     </CONTEXT>
 
-    """
\ No newline at end of file
+    """)
\ No newline at end of file
@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import logging
+import random
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class TokenBucket:
+    """Per-minute budget that refills continuously and may go into debt.
+
+    Debt (from usage that turned out larger than reserved) delays later callers
+    instead of being forgotten.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def take(self, amount: float, now: float) -> float:
+        """Deduct ``amount`` and return seconds until the bucket is back out of debt."""
+        self._refill(now)
+        self.level -= amount
+        return max(0.0, -self.level * 60.0 / self.capacity)
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until the bucket is out of debt, without deducting anything."""
+        self._refill(now)
+        return max(0.0, -self.level * 60.0 / self.capacity)
+
+    def adjust(self, amount: float, now: float) -> None:
+        """Correct an earlier reservation by ``amount`` (positive deducts more)."""
+        self._refill(now)
+        self.level -= amount
+
+    def resize(self, per_minute: float, now: float) -> None:
+        """Change the budget to ``per_minute``, shifting the level by the same amount."""
+        self._refill(now)
+        self.level += per_minute - self.capacity
+        self.capacity = float(per_minute)
+
+    def observe_remaining(self, remaining: float, now: float) -> None:
+        """Trust the server's view of the remaining budget when it is tighter than ours."""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+
+@dataclass
+class RetryPolicy:
+    """Jittered exponential backoff for retryable API errors."""
+    max_retries: int = 6
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter backoff for ``attempt`` (0-based), never shorter than ``retry_after``."""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(backoff, retry_after or 0.0)
+
+
+def _header_float(headers, name: str) -> float | None:
+    value = headers.get(name) if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _reset_seconds(headers, name: str) -> float | None:
+    value = headers.get(name) if headers is not None else None
+    if value is None:
+        return None
+    try:
+        reset = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return max(0.0, (reset - datetime.now(timezone.utc)).total_seconds())
+
+
+def retry_after(headers) -> float | None:
+    """Seconds the server asked us to wait, from retry-after or the rate-limit reset headers."""
+    seconds = _header_float(headers, "retry-after")
+    if seconds is not None:
+        return seconds
+    resets = [_reset_seconds(headers, f"anthropic-ratelimit-{kind}-reset")
+              for kind in ("requests", "input-tokens", "output-tokens", "tokens")]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+class RateLimiter:
+    """Client-side limiter on requests, input tokens and output tokens per minute.
+
+    One limiter is shared by the sync and async paths of a client (and can be shared
+    between clients): reservations are computed under a lock and callers sleep with
+    either time.sleep or asyncio.sleep. The constructor budgets are only a starting
+    point: each bucket is resized to the server's anthropic-ratelimit-*-limit headers
+    and tightened to the -remaining ones, so an account on a higher tier runs at its
+    own ceiling. A retry-after pauses every caller, not just the one that was throttled.
+    """
+
+    def __init__(self, requests_per_minute: float = 50,
+                 input_tokens_per_minute: float = 30000,
+                 output_tokens_per_minute: float = 8000):
+        self.requests = TokenBucket(requests_per_minute)
+        self.input_tokens = TokenBucket(input_tokens_per_minute)
+        self.output_tokens = TokenBucket(output_tokens_per_minute)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, estimated_input_tokens: int) -> float:
+        """Reserve budget for one request and return how long to wait before sending it."""
+        with self._lock:
+            now = time.monotonic()
+            return max(
+                self._paused_until - now,
+                self.requests.take(1, now),
+                self.input_tokens.take(estimated_input_tokens, now),
+                self.output_tokens.wait_time(now),
+            )
+
+    def record(self, estimated_input_tokens: int, input_tokens: int, output_tokens: int) -> None:
+        """Settle a reservation against the usage the API reported."""
+        with self._lock:
+            now = time.monotonic()
+            self.input_tokens.adjust(input_tokens - estimated_input_tokens, now)
+            self.output_tokens.adjust(output_tokens, now)
+
+    def observe_headers(self, headers) -> None:
+        """Match budgets to the anthropic-ratelimit-*-limit and -remaining response headers."""
+        with self._lock:
+            now = time.monotonic()
+            for bucket, kind in ((self.requests, "requests"),
+                                 (self.input_tokens, "input-tokens"),
+                                 (self.output_tokens, "output-tokens")):
+                limit = _header_float(headers, f"anthropic-ratelimit-{kind}-limit")
+                if limit is not None and limit > 0 and limit != bucket.capacity:
+                    logger.info("Rate limit for %s is %.0f/min, was %.0f/min", kind, limit, bucket.capacity)
+                    bucket.resize(limit, now)
+                remaining = _header_float(headers, f"anthropic-ratelimit-{kind}-remaining")
+                if remaining is not None:
+                    bucket.observe_remaining(remaining, now)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for ``seconds``, e.g. after a 429 with retry-after."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.info("Rate limited, pausing requests for %.1fs", seconds)
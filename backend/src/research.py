@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+import logging
+from pydantic import BaseModel, ValidationError
+from src.clients import BaseClient, MessageOptions
+from src.prompts import Prompt
+
+
+logger = logging.getLogger(__name__)
+
+# Sent when a turn ends without a parseable answer and turns remain.
+ANSWER_NOW = "Stop searching and respond now with only the JSON object, using what you have found so far."
+
+
+@dataclass
+class ResearchBudget:
+    """Per-project limits on a research conversation."""
+    max_turns: int = 4
+    max_input_tokens: int = 60000
+    max_output_tokens: int = 4000
+
+
+@dataclass
+class ResearchResult:
+    """Outcome of one project's research conversation.
+
+    ``stop_reason`` is "complete" when ``response`` was parsed, otherwise the limit
+    that ended the conversation: "max_turns" or "token_budget".
+    """
+    response: BaseModel | None
+    stop_reason: str
+    turns: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+def parse_json(text: str, json_model: type[BaseModel]) -> BaseModel | None:
+    """Parse the outermost JSON object in ``text`` as ``json_model``, None while incomplete or invalid."""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        return None
+    try:
+        return json_model.model_validate_json(text[start:end + 1])
+    except ValidationError:
+        return None
+
+
+async def research(client: BaseClient, prompt: Prompt | str, json_model: type[BaseModel],
+                   budget: ResearchBudget = ResearchBudget(),
+                   options: MessageOptions = MessageOptions(),
+                   **kwargs) -> ResearchResult:
+    """Run a bounded multi-turn web research conversation until ``json_model`` can be parsed.
+
+    Each turn is streamed and cut off as soon as the answer parses. Server tool turns
+    that pause (stop reason "pause_turn") are continued by sending the assistant content
+    back; turns that end without an answer get one nudge to answer. The conversation
+    stops at ``budget.max_turns`` or once the next turn would exceed the token budget.
+
+    Args:
+        client (BaseClient): Client with stream_json_async.
+        prompt (Prompt | str): Research prompt.
+        json_model (type[BaseModel]): Expected answer format.
+        budget (ResearchBudget): Turn and token limits.
+        options (MessageOptions): Per-turn options; max_tokens is capped by the remaining output budget.
+        **kwargs: Passed to every call, e.g. custom_id.
+
+    Returns:
+        ResearchResult: Parsed answer (or None) with turn and token counts.
+    """
+    history: list[dict] = []
+    result = ResearchResult(response=None, stop_reason="max_turns")
+    while result.turns < budget.max_turns:
+        remaining_output = budget.max_output_tokens - result.output_tokens
+        if remaining_output <= 0:
+            result.stop_reason = "token_budget"
+            break
+        turn_options = MessageOptions(max_tokens=min(options.max_tokens, remaining_output))
+        message = await client.stream_json_async(
+            prompt, json_model=json_model, options=turn_options, history=history,
+            stop_when=lambda text: parse_json(text, json_model) is not None,
+            tools='web', **kwargs
+        )
+        result.turns += 1
+        result.input_tokens += message.input_tokens
+        result.output_tokens += message.output_tokens
+
+        result.response = parse_json(message.text, json_model)
+        if result.response is not None:
+            result.stop_reason = "complete"
+            break
+
+        metadata = message.metadata or {}
+        history.append({"role": "assistant", "content": metadata.get("content") or message.text})
+        if metadata.get("stop_reason") != "pause_turn":
+            history.append({"role": "user", "content": ANSWER_NOW})
+        # The whole history is re-sent, so the next turn costs at least this turn's input plus output.
+        if result.input_tokens + message.input_tokens + message.output_tokens > budget.max_input_tokens:
+            result.stop_reason = "token_budget"
+            break
+
+    if result.response is None:
+        logger.info("Research stopped without an answer (%s) after %d turns", result.stop_reason, result.turns)
+    return result
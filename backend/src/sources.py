@@ -0,0 +1,204 @@
+import asyncio
+from dataclasses import asdict, dataclass
+from functools import cached_property
+import json
+import logging
+import time
+from typing import TYPE_CHECKING, Callable
+from urllib.parse import urlsplit
+from src.cache import ResponseStore
+from src.extract import Article, extract_article
+
+if TYPE_CHECKING:
+    from src.documents import DocumentIngester
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "clean-energy-graveyard/0.2 (+https://github.com/dambem/clean_energy_graveyard)"
+
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+
+@dataclass
+class FetchResult:
+    """A fetched research source.
+
+    ``cache`` is "miss" for a full download, "revalidated" when the server answered
+    304 to a conditional request, and "fresh" when the cached copy was young enough
+    to skip the network entirely.
+    """
+    url: str
+    status: int | None
+    content_type: str | None = None
+    title: str | None = None
+    text: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched_at: float = 0.0
+    cache: str = "miss"
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None and self.status < 400
+
+
+class SourceFetcher:
+    """Async fetcher for the article URLs returned by web research.
+
+    One httpx connection pool is shared by every request, and a semaphore per host
+    keeps any single site from being hammered. Extracted content is cached on disk
+    with its ETag/Last-Modified validators: cached pages younger than ``max_age`` are
+    served without a request, older ones are revalidated with a conditional GET.
+    When a DocumentIngester is attached (``documents``), PDF bodies are streamed to
+    it from the same response and their extracted text is cached like a page's.
+    Other non-HTML responses are recorded with their content type and no text.
+    """
+
+    def __init__(self, store: ResponseStore | None = None,
+                 max_connections: int = 64,
+                 per_host: int = 4,
+                 timeout: float = 15.0,
+                 max_bytes: int = 5 * 1024 * 1024,
+                 max_age: float = 24 * 3600,
+                 extract: Callable[[bytes], Article] = extract_article):
+        self.store = store if store is not None else ResponseStore("src/data/.cache/sources.sqlite", ttl=None)
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.extract = extract
+        self.documents: DocumentIngester | None = None
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+
+    @cached_property
+    def client(self):
+        """Shared httpx.AsyncClient, built on first use."""
+        import httpx
+        return httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+        )
+
+    async def __aenter__(self) -> "SourceFetcher":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the connection pool, if it was ever opened."""
+        if "client" in self.__dict__:
+            await self.client.aclose()
+
+    def host_limit(self, url: str) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent requests to ``url``'s host."""
+        host = urlsplit(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    def _cached(self, url: str) -> FetchResult | None:
+        value = self.store.get(url)
+        return FetchResult(**json.loads(value)) if value is not None else None
+
+    def _save(self, result: FetchResult) -> FetchResult:
+        if result.ok:
+            self.store.put(result.url, json.dumps(asdict(result)).encode())
+        return result
+
+    async def _download(self, url: str, headers: dict) -> tuple[int, dict, bytes, tuple | None]:
+        """GET ``url``, reading at most max_bytes of an HTML body.
+
+        A document body the attached DocumentIngester accepts is spooled to disk by it
+        instead, and its (path, digest, size) returned last. Other bodies are not downloaded.
+        """
+        async with self.client.stream("GET", url, headers=headers) as response:
+            content_type = response.headers.get("content-type", "").split(";")[0].strip()
+            if content_type and content_type not in HTML_TYPES:
+                spooled = None
+                if (self.documents is not None and content_type in self.documents.content_types
+                        and response.status_code < 300):
+                    spooled = await self.documents.spool_response(url, response)
+                return response.status_code, response.headers, b"", spooled
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) >= self.max_bytes:
+                    logger.info("Truncated %s at %d bytes", url, self.max_bytes)
+                    break
+            return response.status_code, response.headers, bytes(body[:self.max_bytes]), None
+
+    async def fetch(self, url: str) -> FetchResult:
+        """Fetch and extract one URL, using the content cache where possible."""
+        import httpx
+        cached = self._cached(url)
+        if cached is not None and time.time() - cached.fetched_at < self.max_age:
+            cached.cache = "fresh"
+            return cached
+
+        headers = {}
+        if cached is not None and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached is not None and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        try:
+            async with self.host_limit(url):
+                status, response_headers, body, spooled = await self._download(url, headers)
+        except (httpx.HTTPError, ValueError) as e:
+            # ValueError covers DocumentTooLarge from the attached ingester.
+            return FetchResult(url=url, status=None, error=repr(e))
+
+        if status == 304 and cached is not None:
+            cached.fetched_at = time.time()
+            cached.cache = "revalidated"
+            return self._save(cached)
+        result = FetchResult(
+            url=url,
+            status=status,
+            content_type=response_headers.get("content-type", "").split(";")[0].strip() or None,
+            etag=response_headers.get("etag"),
+            last_modified=response_headers.get("last-modified"),
+            fetched_at=time.time(),
+        )
+        if status >= 400:
+            result.error = f"HTTP {status}"
+            return result
+        if spooled is not None:
+            try:
+                document = await self.documents.extract_spooled(url, *spooled)
+            except ImportError:
+                raise
+            except Exception as e:
+                result.error = f"extraction failed: {e!r}"
+                return result
+            result.text = document.text or None
+        elif result.content_type is None or result.content_type in HTML_TYPES:
+            try:
+                # Parsing is CPU-bound; keep it off the event loop so downloads keep flowing.
+                article = await asyncio.to_thread(self.extract, body)
+            except ImportError:
+                raise
+            except Exception as e:
+                result.error = f"extraction failed: {e!r}"
+                return result
+            result.title, result.text = article.title, article.text
+        return self._save(result)
+
+    async def fetch_all(self, urls: list[str]) -> dict[str, FetchResult]:
+        """Fetch many URLs concurrently; duplicates are fetched once.
+
+        Returns:
+            dict[str, FetchResult]: Result per URL, in first-seen order.
+        """
+        unique = list(dict.fromkeys(urls))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(self.fetch(url) for url in unique))
+        elapsed = time.perf_counter() - start
+        logger.info("Fetched %d sources (%d failed) in %.1fs", len(unique),
+                    sum(not r.ok for r in results), elapsed)
+        return dict(zip(unique, results))
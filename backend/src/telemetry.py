@@ -0,0 +1,254 @@
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+from pathlib import Path
+import threading
+import time
+from pydantic import BaseModel
+from src.clients import BaseClient, MessageOptions, MessageResponse
+
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# USD per million tokens: input, output, cache write, cache read.
+MODEL_PRICES = {
+    "claude-sonnet-4-5": (3.0, 15.0, 3.75, 0.30),
+    "claude-haiku-4-5": (1.0, 5.0, 1.25, 0.10),
+    "claude-opus-4-1": (15.0, 75.0, 18.75, 1.50),
+}
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@dataclass
+class CallRecord:
+    """One LLM call as seen by the pipeline."""
+    stage: str
+    model: str | None
+    started: float
+    latency: float
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    retries: int = 0
+    cached: bool = False
+    error: str | None = None
+
+    @property
+    def cost(self) -> float:
+        """Estimated spend in USD; response-cache hits cost nothing."""
+        prices = MODEL_PRICES.get(self.model)
+        if prices is None or self.cached:
+            return 0.0
+        input_price, output_price, write_price, read_price = prices
+        return (self.input_tokens * input_price
+                + self.output_tokens * output_price
+                + self.cache_creation_input_tokens * write_price
+                + self.cache_read_input_tokens * read_price) / 1e6
+
+
+@dataclass
+class StageSummary:
+    """Aggregates for every call in one pipeline stage."""
+    calls: int
+    errors: int
+    cached: int
+    retries: int
+    input_tokens: int
+    output_tokens: int
+    cache_read_input_tokens: int
+    cost: float
+    wall: float
+    latency_total: float
+    latency: dict[float, float] = field(default_factory=dict)
+
+
+class Telemetry:
+    """Collects CallRecords and aggregates them per stage.
+
+    Records are optionally appended to a JSONL file as they complete, so a crashed run
+    still leaves its telemetry behind.
+    """
+
+    def __init__(self, jsonl_path: str | None = None):
+        self.jsonl_path = jsonl_path
+        if jsonl_path is not None:
+            Path(jsonl_path).parent.mkdir(parents=True, exist_ok=True)
+        self.records: list[CallRecord] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: CallRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+            if self.jsonl_path is not None:
+                with open(self.jsonl_path, "a") as f:
+                    f.write(json.dumps(asdict(record)) + "\n")
+
+    def stages(self) -> dict[str, StageSummary]:
+        """Per-stage summaries in first-seen order."""
+        with self._lock:
+            records = list(self.records)
+        grouped: dict[str, list[CallRecord]] = {}
+        for record in records:
+            grouped.setdefault(record.stage, []).append(record)
+
+        import numpy as np
+        summaries = {}
+        for stage, calls in grouped.items():
+            latencies = np.array([c.latency for c in calls])
+            live = [c for c in calls if not c.cached]
+            summaries[stage] = StageSummary(
+                calls=len(calls),
+                errors=sum(c.error is not None for c in calls),
+                cached=len(calls) - len(live),
+                retries=sum(c.retries for c in calls),
+                input_tokens=sum(c.input_tokens for c in live),
+                output_tokens=sum(c.output_tokens for c in live),
+                cache_read_input_tokens=sum(c.cache_read_input_tokens for c in live),
+                cost=sum(c.cost for c in calls),
+                # Calls overlap, so wall-clock is first start to last finish rather than the sum.
+                wall=max(c.started + c.latency for c in calls) - min(c.started for c in calls),
+                latency_total=float(latencies.sum()),
+                latency={q: float(np.quantile(latencies, q)) for q in QUANTILES},
+            )
+        return summaries
+
+    def format_summary(self) -> str:
+        """Plain-text run summary, one line per stage."""
+        header = (f"{'stage':<10} {'calls':>6} {'err':>4} {'cached':>6} {'retry':>5} {'wall s':>8} "
+                  f"{'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'in tok':>9} {'out tok':>8} {'cost $':>8}")
+        lines = [header, "-" * len(header)]
+        for stage, s in self.stages().items():
+            lines.append(
+                f"{stage:<10} {s.calls:>6} {s.errors:>4} {s.cached:>6} {s.retries:>5} {s.wall:>8.1f} "
+                f"{s.latency[0.5]:>7.2f} {s.latency[0.95]:>7.2f} {s.latency[0.99]:>7.2f} "
+                f"{s.input_tokens:>9} {s.output_tokens:>8} {s.cost:>8.3f}"
+            )
+        return "\n".join(lines)
+
+    def prometheus(self) -> str:
+        """Aggregates in the Prometheus text exposition format."""
+        stages = self.stages()
+        lines = [
+            "# HELP nimby_llm_call_latency_seconds LLM call latency by pipeline stage.",
+            "# TYPE nimby_llm_call_latency_seconds summary",
+        ]
+        for stage, s in stages.items():
+            for q, value in s.latency.items():
+                lines.append(f'nimby_llm_call_latency_seconds{{stage="{stage}",quantile="{q}"}} {value}')
+            lines.append(f'nimby_llm_call_latency_seconds_sum{{stage="{stage}"}} {s.latency_total}')
+            lines.append(f'nimby_llm_call_latency_seconds_count{{stage="{stage}"}} {s.calls}')
+        counters = [
+            ("nimby_llm_calls_total", "LLM calls by stage and outcome.",
+             lambda s: {"ok": s.calls - s.errors - s.cached, "error": s.errors, "cached": s.cached}, "outcome"),
+            ("nimby_llm_tokens_total", "Billed tokens by stage and kind.",
+             lambda s: {"input": s.input_tokens, "output": s.output_tokens,
+                        "cache_read": s.cache_read_input_tokens}, "kind"),
+            ("nimby_llm_retries_total", "Retried LLM requests by stage.", lambda s: {None: s.retries}, None),
+            ("nimby_llm_cost_usd_total", "Estimated LLM spend in USD by stage.", lambda s: {None: s.cost}, None),
+        ]
+        for name, help_text, values, label in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for stage, s in stages.items():
+                for key, value in values(s).items():
+                    extra = f',{label}="{key}"' if label else ""
+                    lines.append(f'{name}{{stage="{stage}"{extra}}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve prometheus() on ``http://host:port/metrics`` from a daemon thread."""
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logger.info("Serving metrics on http://%s:%d/metrics", host, server.server_port)
+        return server
+
+
+class InstrumentedClient:
+    """BaseClient wrapper that records a CallRecord for every call.
+
+    Callers label calls with a ``stage`` keyword (e.g. analysis, search, eval), which is
+    consumed here. Wrap a CachedClient to see response-cache hits.
+    """
+
+    def __init__(self, client: BaseClient, telemetry: Telemetry | None = None, default_stage: str = "other"):
+        self.client = client
+        self.api_key = client.api_key
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
+        self.default_stage = default_stage
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _record(self, stage: str, started: float, timer: float, response: MessageResponse | None,
+                error: BaseException | None = None) -> None:
+        record = CallRecord(
+            stage=stage,
+            model=getattr(self.client, "model", None),
+            started=started,
+            latency=time.perf_counter() - timer,
+            error=repr(error) if error is not None else None,
+        )
+        if response is not None:
+            record.input_tokens = response.input_tokens
+            record.output_tokens = response.output_tokens
+            record.cache_read_input_tokens = response.cache_read_input_tokens
+            record.cache_creation_input_tokens = response.cache_creation_input_tokens
+            record.retries = response.retries
+            record.cached = response.cached
+        self.telemetry.add(record)
+
+    def _timed(self, method: str, *args, stage: str | None = None, **kwargs) -> MessageResponse:
+        started, timer = time.time(), time.perf_counter()
+        try:
+            response = getattr(self.client, method)(*args, **kwargs)
+        except Exception as e:
+            self._record(stage or self.default_stage, started, timer, None, e)
+            raise
+        self._record(stage or self.default_stage, started, timer, response)
+        return response
+
+    async def _atimed(self, method: str, *args, stage: str | None = None, **kwargs) -> MessageResponse:
+        started, timer = time.time(), time.perf_counter()
+        try:
+            response = await getattr(self.client, method)(*args, **kwargs)
+        except Exception as e:
+            self._record(stage or self.default_stage, started, timer, None, e)
+            raise
+        self._record(stage or self.default_stage, started, timer, response)
+        return response
+
+    def call(self, prompt: str, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        return self._timed("call", prompt, options=options, **kwargs)
+
+    def call_json(self, prompt: str, json_model: BaseModel, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        return self._timed("call_json", prompt, json_model=json_model, options=options, **kwargs)
+
+    async def call_async(self, prompt: str, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        return await self._atimed("call_async", prompt, options=options, **kwargs)
+
+    async def call_json_async(self, prompt: str, json_model: BaseModel, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        return await self._atimed("call_json_async", prompt, json_model=json_model, options=options, **kwargs)
+
+    async def stream_json_async(self, prompt: str, json_model: BaseModel, options: MessageOptions = MessageOptions(), **kwargs) -> MessageResponse:
+        return await self._atimed("stream_json_async", prompt, json_model=json_model, options=options, **kwargs)
@@ -0,0 +1,133 @@
+import asyncio
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from src.clients import MessageResponse
+from src.processors.repd_processor import DATETIME_COLS
+
+
+REPD_ROWS = [
+    # Ref ID, updated, operator, site, technology, status, authority, county, capacity, x, y, submitted
+    (1, "07/07/2021", "RWE", "Aberthaw Solar Farm", "Solar Photovoltaics", "Application Refused", "Vale of Glamorgan", "South Glamorgan", "35", "302219", "166320", "16/04/2020"),
+    (2, "20/11/2022", "Orsted", "Hunterston Wind", "Wind Onshore", "Operational", "North Ayrshire", "Ayrshire", "170", "220000", "651500", "01/02/2019"),
+    (3, "20/12/2023", "Kronos Solar", "Eveley Farm", "Solar Photovoltaics", "Application Withdrawn", "Test Valley", "Hampshire ", " ", "430000", "140000", "30/09/2021"),
+    (4, "18/12/2024", "SPGL", "Westover Farm", "Battery", "Appeal Refused", "Test Valley", "Hampshire", "7.5", "431500 ", "141000", "25/01/2022"),
+    (5, "29/09/2024", "Statkraft", "Godsfield Solar", "Solar Photovoltaics", "Application Refused", "Winchester", "Hampshire", "50", "460000", "132000", ""),
+]
+
+
+def write_repd_csv(path, rows=REPD_ROWS):
+    """Write a small REPD-shaped extract in the publication encoding."""
+    records = []
+    for ref, updated, operator, site, tech, status, authority, county, capacity, x, y, submitted in rows:
+        record = {col: "" for col in DATETIME_COLS}
+        record.update({
+            "Ref ID": ref,
+            "Record Last Updated (dd/mm/yyyy)": updated,
+            "Operator (or Applicant)": operator,
+            "Site Name": site,
+            "Technology Type": tech,
+            "Development Status (short)": status,
+            "Planning Authority": authority,
+            "County": county,
+            "Country": "England",
+            "Installed Capacity (MWelec)": capacity,
+            "X-coordinate": x,
+            "Y-coordinate": y,
+            "Planning Application Submitted": submitted,
+        })
+        records.append(record)
+    pd.DataFrame(records).to_csv(path, index=False, encoding="cp1252")
+    return path
+
+
+@pytest.fixture
+def repd_csv(tmp_path):
+    return write_repd_csv(tmp_path / "repd.csv")
+
+
+NIMBY_JSON = (
+    '{"header": "Solar farm sunk", "nimby_score": 80, "certainty": 60, '
+    '"certainty_meta": "certainty is moderate", "interesting_information": [], "organised_nimby": []}'
+)
+
+EVAL_JSON = '{"accuracy": "high", "reasoning": "reported in local press"}'
+
+
+class FakeClient:
+    """In-memory stand-in for AnthropicClient that records prompts and tracks concurrency."""
+
+    def __init__(self, responses: dict[str, str] | None = None, delay: float = 0.01):
+        self.api_key = "test"
+        self.responses = responses or {"NimbyFormat": NIMBY_JSON, "AgentEval": EVAL_JSON}
+        self.delay = delay
+        self.prompts: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def call_json(self, prompt, json_model, options=None, **kwargs):
+        self.prompts.append(prompt)
+        text = self.responses[json_model.__name__]
+        return MessageResponse(text=text, input_tokens=len(str(prompt)), output_tokens=len(text))
+
+    async def call_json_async(self, prompt, json_model, options=None, **kwargs):
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        text = self.responses[json_model.__name__]
+        return MessageResponse(text=text, input_tokens=len(str(prompt)), output_tokens=len(text))
+
+
+@pytest.fixture
+def fake_client():
+    return FakeClient()
+
+
+class FakeBatchServer:
+    """Local stand-in for the Message Batches endpoints (``client.messages.batches``).
+
+    Each request is answered by ``handler(params) -> text``; custom IDs listed in
+    ``errored`` come back as errored results. Batches end after ``polls`` retrieves.
+    """
+
+    def __init__(self, handler, errored=(), polls=1):
+        self.handler = handler
+        self.errored = set(errored)
+        self.polls = polls
+        self.batches: dict[str, list[dict]] = {}
+        self._retrieves: dict[str, int] = {}
+
+    async def create(self, requests):
+        batch_id = f"msgbatch_{len(self.batches)}"
+        self.batches[batch_id] = list(requests)
+        self._retrieves[batch_id] = 0
+        return SimpleNamespace(id=batch_id, processing_status="in_progress")
+
+    async def retrieve(self, batch_id):
+        self._retrieves[batch_id] += 1
+        status = "ended" if self._retrieves[batch_id] >= self.polls else "in_progress"
+        return SimpleNamespace(id=batch_id, processing_status=status)
+
+    async def results(self, batch_id):
+        entries = []
+        for request in self.batches[batch_id]:
+            custom_id = request["custom_id"]
+            if custom_id in self.errored:
+                result = SimpleNamespace(type="errored")
+            else:
+                message = SimpleNamespace(
+                    content=[SimpleNamespace(type="text", text=self.handler(request["params"]))],
+                    stop_reason="end_turn",
+                    usage=SimpleNamespace(input_tokens=1, output_tokens=1),
+                )
+                result = SimpleNamespace(type="succeeded", message=message)
+            entries.append(SimpleNamespace(custom_id=custom_id, result=result))
+
+        async def stream():
+            for entry in entries:
+                yield entry
+        return stream()
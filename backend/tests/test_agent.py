@@ -0,0 +1,106 @@
+import asyncio
+import json
+from main import NimbyAgent
+from src.clients import MessageResponse
+from src.research import ANSWER_NOW, ResearchBudget
+from src.processors.repd_processor import REPDProcessor
+
+
+def test_run_async_bounds_concurrency_and_orders_by_ref_id(repd_csv, tmp_path, fake_client):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    agent = NimbyAgent(client=fake_client, processor=processor)
+    # Feed rows newest Ref ID first, so completions arrive out of Ref ID order.
+    context = processor.filter_by_cancelled(processor.load()).iloc[::-1]
+    completed = []
+
+    results = asyncio.run(agent.run_async(max_values=None, concurrency=2, context=context,
+                                          on_result=lambda row, _: completed.append(row["Ref ID"])))
+
+    assert completed != sorted(completed)
+    assert [row["Ref ID"] for row, _ in results] == [1, 3, 4, 5]
+    assert all(nimby.nimby_score == 80 for _, nimby in results)
+    assert fake_client.max_in_flight == 2
+    assert agent.last_run_stats.completed == 4
+    assert all("Site: " in prompt.user and "NaT" not in prompt.user for prompt in fake_client.prompts)
+    assert agent.last_run_stats.failed == 0
+
+
+def test_run_analyses_projects_one_at_a_time(repd_csv, tmp_path, fake_client):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    agent = NimbyAgent(client=fake_client, processor=processor)
+
+    results = agent.run(max_values=2)
+
+    assert [row["Ref ID"] for row, _ in results] == [1, 3]
+    assert all(nimby.nimby_score == 80 for _, nimby in results)
+    assert agent.run_singular("Site: Westover Farm").nimby_score == 80
+
+
+def test_eval_streams_project_scores_and_breaks_down(repd_csv, tmp_path, fake_client):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    agent = NimbyAgent(client=fake_client, processor=processor)
+    results = asyncio.run(agent.run_async(max_values=None))
+    log_path = tmp_path / "eval_log.json"
+    fake_client.max_in_flight = 0
+
+    evaluation = agent.eval(results, concurrency=2, log_path=str(log_path))
+
+    assert (evaluation.certainty, evaluation.accuracy, evaluation.count) == (60, 80, 4)
+    assert evaluation.by_technology["Solar Photovoltaics"]["count"] == 3
+    assert evaluation.by_authority["Test Valley"] == {"certainty": 60, "accuracy": 80, "count": 2}
+    logged = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert sorted(entry["refid"] for entry in logged) == [1, 3, 4, 5]
+    assert fake_client.max_in_flight == 2
+
+
+WEB_JSON = '{"summary": "Refused after a parish campaign", "potential_sources": [], "likelihood": "high", "perpetrators": "parish council"}'
+
+
+class ScriptedSearchClient:
+    """Streams a scripted sequence of (text, stop_reason) turns for every conversation."""
+
+    def __init__(self, turns: list[tuple[str, str]]):
+        self.api_key = "test"
+        self.turns = turns
+        self.calls: list[dict] = []
+
+    async def stream_json_async(self, prompt, json_model, options=None, stop_when=None, **kwargs):
+        turn = sum(1 for call in self.calls if call["custom_id"] == kwargs.get("custom_id"))
+        self.calls.append({"custom_id": kwargs.get("custom_id"), "history": list(kwargs["history"]),
+                           "max_tokens": options.max_tokens})
+        await asyncio.sleep(0.01)
+        text, stop_reason = self.turns[turn]
+        return MessageResponse(text=text, input_tokens=1000, output_tokens=300,
+                               metadata={"stop_reason": stop_reason, "content": text})
+
+
+def test_run_search_continues_paused_turns_until_answer(repd_csv, tmp_path):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    client = ScriptedSearchClient([("searching", "pause_turn"), (WEB_JSON, "end_turn")])
+    agent = NimbyAgent(client=client, processor=processor)
+    context = processor.filter_by_cancelled(processor.load())
+
+    results = asyncio.run(agent.run_search_async(context, concurrency=2))
+
+    assert [row['Ref ID'] for row, _ in results] == [1, 3, 4, 5]
+    row, result = results[0]
+    assert (result.stop_reason, result.turns, result.input_tokens) == ("complete", 2, 2000)
+    assert result.response.perpetrators == "parish council"
+    second_turn = [call for call in client.calls if call["custom_id"] == "search-1"][1]
+    assert second_turn["history"] == [{"role": "assistant", "content": "searching"}]
+
+
+def test_run_search_stops_at_turn_and_token_budgets(repd_csv, tmp_path):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    client = ScriptedSearchClient([("no idea", "end_turn")] * 10)
+    agent = NimbyAgent(client=client, processor=processor)
+
+    capped = agent.run_search("project", budget=ResearchBudget(max_turns=3))
+    assert (capped.response, capped.stop_reason, capped.turns) == (None, "max_turns", 3)
+    assert client.calls[1]["history"][-1]["content"] == ANSWER_NOW
+
+    client.calls.clear()
+    starved = agent.run_search("project", budget=ResearchBudget(max_turns=10, max_input_tokens=2000,
+                                                                max_output_tokens=500))
+    assert (starved.stop_reason, starved.turns) == ("token_budget", 1)
+    assert client.calls[0]["max_tokens"] == 500
@@ -0,0 +1,68 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from src.api import ApiConfig, create_app
+from src.processors.repd_processor import REPDProcessor
+from tests.conftest import REPD_ROWS, write_repd_csv
+
+
+@pytest.fixture
+def api(repd_csv, tmp_path):
+    nimby_path = tmp_path / "nimby_score.json"
+    nimby_path.write_text(json.dumps([{"refid": 1, "header": "sunk"}, {"refid": 3, "header": "withdrawn"}]))
+    councils_path = tmp_path / "councils.json"
+    councils_path.write_text(json.dumps({"Test Valley": "https://planning.testvalley.gov.uk/"}))
+    config = ApiConfig(repd_src=str(repd_csv), nimby_path=str(nimby_path), councils_path=str(councils_path))
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    with TestClient(create_app(processor, config)) as client:
+        yield client
+
+
+def test_projects_filters_and_paginates(api):
+    response = api.get("/projects", params={"status": ["Application Refused", "Appeal Refused"], "limit": 2})
+    body = response.json()
+    assert body["total"] == 3
+    assert [f["properties"]["Ref ID"] for f in body["features"]] == [1, 4]
+
+    response = api.get("/projects", params={"planning_authority": "Test Valley", "bbox": "-2,50.5,-1,51.5",
+                                            "properties": ["Ref ID"]})
+    assert [f["properties"] for f in response.json()["features"]] == [{"Ref ID": 3}, {"Ref ID": 4}]
+
+    response = api.get("/projects", params={"date_from": "2024-01-01", "technology": "Solar Photovoltaics"})
+    assert [f["properties"]["Ref ID"] for f in response.json()["features"]] == [5]
+
+
+def test_etag_revalidation(api):
+    first = api.get("/nimby-scores", params={"refid": [3]})
+    assert first.json()["items"] == [{"refid": 3, "header": "withdrawn"}]
+    second = api.get("/nimby-scores", params={"refid": [3]}, headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 304
+
+
+def test_missing_records_404(api):
+    assert api.get("/projects/99").status_code == 404
+    assert api.get("/nimby-scores/4").status_code == 404
+    assert api.get("/councils", params={"planning_authority": "Test Valley"}).status_code == 200
+
+
+def test_tiles_endpoint(api):
+    response = api.get("/tiles/0/0/0.pbf")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+    assert api.get("/tiles/0/1/1.pbf").status_code == 404
+    assert api.get("/tiles/1/1/1.pbf").status_code == 204
+
+
+def test_projects_total_counts_only_served_features(tmp_path):
+    unlocated = (6, "01/03/2024", "Nobody", "Nowhere Farm", "Solar Photovoltaics", "Application Refused",
+                 "Test Valley", "Hampshire", "5", "", "", "")
+    repd_csv = write_repd_csv(tmp_path / "repd.csv", REPD_ROWS + [unlocated])
+    config = ApiConfig(repd_src=str(repd_csv), nimby_path=str(tmp_path / "none.json"),
+                       councils_path=str(tmp_path / "none.json"))
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    with TestClient(create_app(processor, config)) as client:
+        body = client.get("/projects", params={"status": ["Application Refused"]}).json()
+        missing = client.get("/projects/6")
+
+    assert body["total"] == len(body["features"]) == 2
+    assert missing.status_code == 404
@@ -0,0 +1,27 @@
+import asyncio
+from main import NimbyFormat
+from src.cache import CachedClient, ResponseStore
+
+
+def test_cached_client_serves_repeat_prompts(tmp_path, fake_client):
+    client = CachedClient(fake_client, store=ResponseStore(str(tmp_path / "responses.sqlite")))
+
+    first = asyncio.run(client.call_json_async("prompt", json_model=NimbyFormat))
+    second = asyncio.run(client.call_json_async("prompt", json_model=NimbyFormat))
+    asyncio.run(client.call_json_async("other prompt", json_model=NimbyFormat))
+
+    assert second.text == first.text
+    assert fake_client.prompts == ["prompt", "other prompt"]
+    assert (client.stats.hits, client.stats.misses) == (1, 2)
+
+
+def test_store_expires_and_evicts(tmp_path):
+    store = ResponseStore(str(tmp_path / "responses.sqlite"), max_bytes=10, ttl=None)
+    store.put("a", b"123456")
+    store.put("b", b"123456")
+    assert store.get("a") is None
+    assert store.get("b") == b"123456"
+
+    expiring = ResponseStore(str(tmp_path / "expiring.sqlite"), ttl=-1)
+    expiring.put("a", b"1")
+    assert expiring.get("a") is None
@@ -1,7 +1,14 @@
+import asyncio
+from types import SimpleNamespace
+import anthropic
+import httpx
 import pytest
-from src.clients import AnthropicClient
-from main import AppConfig, NimbyAgent
+from src.clients import AnthropicClient, BatchClient, run_blocking
+from main import AgentEval, AppConfig, NimbyAgent
 from src.processors.repd_processor import REPDProcessor
+from src.prompts import prompt_nimby_analysis
+from src.rate_limit import RateLimiter, RetryPolicy
+from tests.conftest import NIMBY_JSON, FakeBatchServer
 
 @pytest.fixture(scope="module")
 def app():
@@ -25,3 +32,254 @@ def test_specific_context(app):
     assert 'solar' in response.certainty_meta
     assert '2001' in response.certainty_meta
 
+
+
+def _fake_message(*blocks, stop_reason="end_turn"):
+    return SimpleNamespace(
+        content=list(blocks),
+        stop_reason=stop_reason,
+        usage=SimpleNamespace(input_tokens=10, output_tokens=5),
+    )
+
+
+def _patch_async_create(client, create, headers=None):
+    """Route the client's raw async create through ``create`` returning a fake Message."""
+    async def raw_create(**kwargs):
+        message = await create(**kwargs)
+        return SimpleNamespace(headers=headers or {}, parse=lambda: message)
+    client.async_client.messages.with_raw_response.create = raw_create
+
+
+def test_run_parses_replies_from_the_sync_client(repd_csv, tmp_path):
+    client = AnthropicClient(api_key="test")
+    requests = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        message = _fake_message(SimpleNamespace(type="text", text=NIMBY_JSON))
+        return SimpleNamespace(headers={}, parse=lambda: message)
+
+    client.client.messages.with_raw_response.create = create
+    agent = NimbyAgent(client=client, processor=REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache")))
+
+    results = agent.run(max_values=2)
+
+    assert [row["Ref ID"] for row, _ in results] == [1, 3]
+    assert all(nimby.nimby_score == 80 for _, nimby in results)
+    assert len(requests) == 2 and "output_config" in requests[0]
+
+
+def test_every_call_returns_reply_text():
+    client = AnthropicClient(api_key="test")
+    message = _fake_message(SimpleNamespace(type="text", text=NIMBY_JSON))
+
+    async def create(**kwargs):
+        return message
+
+    client.client.messages.with_raw_response.create = lambda **kwargs: SimpleNamespace(headers={}, parse=lambda: message)
+    _patch_async_create(client, create)
+    batch = BatchClient(api_key="test", collect_delay=0.01, poll_interval=0.01,
+                        batches=FakeBatchServer(lambda params: NIMBY_JSON))
+
+    responses = [
+        client.call("prompt"),
+        client.call_json("prompt", json_model=AgentEval),
+        asyncio.run(client.call_async("prompt")),
+        asyncio.run(client.call_json_async("prompt", json_model=AgentEval)),
+        batch.call("prompt"),
+        batch.call_json("prompt", json_model=AgentEval),
+    ]
+
+    assert all(response.text == NIMBY_JSON for response in responses)
+
+
+def test_call_json_async_awaits_shared_client_and_passes_tools():
+    client = AnthropicClient(api_key="test")
+    requests = []
+
+    async def create(**kwargs):
+        requests.append(kwargs)
+        return _fake_message(
+            SimpleNamespace(type="server_tool_use"),
+            SimpleNamespace(type="text", text='{"header": '),
+            SimpleNamespace(type="text", text='"x"}'),
+        )
+
+    _patch_async_create(client, create)
+    response = asyncio.run(client.call_json_async("prompt", json_model=AgentEval, tools="web"))
+    plain = asyncio.run(client.call_async("prompt"))
+
+    assert response.text == '{"header": "x"}'
+    assert response.metadata["stop_reason"] == "end_turn"
+    assert response.input_tokens == 10
+    assert requests[0]["tools"][0]["name"] == "web_search"
+    assert "output_config" in requests[0]
+    assert "tools" not in requests[1] and "output_config" not in requests[1]
+    assert plain.text == '{"header": "x"}'
+
+
+def test_batch_client_collects_calls_into_one_batch(repd_csv, tmp_path):
+    server = FakeBatchServer(lambda params: NIMBY_JSON, errored={"ref-4"}, polls=2)
+    client = BatchClient(api_key="test", collect_delay=0.01, poll_interval=0.01, batches=server)
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    agent = NimbyAgent(client=client, processor=processor)
+
+    results = asyncio.run(agent.run_async(max_values=None, concurrency=100))
+
+    assert len(server.batches) == 1
+    batch = next(iter(server.batches.values()))
+    assert [r["custom_id"] for r in batch] == ["ref-1", "ref-3", "ref-4", "ref-5"]
+    assert "output_config" in batch[0]["params"]
+    assert [row["Ref ID"] for row, _ in results] == [1, 3, 5]
+    assert agent.last_run_stats.failed == 1
+
+
+def test_blocking_calls_close_the_pool_with_their_event_loop():
+    server = FakeBatchServer(lambda params: NIMBY_JSON)
+    client = BatchClient(api_key="test", collect_delay=0.01, poll_interval=0.01, batches=server)
+    pools = []
+
+    async def open_pool():
+        pools.append(client.async_client)
+
+    run_blocking(client, open_pool())
+    run_blocking(client, open_pool())
+
+    assert pools[0] is not pools[1] and pools[0].is_closed() and pools[1].is_closed()
+    assert client.call("one").text == client.call("two").text == NIMBY_JSON
+    assert len(server.batches) == 2
+
+
+def test_prompt_prefix_sent_as_cached_system_block():
+    client = AnthropicClient(api_key="test")
+    requests = []
+
+    async def create(**kwargs):
+        requests.append(kwargs)
+        message = _fake_message(SimpleNamespace(type="text", text="{}"))
+        message.usage.cache_read_input_tokens = 900
+        message.usage.cache_creation_input_tokens = None
+        return message
+
+    _patch_async_create(client, create)
+    prompt = prompt_nimby_analysis(context={"Site Name": "Westover Farm"})
+    response = asyncio.run(client.call_async(prompt))
+
+    assert requests[0]["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert "<ROLE>" in requests[0]["system"][0]["text"]
+    assert "Westover Farm" in requests[0]["messages"][0]["content"]
+    assert "Westover Farm" not in requests[0]["system"][0]["text"]
+    assert (response.cache_read_input_tokens, response.cache_creation_input_tokens) == (900, 0)
+
+
+def _overloaded(status_code, headers=None):
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    return anthropic.APIStatusError("overloaded", response=response, body=None)
+
+
+def test_retries_overloads_with_backoff_and_shared_limiter(monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter(requests_per_minute=60, input_tokens_per_minute=100000, output_tokens_per_minute=100000)
+    client = AnthropicClient(api_key="test", rate_limiter=limiter, retry=RetryPolicy(max_retries=3, base_delay=0.5))
+    failures = [_overloaded(529), _overloaded(429, {"retry-after": "7"})]
+
+    async def create(**kwargs):
+        if failures:
+            raise failures.pop(0)
+        return _fake_message(SimpleNamespace(type="text", text="ok"))
+
+    _patch_async_create(client, create, headers={"anthropic-ratelimit-requests-remaining": "0"})
+    response = asyncio.run(client.call_async("prompt"))
+
+    assert response.text == "ok"
+    assert response.retries == 2
+    assert len(sleeps) == 2 and sleeps[0] <= 0.5 and sleeps[1] >= 6.9
+    # The server reported no requests left, so the next caller has to wait for a refill.
+    assert limiter.reserve(10) > 0
+
+
+def test_non_retryable_errors_raise_immediately():
+    client = AnthropicClient(api_key="test", retry=RetryPolicy(max_retries=3))
+
+    async def create(**kwargs):
+        raise _overloaded(400)
+
+    _patch_async_create(client, create)
+    with pytest.raises(anthropic.APIStatusError):
+        asyncio.run(client.call_async("prompt"))
+
+
+def test_token_bucket_waits_for_refill():
+    limiter = RateLimiter(requests_per_minute=60, input_tokens_per_minute=600, output_tokens_per_minute=600)
+    assert limiter.reserve(600) == 0
+    assert limiter.reserve(60) == pytest.approx(6, abs=0.1)
+
+
+def test_limit_headers_resize_buckets():
+    limiter = RateLimiter(requests_per_minute=1, input_tokens_per_minute=100000, output_tokens_per_minute=100000)
+    assert limiter.reserve(10) == 0
+    assert limiter.reserve(10) == pytest.approx(60, abs=0.1)
+
+    # The account is on a higher tier than the defaults assume.
+    limiter.observe_headers({"anthropic-ratelimit-requests-limit": "600",
+                             "anthropic-ratelimit-input-tokens-limit": "400000"})
+
+    assert limiter.requests.capacity == 600 and limiter.input_tokens.capacity == 400000
+    assert limiter.output_tokens.capacity == 100000
+    assert max(limiter.reserve(10) for _ in range(100)) == 0
+    limiter.observe_headers({"anthropic-ratelimit-requests-limit": "600",
+                             "anthropic-ratelimit-requests-remaining": "0"})
+    assert limiter.reserve(10) == pytest.approx(0.1, abs=0.05)
+
+
+class _FakeStream:
+    """Async context manager mimicking AsyncMessageStream over fixed text deltas."""
+
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.read = 0
+        self.response = SimpleNamespace(headers={})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for delta in self.deltas:
+            self.read += 1
+            yield delta
+
+    @property
+    def current_message_snapshot(self):
+        text = "".join(self.deltas[:self.read])
+        return _fake_message(SimpleNamespace(type="text", text=text), stop_reason=None)
+
+
+def test_stream_json_async_stops_once_answer_complete():
+    client = AnthropicClient(api_key="test")
+    stream = _FakeStream(['{"accuracy": "high", ', '"reasoning": "x"}', ' trailing', ' text'])
+    requests = []
+
+    def open_stream(**kwargs):
+        requests.append(kwargs)
+        return stream
+
+    client.async_client.messages.stream = open_stream
+    history = [{"role": "assistant", "content": "searching"}]
+    response = asyncio.run(client.stream_json_async(
+        "prompt", json_model=AgentEval, history=history, tools="web",
+        stop_when=lambda text: text.endswith("}"),
+    ))
+
+    assert response.text == '{"accuracy": "high", "reasoning": "x"}'
+    assert stream.read == 2
+    assert requests[0]["messages"][1:] == history
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import pandas as pd
+from main import NimbyAgent
+from src.processors.dedup import cluster_projects, normalise_operator, normalise_site_name
+from src.processors.repd_processor import REPDProcessor
+from tests.conftest import REPD_ROWS, write_repd_csv
+
+
+def projects(rows: list[tuple]) -> pd.DataFrame:
+    # Ref ID, site, operator, x, y, updated, reapplied as
+    return pd.DataFrame(rows, columns=['Ref ID', 'Site Name', 'Operator (or Applicant)', 'X-coordinate',
+                                       'Y-coordinate', 'Record Last Updated (dd/mm/yyyy)',
+                                       'Are they re-applying (New REPD Ref)'])
+
+
+def test_normalised_names_drop_scheme_and_company_words():
+    names = normalise_site_name(pd.Series(["Westover Farm Solar", "Westover Farm - BESS", "Solar Farm", None]))
+    operators = normalise_operator(pd.Series(["RWE Renewables UK Ltd", "RWE (formerly npower)", "Private Developer"]))
+
+    assert names.tolist() == ["westover", "westover", "", ""]
+    assert operators.tolist() == ["rwe", "rwe", ""]
+
+
+def test_cluster_projects_joins_same_scheme_records():
+    df = projects([
+        (1, "Westover Farm Solar", "SPGL", 431500, 141000, "2022-01-01", None),
+        (2, "Westover Farm BESS", "Statkraft", 431600, 141050, "2024-12-18", None),
+        (3, "Chilbolton Down", "SPGL", 432200, 141300, "2023-05-01", None),
+        (4, "Manor Farm", "Lightsource", 400000, 100000, "2020-01-01", None),
+        (5, "Manor Farm", "Kronos Solar", 420000, 120000, "2020-01-01", None),
+        (6, "Home Farm", "Private Developer", 400300, 100000, "2021-01-01", "7"),
+        (7, "Longstock Park", "Private Developer", 400400, 100100, "2022-06-01", None),
+        (8, "Eveley Farm", None, None, None, "2020-01-01", None),
+    ])
+
+    clusters = cluster_projects(df)
+
+    # 1-2 share a name, 1-3 an operator within 1km; 6 names 7 as its re-application.
+    assert clusters.tolist() == [2, 2, 2, 4, 5, 7, 7, 8]
+    assert clusters.index.equals(df.index)
+    assert cluster_projects(df, radius_km=0.5).tolist() == [2, 2, 3, 4, 5, 7, 7, 8]
+
+
+def test_run_async_analyses_one_project_per_cluster(tmp_path, fake_client):
+    duplicate = (6, "01/01/2021", "RWE", "Aberthaw Solar Farm - BESS", "Battery", "Application Refused",
+                 "Vale of Glamorgan", "South Glamorgan", "10", "302300", "166400", "")
+    processor = REPDProcessor(src=str(write_repd_csv(tmp_path / "repd.csv", REPD_ROWS + [duplicate])),
+                              cache_dir=str(tmp_path / "cache"))
+    agent = NimbyAgent(client=fake_client, processor=processor)
+    seen = []
+
+    results = asyncio.run(agent.run_async(max_values=None, on_result=lambda row, _: seen.append(row['Ref ID'])))
+    undeduped = asyncio.run(agent.run_async(max_values=None, dedupe=False))
+
+    assert [row['Ref ID'] for row, _ in results] == [1, 3, 4, 5, 6]
+    assert sorted(seen) == [1, 3, 4, 5, 6]
+    assert len(fake_client.prompts) == 4 + 5
+    analysed = [prompt.user.split("Nearby")[0] for prompt in fake_client.prompts[:4]]
+    assert sum("Site: Aberthaw Solar Farm\n" in text for text in analysed) == 1
+    assert not any("BESS" in text for text in analysed)
+    assert results[0][1] is results[-1][1]
+    assert agent.last_run_stats.completed == len(undeduped) == 5
+
+
+def test_eval_async_scores_each_cluster_once(tmp_path, fake_client):
+    duplicate = (6, "01/01/2021", "RWE", "Aberthaw Solar Farm - BESS", "Battery", "Application Refused",
+                 "Vale of Glamorgan", "South Glamorgan", "10", "302300", "166400", "")
+    processor = REPDProcessor(src=str(write_repd_csv(tmp_path / "repd.csv", REPD_ROWS + [duplicate])),
+                              cache_dir=str(tmp_path / "cache"))
+    agent = NimbyAgent(client=fake_client, processor=processor)
+    results = asyncio.run(agent.run_async(max_values=None))
+    log_path = tmp_path / "eval_log.json"
+
+    evaluation = asyncio.run(agent.eval_async(results, log_path=str(log_path)))
+
+    evaluated = fake_client.prompts[4:]
+    assert len(evaluated) == 4
+    assert not any("BESS" in str(prompt) for prompt in evaluated)
+    assert evaluation.count == 5
+    assert sorted(json.loads(line)["refid"] for line in log_path.read_text().splitlines()) == [1, 3, 4, 5, 6]
+
+    # Without deduplication every project has its own output, so each is evaluated.
+    independent = asyncio.run(agent.run_async(max_values=None, dedupe=False))
+    fake_client.prompts.clear()
+    evaluation = asyncio.run(agent.eval_async(independent, log_path=None))
+
+    assert len(fake_client.prompts) == evaluation.count == 5
+    assert sum("BESS" in str(prompt) for prompt in fake_client.prompts) == 1
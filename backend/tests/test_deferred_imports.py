@@ -0,0 +1,36 @@
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = {"pandas", "anthropic", "geopandas", "pyproj", "shapely", "pyarrow"}
+
+
+def imported_modules(module: str) -> dict[str, int]:
+    """Top-level packages imported by ``import module`` with their cumulative -X importtime microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        top = name.strip().split(".")[0]
+        modules[top] = max(modules.get(top, 0), int(cumulative))
+    return modules
+
+
+@pytest.mark.parametrize("module, allowed", [
+    ("main", set()),
+    ("src.clients", set()),
+    # pandas 3 loads pyarrow.lib itself for its string dtype.
+    ("src.processors.repd_processor", {"pandas", "pyarrow"}),
+])
+def test_entry_points_defer_heavy_imports(module, allowed):
+    modules = imported_modules(module)
+    eager = HEAVY_MODULES.intersection(modules) - allowed
+    assert not eager, f"import {module} eagerly loads {sorted(eager)} ({modules.get(module.split('.')[0])}us total)"
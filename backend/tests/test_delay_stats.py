@@ -0,0 +1,43 @@
+import json
+import pandas as pd
+from src.processors.delay_stats import delay_histogram, processing_times, write_delay_stats
+
+
+def _applications():
+    submitted = pd.to_datetime(["2020-01-01", "2020-01-01", "2021-01-01", "2021-01-01", "2014-01-01", "2021-01-01"])
+    return pd.DataFrame({
+        'Development Status (short)': ["Application Refused", "Application Withdrawn", "Appeal Refused",
+                                       "Application Refused", "Application Refused", "Operational"],
+        'Technology Type': ["Solar Photovoltaics", "Battery", "Solar Photovoltaics", "Battery", "Battery", "Battery"],
+        'Planning Application Submitted': submitted,
+        'Planning Permission Refused': submitted + pd.to_timedelta([30, 0, 0, 400, 10, 0], unit="D"),
+        'Planning Application Withdrawn': submitted + pd.to_timedelta([0, 200, 0, 0, 0, 0], unit="D"),
+        'Appeal Refused': submitted + pd.to_timedelta([0, 0, 800, 0, 0, 0], unit="D"),
+    })
+
+
+def test_processing_times_picks_decision_column_per_status():
+    times = processing_times(_applications())
+    assert times['Processing_Time'].tolist() == [30, 200, 800, 400]
+    assert times['Year'].tolist() == [2020, 2020, 2021, 2021]
+
+
+def test_histogram_over_arbitrary_dims():
+    times = processing_times(_applications(), dims=['Technology Type'])
+    hist = delay_histogram(times, by=['Technology Type'])
+    assert hist.loc["Battery", "90-180 days"] == 0
+    assert hist.loc["Battery", "180-365 days"] == 1
+    assert hist.loc["Battery", "1 Year - 2 Years"] == 1
+    assert hist.loc["Solar Photovoltaics", "Over 2 Years"] == 1
+    assert hist.loc["Solar Photovoltaics", "avgDelay"] == 415
+
+
+def test_write_delay_stats(tmp_path):
+    paths = write_delay_stats(_applications(), str(tmp_path))
+    final = json.loads(open(paths["final.json"]).read())
+    assert [year["year"] for year in final] == [2020, 2021]
+    assert final[0]["avgDelay"] == 115.0
+    assert [d["count"] for d in final[1]["distribution"]] == [0, 0, 0, 1, 1]
+    refused = json.loads(json.loads(open(paths["df_refused.json"]).read()))
+    assert refused == [{"Processing_Time": 30.0, "Planning Application Submitted String": "2020-01-01"},
+                       {"Processing_Time": 400.0, "Planning Application Submitted String": "2021-01-01"}]
@@ -0,0 +1,159 @@
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+import pytest
+from src.cache import ResponseStore
+from src.documents import DocumentIngester, DocumentTooLarge
+from src.sources import SourceFetcher
+
+
+def make_pdf(pages: list[str]) -> bytes:
+    """Minimal uncompressed PDF with one line of Helvetica text per page."""
+    n = len(pages)
+    font = 3 + 2 * n
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (3 + 2 * i) for i in range(n)) + b"] /Count %d >>" % n,
+    ]
+    for i, text in enumerate(pages):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode() + b") Tj ET"
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (4 + 2 * i, font))
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def size_extract(path: str, max_chars: int) -> dict:
+    """Stand-in for extract_pdf_text; module level so worker processes can import it."""
+    with open(path, "rb") as f:
+        head = f.read(16)
+    return {"page_count": 1, "pages_read": 1, "text": f"{os.path.getsize(path)}:{head.decode()}"[:max_chars],
+            "truncated": False}
+
+
+class DocumentServer:
+    """Local HTTP server serving fixed bodies as application/pdf, counting requests per path."""
+
+    def __init__(self, files: dict[str, bytes]):
+        self.requests: list[str] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requests.append(self.path)
+                body = files.get(self.path)
+                self.send_response(200 if body is not None else 404)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Content-Length", str(len(body or b"")))
+                self.end_headers()
+                self.wfile.write(body or b"")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+BUNDLE = b"%PDF-1.4 planning statement " + b"x" * 300_000
+
+
+@pytest.fixture
+def server():
+    server = DocumentServer({"/a/statement.pdf": BUNDLE, "/b/statement.pdf": BUNDLE,
+                             "/other.pdf": b"%PDF-1.4 design and access"})
+    yield server
+    server.close()
+
+
+def make_ingester(tmp_path, **kwargs) -> DocumentIngester:
+    spool = tmp_path / "spool"
+    spool.mkdir(exist_ok=True)
+    return DocumentIngester(SourceFetcher(ResponseStore(str(tmp_path / "sources.sqlite"), ttl=None)),
+                            store=ResponseStore(str(tmp_path / "documents.sqlite"), ttl=None),
+                            spool_dir=str(spool), max_workers=1, extract=size_extract, **kwargs)
+
+
+def ingest_all(ingester, urls):
+    async def run():
+        async with ingester.fetcher, ingester:
+            return await ingester.ingest_all(urls)
+    return asyncio.run(run())
+
+
+def test_ingester_extracts_each_content_hash_once(server, tmp_path):
+    urls = [f"{server.url}/a/statement.pdf", f"{server.url}/b/statement.pdf", f"{server.url}/other.pdf"]
+
+    first = ingest_all(make_ingester(tmp_path), urls)
+    again = ingest_all(make_ingester(tmp_path), urls[:1])
+
+    a, b, other = (first[url] for url in urls)
+    assert a.text == f"{len(BUNDLE)}:%PDF-1.4 plannin" and a.size == len(BUNDLE)
+    assert a.digest == b.digest != other.digest
+    assert sorted([a.cache, b.cache]) == ["hit", "miss"] and b.url == urls[1]
+    assert other.cache == "miss" and other.error is None
+    assert again[urls[0]].cache == "hit" and again[urls[0]].text == a.text
+    assert list((tmp_path / "spool").iterdir()) == []
+
+
+def test_ingester_rejects_oversized_downloads(server, tmp_path):
+    urls = [f"{server.url}/a/statement.pdf", f"{server.url}/missing.pdf"]
+
+    documents = ingest_all(make_ingester(tmp_path, max_bytes=100_000), urls)
+
+    assert DocumentTooLarge.__name__ in documents[urls[0]].error
+    assert "404" in documents[urls[1]].error
+    assert list((tmp_path / "spool").iterdir()) == []
+
+
+def test_fetcher_hands_pdf_responses_to_the_ingester(server, tmp_path):
+    urls = [f"{server.url}/a/statement.pdf", f"{server.url}/other.pdf", f"{server.url}/a/statement.pdf"]
+
+    def fetch_all(ingester, urls):
+        async def run():
+            async with ingester.fetcher, ingester:
+                return await ingester.fetcher.fetch_all(urls)
+        return asyncio.run(run())
+
+    fetched = fetch_all(make_ingester(tmp_path), urls)
+    again = fetch_all(make_ingester(tmp_path), urls[:1])
+
+    # One GET per document, and its text is cached with the source.
+    assert sorted(server.requests) == ["/a/statement.pdf", "/other.pdf"]
+    assert fetched[urls[0]].ok and fetched[urls[0]].text == f"{len(BUNDLE)}:%PDF-1.4 plannin"
+    assert fetched[urls[0]].content_type == "application/pdf"
+    assert again[urls[0]].cache == "fresh" and again[urls[0]].text == fetched[urls[0]].text
+    assert list((tmp_path / "spool").iterdir()) == []
+
+
+def test_extract_pdf_text_stops_at_budget(tmp_path):
+    pytest.importorskip("pypdf")
+    from src.documents import extract_pdf_text
+
+    path = tmp_path / "bundle.pdf"
+    path.write_bytes(make_pdf([f"Page {i} objection to the solar farm" for i in range(1, 6)]))
+
+    full = extract_pdf_text(str(path), max_chars=10_000)
+    partial = extract_pdf_text(str(path), max_chars=50)
+
+    assert full["page_count"] == 5 and full["pages_read"] == 5 and not full["truncated"]
+    assert full["text"].startswith("Page 1 objection") and "Page 5" in full["text"]
+    assert partial["pages_read"] == 2 and partial["truncated"] and len(partial["text"]) == 50
@@ -0,0 +1,131 @@
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+import pytest
+from src.portals import IdoxAdapter, PortalScraper, normalise_authority, should_block
+
+FIXTURES = Path(__file__).parent / "fixtures" / "portals"
+PORTAL = "https://planning.testvalley.gov.uk/online-applications/"
+
+COUNCILS = {
+    "Test Valley": f"{PORTAL}search.do?action=simple",
+    "Bristol": "https://pa.bristol.gov.uk/online-applications/",
+    "Dorset": "https://planning.dorsetcouncil.gov.uk/",
+    "Arun": "https://www.arun.gov.uk/planning-application-finder",
+}
+
+
+class FixturePage:
+    """Stands in for a Playwright page, serving saved Idox pages.
+
+    Searching for 21/02638/FULLN redirects straight to the application as Idox does for
+    an exact match; any other search shows the saved result list.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.url = "about:blank"
+
+    async def goto(self, url: str):
+        self.pool.in_flight += 1
+        self.pool.max_in_flight = max(self.pool.max_in_flight, self.pool.in_flight)
+        await asyncio.sleep(0.01)
+        self.pool.in_flight -= 1
+        self.pool.visits.append(url)
+        query = parse_qs(urlsplit(url).query)
+        if "search.do" in url and query["searchCriteria.simpleSearchString"] == ["21/02638/FULLN"]:
+            url = f"{PORTAL}applicationDetails.do?activeTab=summary&keyVal=R0A9XXTSP02B00"
+        self.url = url
+
+    async def content(self) -> str:
+        if "search.do" in self.url:
+            name = "idox_results.html"
+        else:
+            name = f"idox_{parse_qs(urlsplit(self.url).query)['activeTab'][0]}.html"
+        return (FIXTURES / name).read_text()
+
+
+class FixturePool:
+    def __init__(self, size: int = 2):
+        self.size = size
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.visits: list[str] = []
+
+    @asynccontextmanager
+    async def page(self):
+        yield FixturePage(self)
+
+
+def test_should_block_heavy_and_tracking_requests():
+    assert should_block("image", f"{PORTAL}images/logo.png")
+    assert should_block("font", "https://fonts.gstatic.com/s/roboto.woff2")
+    assert should_block("script", "https://www.googletagmanager.com/gtag/js?id=G-TEST")
+    assert not should_block("document", f"{PORTAL}applicationDetails.do")
+    assert not should_block("script", f"{PORTAL}js/tabs.js")
+
+
+def test_scraper_maps_authorities_to_adapters():
+    scraper = PortalScraper(FixturePool(), councils=COUNCILS)
+
+    url, adapter = scraper.portal_for("Test Valley")
+    assert adapter.name == "idox"
+    assert adapter.search_url(url, "21/02638/FULLN") == (
+        f"{PORTAL}search.do?action=simple&searchType=Application&searchCriteria.simpleSearch=true"
+        "&searchCriteria.simpleSearchString=21%2F02638%2FFULLN")
+    assert scraper.portal_for("Bristol, City of")[1].name == "idox"
+    assert scraper.portal_for("Dorset")[1].name == "dorset"
+    assert scraper.portal_for("Arun") is None
+    assert scraper.portal_for("Marine Scotland") is None
+    assert normalise_authority("Aberdeen City") == normalise_authority("Aberdeen")
+
+
+def test_idox_pages_parse_from_fixtures():
+    pytest.importorskip("lxml")
+    from src.portals import parse_document_table, parse_key_value_table
+
+    details = parse_key_value_table((FIXTURES / "idox_summary.html").read_text(), "simpleDetailsTable")
+    documents = parse_document_table((FIXTURES / "idox_documents.html").read_text(), PORTAL)
+    results = (FIXTURES / "idox_results.html").read_text()
+
+    assert details["Reference"] == "21/02638/FULLN"
+    assert details["Address"] == "Eveley Farm, Stockbridge, Hampshire SO20 6JA"
+    assert details["Decision"] == "Withdrawn by Applicant"
+    assert [d.description for d in documents] == ["PLANNING STATEMENT", "PARISH COUNCIL OBJECTION"]
+    assert documents[1].document_type == "Consultee Comment" and documents[1].published == "15 Nov 2021"
+    assert documents[0].url.startswith("https://planning.testvalley.gov.uk/online-applications/files/")
+    assert IdoxAdapter.parse_results(results, PORTAL, "22/00123/FULLN").endswith("keyVal=QX1Z2TSP01A00")
+    assert IdoxAdapter.parse_results(results, PORTAL, "19/00001/FULLN") is None
+    # Only whole references match, not prefixes or suffixes of a listed one.
+    assert IdoxAdapter.parse_results(results, PORTAL, "22/00123/FULL") is None
+    assert IdoxAdapter.parse_results(results, PORTAL, "2/00123/FULLN") is None
+
+
+def test_idox_documents_url_sets_the_documents_tab():
+    summary = f"{PORTAL}applicationDetails.do?activeTab=summary&keyVal=QX1Z2TSP01A00"
+
+    assert IdoxAdapter.documents_url(summary) == summary.replace("summary", "documents", 1)
+    assert IdoxAdapter.documents_url(f"{PORTAL}applicationDetails.do?keyVal=QX1Z2TSP01A00") == (
+        f"{PORTAL}applicationDetails.do?keyVal=QX1Z2TSP01A00&activeTab=documents")
+
+
+def test_scraper_looks_up_many_references_in_parallel():
+    pytest.importorskip("lxml")
+    pool = FixturePool(size=2)
+    scraper = PortalScraper(pool, councils=COUNCILS)
+    applications = [("Test Valley", "21/02638/FULLN"), ("Test Valley", "22/00123/FULLN"),
+                    ("Test Valley", "19/00001/FULLN"), ("Bristol, City of", "23/01234/F"),
+                    ("Arun", "A/1/22"), ("Test Valley", " 21/02638/FULLN ")]
+
+    results = asyncio.run(scraper.lookup_all(applications))
+
+    assert len(results) == 5
+    direct = results[("Test Valley", "21/02638/FULLN")]
+    assert direct.ok and direct.portal == "idox"
+    assert direct.details["Status"] == "Withdrawn" and len(direct.documents) == 2
+    listed = results[("Test Valley", "22/00123/FULLN")]
+    assert listed.ok and listed.url.endswith("keyVal=QX1Z2TSP01A00")
+    assert results[("Test Valley", "19/00001/FULLN")].error == "application not found"
+    assert results[("Arun", "A/1/22")].error == "no supported portal"
+    assert pool.max_in_flight == 2
@@ -0,0 +1,45 @@
+import pandas as pd
+from src.processors.query import QueryIndex
+from src.processors.repd_processor import CANCELLED_DEVELOPMENT_TYPES, REPDProcessor
+
+
+def test_query_matches_boolean_filters(repd_csv, tmp_path):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    df = processor.process_pipeline()
+
+    cancelled = processor.query(status=CANCELLED_DEVELOPMENT_TYPES)
+    pd.testing.assert_frame_equal(cancelled, processor.filter_by_cancelled(df))
+
+    hampshire = processor.query(status=CANCELLED_DEVELOPMENT_TYPES, county="Hampshire",
+                                date_range=("2024-01-01", None))
+    assert hampshire["Ref ID"].tolist() == [4, 5]
+
+    solar = processor.query(technology=["Solar Photovoltaics", "Battery"], authority="Test Valley",
+                            date_range=(None, "2024-12-18"), capacity_range=(5, None))
+    assert solar["Ref ID"].tolist() == [4]
+    assert processor.query(county="Nowhere").empty
+    assert len(processor.query()) == len(df)
+
+
+def test_query_ignores_filtered_pipeline_runs(repd_csv, tmp_path):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    processor.process_pipeline(planning_authority="Winchester")
+
+    assert processor.query(status=CANCELLED_DEVELOPMENT_TYPES)["Ref ID"].tolist() == [1, 3, 4, 5]
+    processor.process_pipeline()
+    processor.process_pipeline(planning_authority="Test Valley")
+    assert len(processor.query()) == 5
+
+
+def test_query_index_ranges_skip_missing_values():
+    df = pd.DataFrame({
+        "Development Status (short)": ["Operational", None, "Operational", "Abandoned"],
+        "Installed Capacity (MWelec)": [10.0, float("nan"), 5.0, 20.0],
+        "Record Last Updated (dd/mm/yyyy)": pd.to_datetime(["2024-01-01", "2023-01-01", None, "2025-06-30"]),
+    })
+    index = QueryIndex(df)
+
+    assert index.positions(status="Operational").tolist() == [0, 2]
+    assert index.positions(capacity_range=(None, 10)).tolist() == [0, 2]
+    assert index.positions(date_range=("2023-01-01", "2024-01-01")).tolist() == [0, 1]
+    assert index.positions(status="Operational", date_range=("2024-01-01", None)).tolist() == [0]
@@ -0,0 +1,145 @@
+import json
+import numpy as np
+import pandas as pd
+from src.processors import repd_processor
+from src.processors.repd_processor import REPDProcessor, get_transformer, transform_coordinates
+from tests.conftest import REPD_ROWS, write_repd_csv
+
+
+def test_load_applies_typed_schema(repd_csv, tmp_path):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    df = processor.load()
+
+    assert isinstance(df["Technology Type"].dtype, pd.CategoricalDtype)
+    assert df["Installed Capacity (MWelec)"].dtype == float
+    assert pd.api.types.is_datetime64_any_dtype(df["Record Last Updated (dd/mm/yyyy)"])
+    assert df.loc[0, "Record Last Updated (dd/mm/yyyy)"] == pd.Timestamp("2021-07-07")
+    assert set(df["County"].dropna()) == {"South Glamorgan", "Ayrshire", "Hampshire"}
+
+
+def test_load_reuses_snapshot(repd_csv, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    first = REPDProcessor(src=str(repd_csv), cache_dir=str(cache_dir)).load()
+    assert len(list(cache_dir.glob("*.arrow"))) == 1
+
+    def fail_parse(self):
+        raise AssertionError("snapshot should have been used")
+
+    monkeypatch.setattr(REPDProcessor, "parse", fail_parse)
+    second = REPDProcessor(src=str(repd_csv), cache_dir=str(cache_dir)).load()
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_snapshot_invalidated_when_source_changes(repd_csv, tmp_path):
+    cache_dir = tmp_path / "cache"
+    REPDProcessor(src=str(repd_csv), cache_dir=str(cache_dir)).load()
+    with open(repd_csv, "a", encoding="cp1252") as f:
+        f.write("\n")
+    REPDProcessor(src=str(repd_csv), cache_dir=str(cache_dir)).load()
+    assert len(list(cache_dir.glob("*.arrow"))) == 2
+
+
+def test_write_geojson_streams_selected_properties(repd_csv, tmp_path):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    df = processor.process_pipeline()
+    path = tmp_path / "points.geojson"
+
+    count = processor.write_geojson(df, str(path), properties=["Ref ID", "Planning Application Submitted", "Installed Capacity (MWelec)"], chunk_size=2)
+    geojson = json.loads(path.read_text())
+
+    assert count == len(geojson["features"]) == 5
+    first, third, fifth = geojson["features"][0], geojson["features"][2], geojson["features"][4]
+    assert first["properties"]["Planning Application Submitted"] == "16/04/2020"
+    assert third["properties"]["Installed Capacity (MWelec)"] is None
+    assert fifth["properties"]["Planning Application Submitted"] is None
+    assert geojson == processor.create_geojson(df, properties=list(first["properties"]))
+
+
+def test_spatial_queries(repd_csv, tmp_path):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    df = processor.process_pipeline()
+    eveley = df[df["Ref ID"] == 3].iloc[0]
+
+    nearby = processor.query_radius(eveley.lat, eveley.lon, radius_km=5)
+    assert nearby["Ref ID"].tolist() == [3, 4]
+    assert nearby["distance_km"].iloc[0] == 0
+
+    nearest = processor.nearest_k(eveley.lat, eveley.lon, k=3)
+    assert nearest["Ref ID"].tolist() == [3, 4, 5]
+    assert nearest["distance_km"].is_monotonic_increasing
+
+    viewport = processor.query_bbox(-2.0, 50.5, -1.0, 51.5)
+    assert set(viewport["Ref ID"]) == {3, 4, 5}
+
+    # A filtered pipeline run leaves the processor-wide index in place.
+    winchester = processor.process_pipeline(planning_authority="Winchester")
+    assert winchester["Ref ID"].tolist() == [5]
+    assert set(processor.query_bbox(-8.0, 49.0, 2.0, 61.0)["Ref ID"]) == set(df["Ref ID"])
+
+
+def test_spatial_queries_after_filtered_pipeline(repd_csv, tmp_path):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    processor.process_pipeline(planning_authority="Test Valley")
+
+    assert set(processor.query_bbox(-8.0, 49.0, 2.0, 61.0)["Ref ID"]) == {1, 2, 3, 4, 5}
+
+
+def test_transform_coordinates_masks_missing_values():
+    lat, lon = transform_coordinates([430000, np.nan, 431500], [140000, 141000, np.inf])
+
+    assert lat.dtype == np.float32 and lon.dtype == np.float32
+    assert round(float(lat[0]), 2) == 51.16 and round(float(lon[0]), 2) == -1.57
+    assert np.isnan(lat[1:]).all() and np.isnan(lon[1:]).all()
+    assert get_transformer("EPSG:27700", "EPSG:4326") is get_transformer("EPSG:27700", "EPSG:4326")
+
+
+def test_lat_lon_converted_once_per_extract(tmp_path, monkeypatch):
+    unlocated = (6, "29/09/2024", "Statkraft", "Nowhere Solar", "Solar Photovoltaics", "Application Refused",
+                 "Winchester", "Hampshire", "5", "", "", "")
+    src = write_repd_csv(tmp_path / "repd.csv", REPD_ROWS + [unlocated])
+    cache_dir = str(tmp_path / "cache")
+    first = REPDProcessor(src=str(src), cache_dir=cache_dir)
+    df = first.process_pipeline()
+    assert 6 not in df["Ref ID"].tolist()
+    assert df["lat"].dtype == np.float32
+    assert len(list((tmp_path / "cache").glob("*-latlon.arrow"))) == 1
+
+    def fail_transform(*args, **kwargs):
+        raise AssertionError("lat/lon snapshot should have been used")
+
+    monkeypatch.setattr(repd_processor, "transform_coordinates", fail_transform)
+    second = REPDProcessor(src=str(src), cache_dir=cache_dir)
+    hampshire = second.filter_by_planning_authority(second.load(), "Test Valley")
+    located = second.attach_lat_lon(hampshire)
+    expected = df.set_index("Ref ID").loc[[3, 4], ["lat", "lon"]]
+    np.testing.assert_array_equal(located[["lat", "lon"]].to_numpy(), expected.to_numpy())
+
+
+def test_prompt_rows_are_compact_and_drop_missing_values(repd_csv, tmp_path):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    cancelled = processor.filter_by_cancelled(processor.load())
+
+    built = processor.build_contexts(cancelled)
+
+    by_ref = dict(zip(cancelled['Ref ID'], built['context']))
+    assert by_ref[1] == ("Site: Aberthaw Solar Farm\nOperator: RWE\nTechnology: Solar Photovoltaics\n"
+                         "Capacity: 35 MW\nStatus: Application Refused\nCounty: South Glamorgan\n"
+                         "Authority: Vale of Glamorgan\nTimeline: submitted 2020-04-16")
+    assert "Capacity" not in by_ref[3] and "County: Hampshire\n" in by_ref[3]
+    assert "Timeline" not in by_ref[5] and "Nearby" not in by_ref[5]
+    assert not any("nan" in text or "NaT" in text for text in built['context'])
+    assert (built['tokens'] == (built['context'].str.len() + 3) // 4).all()
+    assert built['tokens'].max() < len(str(cancelled.iloc[0].to_dict())) / 4 / 3
+
+
+def test_prompt_rows_list_nearby_projects_in_same_authority(repd_csv, tmp_path):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    cancelled = processor.filter_by_cancelled(processor.load())
+
+    built = processor.build_contexts(cancelled[cancelled['Ref ID'].isin([3, 5])], nearby=3)
+    capped = processor.build_contexts(cancelled, nearby=3, max_distance_km=1)
+
+    eveley, godsfield = built['context']
+    assert eveley.endswith("\nNearby cancelled: Westover Farm (Battery, 7.5 MW, Appeal Refused, 1.8 km)")
+    assert "Nearby" not in godsfield
+    assert not capped['context'].str.contains("Nearby").any()
@@ -0,0 +1,71 @@
+import asyncio
+import json
+from main import NimbyAgent
+from scripts.run_nimby import run_batch
+from src.journal import ResultJournal
+from src.processors.repd_processor import REPDProcessor
+from tests.conftest import REPD_ROWS, write_repd_csv
+
+
+def test_run_batch_resumes_from_journal(repd_csv, tmp_path, fake_client):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    agent = NimbyAgent(client=fake_client, processor=processor)
+    journal_path = tmp_path / "journal.jsonl"
+
+    journal = ResultJournal(str(journal_path))
+    assert asyncio.run(run_batch(agent, journal, max_values=2)) == 2
+    journal.close()
+    with open(journal_path, "a") as f:
+        f.write('{"refid": 9')  # torn write from a crash
+
+    journal = ResultJournal(str(journal_path))
+    assert journal.completed == {1, 3}
+    assert asyncio.run(run_batch(agent, journal)) == 2
+    assert len(fake_client.prompts) == 4
+
+    output = tmp_path / "nimby_score.json"
+    output.write_text(json.dumps([{"refid": 6213, "header": "legacy"},
+                                  {"refid": 1, "Petty Score": 75, "article_url": "https://example.org/a"}]))
+    assert journal.compact(str(output)) == 5
+    journal.close()
+    published = {r["refid"]: r for r in json.loads(output.read_text())}
+    assert set(published) == {6213, 1, 3, 4, 5}
+    assert published[1]["Accuracy Score"] == 60 and published[1]["Nimby Score"] == 80
+    assert published[1]["Petty Score"] == 75 and published[1]["article_url"] == "https://example.org/a"
+    assert published[3]["article_url"] is None and published[3]["Interesting Tidbits"] == []
+    assert ResultJournal(str(journal_path)).completed == {1, 3, 4, 5}
+
+
+def test_run_batch_skips_projects_already_published(repd_csv, tmp_path, fake_client):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    agent = NimbyAgent(client=fake_client, processor=processor)
+    output = tmp_path / "nimby_score.json"
+    output.write_text(json.dumps([{"refid": 1, "Accuracy Score": 95}, {"refid": 5, "Accuracy Score": 40}]))
+
+    journal = ResultJournal(str(tmp_path / "journal.jsonl"))
+    assert journal.mark_published(str(output)) == 2
+    assert asyncio.run(run_batch(agent, journal)) == 2
+    journal.close()
+    journal.compact(str(output))
+
+    assert {r["refid"] for r in json.loads(output.read_text())} == {1, 3, 4, 5}
+    assert json.loads(output.read_text())[0] == {"refid": 1, "Accuracy Score": 95}
+
+
+def test_run_batch_only_analyses_delta(repd_csv, tmp_path, fake_client):
+    previous = write_repd_csv(tmp_path / "previous.csv", rows=REPD_ROWS[:3] + [
+        (4, "01/01/2024", *REPD_ROWS[3][2:5], "Application Submitted", *REPD_ROWS[3][6:]),
+        (9, "01/01/2020", "Gone", "Gone Farm", "Battery", "Abandoned", "Test Valley", "Hampshire", "1", "430000", "140000", ""),
+    ])
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    diff = processor.diff(str(previous))
+    assert diff.added["Ref ID"].tolist() == [5]
+    assert diff.changed["Ref ID"].tolist() == [4]
+    assert diff.removed["Ref ID"].tolist() == [9]
+    assert diff.summary()["transitions"] == {"Application Submitted -> Appeal Refused": 1}
+
+    journal = ResultJournal(str(tmp_path / "journal.jsonl"))
+    journal.append({"refid": 4, "header": "stale"})
+    agent = NimbyAgent(client=fake_client, processor=processor)
+    assert asyncio.run(run_batch(agent, journal, previous_src=str(previous))) == 2
+    journal.close()
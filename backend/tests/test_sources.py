@@ -0,0 +1,138 @@
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+import pytest
+from src.cache import ResponseStore
+from src.extract import Article
+from src.sources import SourceFetcher
+
+ARTICLE_HTML = b"""<html><head><title>Solar farm refused</title></head><body>
+<nav><p>Home News Sport Weather Planning Council Contact Us Subscribe</p></nav>
+<div class="story-body">
+  <p>Councillors refused plans for a 35MW solar farm near Aberthaw after a campaign by villagers.</p>
+  <p>The parish council said the panels would industrialise the landscape around the village.</p>
+</div>
+<aside class="related"><p>Related: wind turbine plans withdrawn after objections from residents nearby.</p></aside>
+<script>var tracking = "paragraphs in scripts are ignored entirely by the extractor";</script>
+</body></html>"""
+
+
+class FixtureServer:
+    """Local HTTP server with an ETag'd article, a Last-Modified page, a slow page and a 404."""
+
+    def __init__(self, delay: float = 0.05):
+        self.requests: list[tuple[str, dict]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests.append((self.path, dict(self.headers)))
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    time.sleep(delay)
+                    self.route()
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+            def route(self):
+                if self.path.startswith("/article"):
+                    if self.headers.get("If-None-Match") == '"v1"':
+                        return self.reply(304, b"", {"ETag": '"v1"'})
+                    return self.reply(200, ARTICLE_HTML, {"ETag": '"v1"', "Content-Type": "text/html; charset=utf-8"})
+                if self.path == "/dated":
+                    if self.headers.get("If-Modified-Since") == "Wed, 01 Jan 2025 00:00:00 GMT":
+                        return self.reply(304, b"")
+                    return self.reply(200, ARTICLE_HTML, {"Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT",
+                                                          "Content-Type": "text/html"})
+                if self.path == "/report.pdf":
+                    return self.reply(200, b"%PDF-1.4", {"Content-Type": "application/pdf"})
+                self.reply(404, b"not found")
+
+            def reply(self, status, body, headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+@pytest.fixture
+def server():
+    server = FixtureServer()
+    yield server
+    server.close()
+
+
+def title_extract(body: bytes) -> Article:
+    return Article(title="page", text=body.decode()[:20])
+
+
+def fetch_all(fetcher, urls):
+    async def run():
+        async with fetcher:
+            return await fetcher.fetch_all(urls)
+    return asyncio.run(run())
+
+
+def test_fetcher_limits_per_host_and_reports_failures(server, tmp_path):
+    fetcher = SourceFetcher(ResponseStore(str(tmp_path / "sources.sqlite"), ttl=None),
+                            per_host=2, extract=title_extract)
+    urls = [f"{server.url}/article/{i}" for i in range(6)] + [f"{server.url}/missing", f"{server.url}/report.pdf"]
+
+    results = fetch_all(fetcher, urls + urls[:2])
+
+    assert len(results) == 8 and len(server.requests) == 8
+    assert server.max_in_flight == 2
+    assert all(results[url].ok and results[url].text for url in urls[:6])
+    assert results[f"{server.url}/missing"].error == "HTTP 404"
+    pdf = results[f"{server.url}/report.pdf"]
+    assert pdf.ok and pdf.content_type == "application/pdf" and pdf.text is None
+
+
+def test_fetcher_serves_fresh_cache_and_revalidates_stale(server, tmp_path):
+    store = ResponseStore(str(tmp_path / "sources.sqlite"), ttl=None)
+    urls = [f"{server.url}/article/1", f"{server.url}/dated"]
+    first = fetch_all(SourceFetcher(store, extract=title_extract), urls)
+    fresh = fetch_all(SourceFetcher(store, extract=title_extract), urls)
+    stale = fetch_all(SourceFetcher(store, max_age=0, extract=title_extract), urls)
+
+    assert [r.cache for r in first.values()] == ["miss", "miss"]
+    assert [r.cache for r in fresh.values()] == ["fresh", "fresh"]
+    assert [r.cache for r in stale.values()] == ["revalidated", "revalidated"]
+    assert len(server.requests) == 4
+    conditional = {path: headers for path, headers in server.requests[2:]}
+    assert conditional["/article/1"]["If-None-Match"] == '"v1"'
+    assert conditional["/dated"]["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+    assert stale[urls[0]].text == first[urls[0]].text
+
+
+def test_extract_article_prefers_main_content():
+    pytest.importorskip("lxml")
+    from src.extract import extract_article
+
+    article = extract_article(ARTICLE_HTML)
+
+    assert article.title == "Solar farm refused"
+    assert article.text.startswith("Councillors refused plans")
+    assert "parish council" in article.text
+    assert "Related" not in article.text and "tracking" not in article.text
@@ -0,0 +1,54 @@
+import asyncio
+import json
+import urllib.request
+import pytest
+from main import NimbyAgent
+from src.cache import CachedClient, ResponseStore
+from src.processors.repd_processor import REPDProcessor
+from src.telemetry import CallRecord, InstrumentedClient, Telemetry
+
+
+def test_instrumented_client_records_stages_and_cache_hits(repd_csv, tmp_path, fake_client):
+    processor = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache"))
+    fake_client.model = "claude-sonnet-4-5"
+    telemetry = Telemetry(jsonl_path=str(tmp_path / "out" / "telemetry.jsonl"))
+    cached = CachedClient(fake_client, ResponseStore(str(tmp_path / "responses.sqlite")))
+    agent = NimbyAgent(client=InstrumentedClient(cached, telemetry), processor=processor)
+
+    results = asyncio.run(agent.run_async(max_values=None))
+    asyncio.run(agent.run_async(max_values=None))
+    agent.eval(results, log_path=None)
+
+    stages = telemetry.stages()
+    assert list(stages) == ["analysis", "eval"]
+    assert (stages["analysis"].calls, stages["analysis"].cached, stages["eval"].calls) == (8, 4, 4)
+    # Only the four live analysis calls are billed.
+    live = [r for r in telemetry.records if r.stage == "analysis" and not r.cached]
+    assert stages["analysis"].input_tokens == sum(r.input_tokens for r in live)
+    assert stages["analysis"].cost == pytest.approx(sum(r.cost for r in live))
+    assert stages["analysis"].latency[0.5] <= stages["analysis"].latency[0.99]
+    lines = (tmp_path / "out" / "telemetry.jsonl").read_text().splitlines()
+    assert len(lines) == 12 and json.loads(lines[0])["stage"] == "analysis"
+
+
+def test_prometheus_export_and_endpoint():
+    telemetry = Telemetry()
+    for latency in (1.0, 2.0, 3.0, 4.0):
+        telemetry.add(CallRecord(stage="search", model="claude-sonnet-4-5", started=100.0, latency=latency,
+                                 input_tokens=1_000_000, retries=1))
+    telemetry.add(CallRecord(stage="search", model="claude-sonnet-4-5", started=101.0, latency=0.5, error="boom"))
+
+    text = telemetry.prometheus()
+    assert 'nimby_llm_call_latency_seconds{stage="search",quantile="0.5"} 2.0' in text
+    assert 'nimby_llm_calls_total{stage="search",outcome="error"} 1' in text
+    assert 'nimby_llm_retries_total{stage="search"} 4' in text
+    assert 'nimby_llm_cost_usd_total{stage="search"} 12.0' in text
+    assert telemetry.stages()["search"].wall == 4.0
+    assert "search" in telemetry.format_summary()
+
+    server = telemetry.serve(port=0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            assert response.read().decode() == text
+    finally:
+        server.shutdown()
@@ -0,0 +1,30 @@
+from src.processors.repd_processor import REPDProcessor
+from src.processors.tiles import TileGenerator, encode_point_layer
+
+
+def test_encode_point_layer_matches_spec_bytes():
+    tile = encode_point_layer("p", [(7, 1, 2, {"a": "b"})], extent=4096)
+    layer = (
+        b"\x78\x02"                          # version 2
+        b"\x0a\x01p"                         # name
+        b"\x12\x0d\x08\x07\x12\x02\x00\x00"  # feature id 7, tags [0, 0]
+        b"\x18\x01\x22\x03\x09\x02\x04"      # POINT, MoveTo(1, 2)
+        b"\x1a\x01a"                         # keys
+        b"\x22\x03\x0a\x01b"                 # values
+        b"\x28\x80\x20"                      # extent
+    )
+    assert tile == b"\x1a" + bytes([len(layer)]) + layer
+
+
+def test_tiles_cluster_at_low_zoom(repd_csv, tmp_path):
+    df = REPDProcessor(src=str(repd_csv), cache_dir=str(tmp_path / "cache")).process_pipeline()
+    tiles = TileGenerator(df, cluster_max_zoom=10, max_zoom=12)
+
+    low, high = tiles.level(0), tiles.level(12)
+    assert low["count"].sum() == high["count"].sum() == 5
+    assert len(low) < len(high) == 5
+    assert tiles.tile(0, 0, 0) is tiles.tile(0, 0, 0)
+    assert tiles.tile(0, 1, 1) == b""
+
+    written = tiles.write_pyramid(str(tmp_path / "tiles"), 0, 3)
+    assert written == len(list((tmp_path / "tiles").rglob("*.pbf"))) >= 4